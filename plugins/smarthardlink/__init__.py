@@ -1,10 +1,10 @@
 import datetime
-import hashlib
 import os
-import re
+import stat
 import threading
 import traceback
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import List, Tuple, Dict, Any, Optional, Set
 
@@ -20,6 +20,21 @@ from app.plugins import _PluginBase
 from app.schemas.types import EventType, NotificationType
 from app.utils.system import SystemUtils
 
+from plugins.smarthardlink.cancel import ScanCancelled
+from plugins.smarthardlink.file_table import FileTable
+from plugins.smarthardlink.hash_index import HashIndex, settled_signature
+from plugins.smarthardlink.history_store import HistoryStore, PERIOD_FORMATS
+from plugins.smarthardlink.hasher import FileHasher, READ_MODE_BUFFERED, ALGORITHM_SHA1, available_algorithms
+from plugins.smarthardlink.linker import LinkExecutor, LinkOperation, STRATEGY_REPLACE, STRATEGY_REFLINK, \
+    shares_extents
+from plugins.smarthardlink.matcher import ExclusionMatcher
+from plugins.smarthardlink.plan import PlanWriter, file_entry, is_stale, read_plan_header, read_plan_groups
+from plugins.smarthardlink.progress import ProgressAggregator, RunProgress
+from plugins.smarthardlink.selector import SourceSelector, POLICY_PATH
+from plugins.smarthardlink.throttle import TokenBucket, BandwidthSchedule, lower_thread_priority
+from plugins.smarthardlink.walker import DirectoryWalker
+from plugins.smarthardlink.watcher import DirectoryWatcher
+
 lock = threading.Lock()
 
 
@@ -48,21 +63,73 @@ class smarthardlink(_PluginBase):
     _enabled = False
     _onlyonce = False
     _cron = None
+    _incremental_cron = None  # 增量扫描周期
+    _watch = False  # 是否实时监控扫描目录
+    _watch_debounce = 60  # 实时监控去抖时间，单位秒
+    _watcher: Optional[DirectoryWatcher] = None
     _scan_dirs = ""
     _min_size = 1024  # 默认最小文件大小，单位KB
     _exclude_dirs = ""
     _exclude_extensions = ""
     _exclude_keywords = ""
     _hash_buffer_size = 65536  # 计算哈希时的缓冲区大小，默认64KB
+    _hash_read_mode = READ_MODE_BUFFERED  # 读取方式：buffered / readinto / mmap
+    _drop_page_cache = True  # 读取完成后丢弃文件页缓存，避免挤占媒体服务器的缓存
+    _hash_algorithm = ALGORITHM_SHA1  # 摘要算法：sha1 / xxh3_128 / blake3
+    _verify_sha1 = False  # 使用非SHA1算法时，链接前再用SHA1校验重复文件
+    _verify_bytes = False  # 链接前逐字节比较重复文件与源文件，开启后不再进行SHA1校验
+    _link_strategy = STRATEGY_REPLACE  # 替换方式：replace 原子替换 / rename 先重命名
+    _reflink = False  # 使用写时复制副本（FICLONE）代替硬链接，仅支持 btrfs/XFS 等文件系统
+    _source_policy = POLICY_PATH  # 源文件选择策略：path / most_links / oldest / preferred_root
+    _preferred_roots = ""  # 优先作为源文件的目录，每行一个
+    _source_selector: Optional[SourceSelector] = None
+    _file_hasher: Optional[FileHasher] = None
+    _verify_hasher: Optional[FileHasher] = None
+    _partial_hash_size = 1024  # 部分哈希每个采样块的大小，单位KB，0表示关闭部分哈希
+    _partial_hash_samples = 3  # 部分哈希在首尾之外的中间采样点数量
+    _hash_workers = 1  # 每个设备默认的并行哈希线程数
+    _device_workers = ""  # 按目录指定所在设备的并行哈希线程数，每行 "目录:线程数"
+    _io_limit = 0  # 读取限速，单位MB/s，0表示不限速
+    _io_profiles = ""  # 分时段限速，每行 "HH:MM-HH:MM=MB/s"
+    _low_priority = False  # 哈希线程使用较低的CPU和IO优先级
+    _throttle: Optional[TokenBucket] = None  # 所有哈希线程共享的读取限速
+    _bandwidth_schedule: Optional[BandwidthSchedule] = None
     _dry_run = True  # 默认为试运行模式，不实际创建硬链接
+    _use_hash_index = True  # 是否启用持久化哈希索引
+    _hash_index: Optional[HashIndex] = None  # 持久化哈希索引，文件未变化时不再重复读取
+    _history_store: Optional[HistoryStore] = None  # 运行历史，每次运行追加一条记录
+    _history_page_size = 100  # 详情页展示的最近历史记录条数
     _hash_cache = {}  # 保存文件哈希值的缓存
+    _cached_paths: Set[str] = set()  # 本次运行中摘要来自缓存或哈希索引、未读取文件的路径
+    _exclusion_matcher: Optional[ExclusionMatcher] = None  # 预编译的排除规则，配置变更后重新构建
     _process_count = 0  # 处理的文件计数
     _hardlink_count = 0  # 创建的硬链接计数
     _saved_space = 0  # 节省的空间统计，单位字节
     _skipped_hardlinks_count = 0 # 新增：跳过的已存在硬链接计数
+    _skipped_hash_bytes = 0  # 因文件大小或部分哈希唯一而免于计算完整哈希的字节数
+    _partial_filtered_count = 0  # 部分哈希阶段排除的文件数
+    _cross_device_count = 0  # 仅与其他设备上的文件大小相同而跳过的文件数
+    _device_savings: Dict[int, int] = {}  # 按设备统计节省的空间 {st_dev: 字节数}
+    _verified_count = 0  # 链接前校验的文件数
+    _verify_mismatch_count = 0  # 校验不一致（或校验失败）而跳过的文件数
+    _verified_bytes = 0  # 校验读取的字节数
+    _verify_seconds = 0.0  # 校验耗时，单位秒
+    _stale_count = 0  # 执行计划时因文件已变化而跳过的文件数
+    _settled_group_count = 0  # 与上次完整扫描相比未变化而整组跳过的稳定分组数
+    _settled_candidates: Dict[Tuple[int, int], str] = {}  # 本次完整扫描的大小分组签名 {(st_dev, 大小): 签名}
+    _unsettled_groups: Set[Tuple[int, int]] = set()  # 本次有链接操作或读取失败的大小分组
+    _group_skipped: Dict[Tuple[int, int], int] = {}  # 按大小分组统计的已存在链接数
 
-    # 退出事件
+    # 退出事件，同时作为扫描的取消信号，遍历、哈希、链接各阶段都会检查
     _event = threading.Event()
+    # 取消代数，每次请求取消时加一，排队等待锁的扫描据此判断等待期间是否已被取消
+    _cancel_generation = 0
+    # 插件正在停止，排队等待锁的扫描不再运行
+    _stopping = threading.Event()
+    # 停止插件时扫描未能及时退出，由扫描线程退出时关闭哈希索引和运行历史
+    _close_on_exit = False
+    # 当前（或最近一次）扫描的进度，供API和详情页读取
+    _progress = RunProgress()
 
     def init_plugin(self, config: dict = None):
         """
@@ -77,6 +144,9 @@ class smarthardlink(_PluginBase):
             self._enabled = config.get("enabled")
             self._onlyonce = config.get("onlyonce")
             self._cron = config.get("cron")
+            self._incremental_cron = config.get("incremental_cron")
+            self._watch = bool(config.get("watch"))
+            self._watch_debounce = self._get_int_config(config, "watch_debounce", 60)
             self._scan_dirs = config.get("scan_dirs") or ""
             # --- 加固 min_size 加载逻辑 ---
             min_size_val = config.get("min_size")
@@ -91,6 +161,7 @@ class smarthardlink(_PluginBase):
             self._exclude_dirs = config.get("exclude_dirs") or ""
             self._exclude_extensions = config.get("exclude_extensions") or ""
             self._exclude_keywords = config.get("exclude_keywords") or ""
+            self._exclusion_matcher = None
             # --- 加固 hash_buffer_size 加载逻辑 (类似处理) ---
             hash_buffer_size_val = config.get("hash_buffer_size")
             try:
@@ -99,10 +170,39 @@ class smarthardlink(_PluginBase):
                 logger.warning(f"无法将配置中的 hash_buffer_size '{hash_buffer_size_val}' 解析为整数，使用默认值 65536")
                 self._hash_buffer_size = 65536
             # --- 加固结束 ---
+            self._hash_read_mode = config.get("hash_read_mode") or READ_MODE_BUFFERED
+            self._drop_page_cache = bool(config.get("drop_page_cache", True))
+            self._hash_algorithm = config.get("hash_algorithm") or ALGORITHM_SHA1
+            if self._hash_algorithm not in available_algorithms():
+                logger.warning(f"摘要算法 {self._hash_algorithm} 所需的库未安装，使用 {ALGORITHM_SHA1}")
+                self._hash_algorithm = ALGORITHM_SHA1
+            self._verify_sha1 = bool(config.get("verify_sha1"))
+            self._verify_bytes = bool(config.get("verify_bytes"))
+            self._link_strategy = config.get("link_strategy") or STRATEGY_REPLACE
+            self._reflink = bool(config.get("reflink"))
+            self._source_policy = config.get("source_policy") or POLICY_PATH
+            self._preferred_roots = config.get("preferred_roots") or ""
+            self._source_selector = None
+            self._file_hasher = None
+            self._verify_hasher = None
+            self._partial_hash_size = self._get_int_config(config, "partial_hash_size", 1024)
+            self._partial_hash_samples = self._get_int_config(config, "partial_hash_samples", 3)
+            self._hash_workers = max(self._get_int_config(config, "hash_workers", 1), 1)
+            self._device_workers = config.get("device_workers") or ""
+            self._io_limit = self._get_int_config(config, "io_limit", 0)
+            self._io_profiles = config.get("io_profiles") or ""
+            self._low_priority = bool(config.get("low_priority"))
+            self._throttle = None
+            self._bandwidth_schedule = None
             self._dry_run = bool(config.get("dry_run"))
+            self._use_hash_index = bool(config.get("hash_index", True))
 
         # 停止现有任务
         self.stop_service()
+        self._stopping.clear()
+
+        # 恢复上次异常退出时未完成的硬链接操作
+        self._recover_link_journal()
 
         if self._enabled or self._onlyonce:
             # 定时服务管理器
@@ -128,6 +228,56 @@ class smarthardlink(_PluginBase):
                 self._scheduler.print_jobs()
                 self._scheduler.start()
 
+        # 启动实时监控
+        if self._enabled and self._watch and self._scan_dirs:
+            self._watcher = DirectoryWatcher(dirs=self._scan_dirs.split("\n"),
+                                             callback=self.process_new_files,
+                                             debounce=self._watch_debounce)
+            if not self._watcher.start():
+                self._watcher = None
+
+    def _get_journal_file(self) -> str:
+        """
+        硬链接操作日志文件路径
+        """
+        return os.path.join(self.get_data_path(), "link_journal.jsonl")
+
+    def _get_plan_file(self) -> str:
+        """
+        试运行生成的链接计划文件路径
+        """
+        return os.path.join(self.get_data_path(), "link_plan.jsonl")
+
+    def _recover_link_journal(self):
+        """
+        根据硬链接操作日志恢复未完成的操作，扫描进行中时不处理
+        """
+        journal_file = self._get_journal_file()
+        if not os.path.exists(journal_file) or not lock.acquire(blocking=False):
+            return
+        try:
+            rolled_forward, rolled_back, remaining = LinkExecutor.recover(journal_file)
+            logger.info(f"硬链接日志恢复完成：继续完成 {rolled_forward} 个，回滚 {rolled_back} 个，"
+                        f"需手动处理 {remaining} 个")
+        except Exception as e:
+            logger.error(f"恢复硬链接日志失败: {str(e)}")
+        finally:
+            lock.release()
+
+    @staticmethod
+    def _get_int_config(config: dict, key: str, default: int) -> int:
+        """
+        读取整数类型的配置项，为空或无法解析时返回默认值
+        """
+        value = config.get(key)
+        if value is None or value == "":
+            return default
+        try:
+            return max(int(value), 0)
+        except (ValueError, TypeError):
+            logger.warning(f"无法将配置中的 {key} '{value}' 解析为整数，使用默认值 {default}")
+            return default
+
     def __update_config(self):
         """
         更新配置
@@ -137,16 +287,61 @@ class smarthardlink(_PluginBase):
                 "enabled": self._enabled,
                 "onlyonce": self._onlyonce,
                 "cron": self._cron,
+                "incremental_cron": self._incremental_cron,
+                "watch": self._watch,
+                "watch_debounce": self._watch_debounce,
                 "scan_dirs": self._scan_dirs,
                 "min_size": self._min_size,
                 "exclude_dirs": self._exclude_dirs,
                 "exclude_extensions": self._exclude_extensions,
                 "exclude_keywords": self._exclude_keywords,
                 "hash_buffer_size": self._hash_buffer_size,
+                "hash_read_mode": self._hash_read_mode,
+                "drop_page_cache": self._drop_page_cache,
+                "hash_algorithm": self._hash_algorithm,
+                "verify_sha1": self._verify_sha1,
+                "verify_bytes": self._verify_bytes,
+                "link_strategy": self._link_strategy,
+                "reflink": self._reflink,
+                "source_policy": self._source_policy,
+                "preferred_roots": self._preferred_roots,
+                "partial_hash_size": self._partial_hash_size,
+                "partial_hash_samples": self._partial_hash_samples,
+                "hash_workers": self._hash_workers,
+                "device_workers": self._device_workers,
+                "io_limit": self._io_limit,
+                "io_profiles": self._io_profiles,
+                "low_priority": self._low_priority,
                 "dry_run": self._dry_run,
+                "hash_index": self._use_hash_index,
             }
         )
 
+    @eventmanager.register(EventType.PluginAction)
+    def remote_apply_plan(self, event: Event):
+        """
+        远程执行链接计划
+        """
+        if not event:
+            return
+        event_data = event.event_data
+        if not event_data or event_data.get("action") != "hardlink_apply_plan":
+            return
+        summary = self.apply_plan()
+        if summary:
+            text = (f"🔗 {'reflink' if self._reflink else '硬链接'}：{summary['hardlinks_created']} 个\n"
+                    f"💾 节省空间：{summary['space_saved_formatted']}\n"
+                    f"⚠️ 文件已变化跳过：{summary['stale_skipped']} 个")
+        else:
+            text = "没有可执行的链接计划，请先以试运行模式扫描"
+        self.post_message(
+            channel=event_data.get("channel"),
+            mtype=NotificationType.SiteMessage,
+            title="【智能硬链接计划执行结果】",
+            text=text,
+            userid=event_data.get("user"),
+        )
+
     @eventmanager.register(EventType.PluginAction)
     def remote_scan(self, event: Event):
         """
@@ -226,198 +421,573 @@ class smarthardlink(_PluginBase):
         else:
             return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
 
-    def calculate_file_hash(self, file_path):
+    def _get_hash_index(self) -> Optional[HashIndex]:
+        """
+        获取持久化哈希索引，未启用或打开失败时返回None
+        """
+        if not self._use_hash_index:
+            return None
+        if not self._hash_index:
+            try:
+                self._hash_index = HashIndex(os.path.join(self.get_data_path(), "hash_index.db"),
+                                             algorithm=self._hash_algorithm)
+            except Exception as e:
+                logger.error(f"打开哈希索引失败，本次不使用索引: {str(e)}")
+                return None
+        return self._hash_index
+
+    def _get_history_store(self) -> Optional[HistoryStore]:
+        """
+        获取运行历史，首次打开时导入旧版保存在插件数据中的历史列表，打开失败时返回None
+        """
+        if not self._history_store:
+            try:
+                self._history_store = HistoryStore(os.path.join(self.get_data_path(), "history.db"))
+                legacy = self.get_data('link_history')
+                if legacy:
+                    if not self._history_store.count():
+                        logger.info(f"导入旧版硬链接历史记录 {self._history_store.import_legacy(legacy)} 条")
+                    self.save_data(key="link_history", value=[])
+            except Exception as e:
+                logger.error(f"打开运行历史失败: {str(e)}")
+                return None
+        return self._history_store
+
+    def _get_file_hasher(self) -> FileHasher:
+        """
+        获取文件哈希计算器，配置变更后重新创建
+        """
+        if not self._file_hasher:
+            self._file_hasher = FileHasher(buffer_size=self._hash_buffer_size,
+                                           read_mode=self._hash_read_mode,
+                                           drop_cache=self._drop_page_cache,
+                                           algorithm=self._hash_algorithm,
+                                           cancel_event=self._event,
+                                           throttle=self._get_throttle())
+        return self._file_hasher
+
+    def _get_throttle(self) -> Optional[TokenBucket]:
+        """
+        获取读取限速，未配置限速时返回None
+        """
+        if not self._io_limit and not self._io_profiles.strip():
+            return None
+        if not self._throttle:
+            self._bandwidth_schedule = BandwidthSchedule(self._io_limit, self._io_profiles)
+            self._throttle = TokenBucket()
+        return self._throttle
+
+    def _update_throttle_rate(self):
+        """
+        按当前时间所在的时段调整读取限速
+        """
+        throttle = self._get_throttle()
+        if not throttle:
+            return
+        now = datetime.datetime.now(tz=pytz.timezone(settings.TZ))
+        rate = self._bandwidth_schedule.rate_at(now.hour, now.minute)
+        if rate != throttle.rate:
+            logger.info(f"读取限速调整为 {f'{rate / 1024 / 1024:.0f} MB/s' if rate else '不限速'}")
+            throttle.set_rate(rate)
+
+    def _get_verify_hasher(self) -> Optional[FileHasher]:
+        """
+        获取链接前校验使用的SHA1计算器，未开启校验、筛选算法本身就是SHA1或已开启逐字节比较时返回None
+        """
+        if not self._verify_sha1 or self._hash_algorithm == ALGORITHM_SHA1 or self._verify_bytes:
+            return None
+        if not self._verify_hasher:
+            self._verify_hasher = FileHasher(buffer_size=self._hash_buffer_size,
+                                             read_mode=self._hash_read_mode,
+                                             drop_cache=self._drop_page_cache,
+                                             algorithm=ALGORITHM_SHA1,
+                                             cancel_event=self._event,
+                                             throttle=self._get_throttle())
+        return self._verify_hasher
+
+    def _verify_duplicate(self, source_file: str, source_digest: Optional[str],
+                          dup_file: str, dup_size: int) -> Tuple[bool, Optional[str]]:
+        """
+        链接前确认重复文件与源文件内容一致：开启逐字节比较时同步读取两个文件比较，否则比较SHA1
+        校验的文件数、读取量和耗时单独统计
+        :param source_digest: 已计算的源文件SHA1，为None时按需计算
+        :param dup_size: 重复文件大小
+        :return: (是否一致，校验失败时为None, 源文件SHA1)
+        """
+        matched = False
+        start_time = time.perf_counter()
+        try:
+            if self._verify_bytes:
+                matched, compared = self._get_file_hasher().compare_files(source_file, dup_file)
+                self._verified_bytes += compared * 2
+            else:
+                verify_hasher = self._get_verify_hasher()
+                if source_digest is None:
+                    source_digest = verify_hasher.hash_file(source_file)
+                    self._verified_bytes += dup_size
+                matched = verify_hasher.hash_file(dup_file) == source_digest
+                self._verified_bytes += dup_size
+        except ScanCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"  校验 {dup_file} 失败: {str(e)}")
+            matched = None
+        finally:
+            self._verify_seconds += time.perf_counter() - start_time
+            self._verified_count += 1
+            if not matched:
+                self._verify_mismatch_count += 1
+        return matched, source_digest
+
+    def calculate_file_hash(self, file_path, file_stat: Optional[os.stat_result] = None):
         """
-        计算文件的SHA1哈希值
+        计算文件的摘要，算法由配置决定
+        :param file_stat: 文件的stat信息，提供时优先从持久化索引读取并在计算后写入索引
         """
         # 检查缓存
         if file_path in self._hash_cache:
+            self._cached_paths.add(file_path)
             return self._hash_cache[file_path]
 
+        hash_index = self._get_hash_index() if file_stat else None
+        if hash_index:
+            file_hash = hash_index.get(file_stat)
+            if file_hash:
+                self._hash_cache[file_path] = file_hash
+                self._cached_paths.add(file_path)
+                return file_hash
+
         try:
-            hash_sha1 = hashlib.sha1()
-            with open(file_path, "rb") as f:
-                while True:
-                    data = f.read(self._hash_buffer_size)
-                    if not data:
-                        break
-                    hash_sha1.update(data)
-            
-            file_hash = hash_sha1.hexdigest()
+            file_hash = self._get_file_hasher().hash_file(file_path)
             # 保存到缓存
             self._hash_cache[file_path] = file_hash
+            if hash_index:
+                hash_index.put(file_path, file_stat, file_hash)
             return file_hash
+        except ScanCancelled:
+            raise
         except Exception as e:
             logger.error(f"计算文件 {file_path} 哈希值失败: {str(e)}")
             return None
 
+    def calculate_partial_hash(self, file_path: str, file_size: int) -> Optional[str]:
+        """
+        计算文件的部分哈希（指纹），仅读取文件头、文件尾以及若干中间采样块
+        指纹不同的文件一定不同；指纹相同的文件仍需计算完整哈希确认
+        :return: 指纹字符串，文件过小无需采样时返回None
+        """
+        block_size = self._partial_hash_size * 1024
+        # 采样总量不小于文件大小时，部分哈希没有意义，直接使用完整哈希
+        if block_size <= 0 or file_size <= block_size * (self._partial_hash_samples + 2):
+            return None
+
+        # 采样偏移：文件头、均匀分布的中间采样点、文件尾
+        offsets = [0]
+        step = file_size // (self._partial_hash_samples + 1)
+        offsets.extend(step * i for i in range(1, self._partial_hash_samples + 1))
+        offsets.append(file_size - block_size)
+
+        try:
+            return self._get_file_hasher().hash_blocks(file_path, offsets, block_size)
+        except ScanCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"计算文件 {file_path} 部分哈希失败: {str(e)}")
+            return None
+
+    def _resolve_device_workers(self) -> Dict[int, int]:
+        """
+        解析按目录配置的并行线程数，返回 {st_dev: 线程数}
+        """
+        device_workers = {}
+        for line in self._device_workers.split("\n"):
+            line = line.strip()
+            if not line or ":" not in line:
+                continue
+            dir_path, workers = line.rsplit(":", 1)
+            try:
+                device_workers[os.stat(dir_path.strip()).st_dev] = max(int(workers), 1)
+            except (OSError, ValueError) as e:
+                logger.warning(f"无法解析设备并行线程配置 '{line}': {str(e)}")
+        return device_workers
+
+    def _run_hash_tasks(self, stage: str, files: List[Tuple[str, int]],
+                        candidate_stats: Dict[str, os.stat_result], hash_func,
+                        count_bytes: bool = True) -> Dict[str, Optional[str]]:
+        """
+        按文件所在设备分配线程池并行计算哈希，每个设备的并发数独立限制
+        :param stage: 阶段名称，用于进度日志
+        :param files: [(file_path, file_size), ...]
+        :param candidate_stats: {file_path: stat}
+        :param hash_func: 哈希函数，参数为 (file_path, file_size, file_stat)
+        :param count_bytes: 是否按文件大小统计读取速度，只读取部分内容的阶段不统计
+        :return: {file_path: 哈希值}，计算失败的文件值为None
+        """
+        results = {}
+        progress = ProgressAggregator(stage, len(files))
+        self._progress.set_phase(stage, len(files),
+                                 sum(file_size for _, file_size in files) if count_bytes else 0)
+        device_workers = self._resolve_device_workers()
+        self._update_throttle_rate()
+        executors = {}  # {st_dev: ThreadPoolExecutor}
+        futures = {}
+        try:
+            for file_path, file_size in files:
+                file_stat = candidate_stats.get(file_path)
+                device = file_stat.st_dev if file_stat else None
+                executor = executors.get(device)
+                if not executor:
+                    executor = ThreadPoolExecutor(max_workers=device_workers.get(device, self._hash_workers),
+                                                  thread_name_prefix=f"smarthardlink-{device}",
+                                                  initializer=lower_thread_priority if self._low_priority else None)
+                    executors[device] = executor
+                futures[executor.submit(hash_func, file_path, file_size, file_stat)] = (file_path, file_size)
+            for future in as_completed(futures):
+                if self._event.is_set():
+                    raise ScanCancelled()
+                file_path, file_size = futures[future]
+                try:
+                    results[file_path] = future.result()
+                except ScanCancelled:
+                    raise
+                except Exception as e:
+                    logger.error(f"处理文件 {file_path} 时出错: {str(e)}")
+                    results[file_path] = None
+                # 摘要来自索引或缓存的文件没有读取，不计入读取速度
+                cached = file_path in self._cached_paths
+                progress.update(file_size if count_bytes and not cached else 0)
+                self._progress.add_hashed(file_size if count_bytes else 0, cached=cached)
+                self._update_throttle_rate()
+        finally:
+            # 取消时丢弃尚未开始的任务，正在计算的文件会在下一次读取时退出
+            for executor in executors.values():
+                executor.shutdown(wait=True, cancel_futures=self._event.is_set())
+        progress.finish()
+        return results
+
+    def _get_exclusion_matcher(self) -> ExclusionMatcher:
+        """
+        获取预编译的排除规则
+        """
+        if not self._exclusion_matcher:
+            self._exclusion_matcher = ExclusionMatcher(exclude_dirs=self._exclude_dirs,
+                                                       exclude_extensions=self._exclude_extensions,
+                                                       exclude_keywords=self._exclude_keywords)
+        return self._exclusion_matcher
+
+    def _get_source_selector(self) -> SourceSelector:
+        """
+        获取源文件选择策略
+        """
+        if not self._source_selector:
+            self._source_selector = SourceSelector(policy=self._source_policy,
+                                                   preferred_roots=self._preferred_roots)
+        return self._source_selector
+
     def is_excluded(self, file_path: str) -> bool:
         """
         检查文件是否应该被排除
         """
-        # 检查排除目录
-        if self._exclude_dirs:
-            for exclude_dir in self._exclude_dirs.split("\n"):
-                if exclude_dir and file_path.startswith(exclude_dir):
-                    return True
-
-        # 检查排除文件扩展名
-        if self._exclude_extensions:
-            file_ext = os.path.splitext(file_path)[1].lower()
-            extensions = [f".{ext.strip().lower()}" for ext in self._exclude_extensions.split(",")]
-            if file_ext in extensions:
-                return True
-
-        # 检查排除关键词
-        if self._exclude_keywords:
-            for keyword in self._exclude_keywords.split("\n"):
-                if keyword and re.findall(keyword, file_path):
-                    return True
-
-        return False
+        return self._get_exclusion_matcher().is_excluded(file_path)
 
     def _save_link_history(self, summary: Dict[str, Any]):
         """
-        保存硬链接操作历史记录
+        追加硬链接操作历史记录及各阶段耗时
         :param summary: 包含本次运行摘要信息的字典
         """
+        history_store = self._get_history_store()
+        if not history_store:
+            return
+        phases = self._progress.phase_durations()
+        # 校验在链接阶段内进行，链接耗时扣除校验耗时
+        link_seconds = phases.get("创建链接", 0.0) + phases.get("检查计划", 0.0)
+        timings = {
+            "walk": phases.get("收集文件", 0.0),
+            "hash": phases.get("部分哈希", 0.0) + phases.get("完整哈希", 0.0),
+            "verify": self._verify_seconds,
+            "link": max(link_seconds - self._verify_seconds, 0.0),
+        }
         try:
-            # 读取现有历史，最多保留最近 100 条
-            history = self.get_data('link_history') or []
-            history.append(summary)
-            # 保留最新的 N 条记录 (例如 100)
-            max_history = 100
-            if len(history) > max_history:
-                history = history[-max_history:]
-            self.save_data(key="link_history", value=history)
-            logger.info(f"保存硬链接历史记录，当前共有 {len(history)} 条记录")
+            history_store.append(summary, timings, self._progress.snapshot()["bytes_hashed"])
+            logger.info(f"保存硬链接历史记录，当前共有 {history_store.count()} 条记录")
         except Exception as e:
             logger.error(f"保存硬链接历史记录失败: {str(e)}", exc_info=True)
 
-    def scan_and_process(self):
+    def process_new_files(self, paths: List[str]):
+        """
+        处理实时监控发现的新文件
+        """
+        self.scan_and_process(paths=paths)
+
+    def scan_and_process(self, incremental: bool = False, paths: Optional[List[str]] = None):
+        """
+        扫描目录并处理重复文件，同一时间只运行一个扫描任务
+        :param incremental: 增量扫描，只处理上次扫描之后新增或修改的文件，并与哈希索引中的已有文件比对
+        :param paths: 实时监控模式下只处理这些文件，并与哈希索引中的已有文件比对
+        """
+        generation = self._cancel_generation
+        with lock:
+            try:
+                if self._cancelled_while_queued(generation):
+                    return
+                # 上一次扫描的取消信号不影响本次扫描
+                self._event.clear()
+                self.__scan_and_process(incremental=incremental, paths=paths)
+            finally:
+                self._close_if_stopped()
+
+    def apply_plan(self) -> Dict[str, Any]:
+        """
+        执行最近一次试运行生成的链接计划，只比较文件状态确认未变化，不重新计算哈希，与扫描互斥
+        :return: 本次执行的历史记录
+        """
+        generation = self._cancel_generation
+        with lock:
+            try:
+                if self._cancelled_while_queued(generation):
+                    return {}
+                self._event.clear()
+                return self.__apply_plan()
+            finally:
+                self._close_if_stopped()
+
+    def _cancelled_while_queued(self, generation: int) -> bool:
+        """
+        排队等待锁期间插件已停止或已请求取消时不再运行，调用方需持有锁
+        :param generation: 开始排队时的取消代数
+        """
+        if self._stopping.is_set() or generation != self._cancel_generation:
+            logger.info("扫描在排队等待期间已被取消，不再运行")
+            return True
+        return False
+
+    @classmethod
+    def _request_cancel(cls):
+        """
+        取消正在进行和排队等待的扫描
+        """
+        cls._cancel_generation += 1
+        cls._event.set()
+
+    def _close_if_stopped(self):
+        """
+        停止插件时未能等到扫描退出的，由扫描线程在退出时关闭数据库，调用方需持有锁
+        """
+        if self._close_on_exit:
+            self._close_on_exit = False
+            self._close_stores()
+
+    def _close_stores(self):
+        """
+        关闭哈希索引和运行历史
+        """
+        if self._hash_index:
+            self._hash_index.close()
+            self._hash_index = None
+        if self._history_store:
+            self._history_store.close()
+            self._history_store = None
+
+    def __apply_plan(self) -> Dict[str, Any]:
+        plan_file = self._get_plan_file()
+        header = read_plan_header(plan_file)
+        if not header:
+            logger.error("没有可执行的链接计划，请先以试运行模式扫描")
+            return {}
+        run_start_time = datetime.datetime.now()
+        run_status = "失败"
+        error_message = ""
+        scan_mode = "执行计划"
+        self._progress.start(scan_mode)
+        try:
+            self._reset_counters()
+            created = datetime.datetime.fromtimestamp(header["created"]).strftime('%Y-%m-%d %H:%M:%S')
+            logger.info(f"开始执行 {created} 生成的链接计划：{header['groups']} 组，{header['duplicates']} 个重复文件")
+
+            self._progress.set_phase("检查计划")
+            file_hashes, preferred_sources = self._load_plan(plan_file)
+            duplicate_count = sum(len(files) - 1 for files in file_hashes.values())
+            if duplicate_count:
+                self._link_duplicates(file_hashes, duplicate_count, preferred_sources, from_plan=True)
+            # 计划已执行，再次执行时文件均已变化，没有意义
+            os.remove(plan_file)
+
+            logger.info(f"链接计划执行完成！创建{'reflink' if self._reflink else '硬链接'} {self._hardlink_count} 个，"
+                        f"节省空间 {self._format_size(self._saved_space)}，文件已变化跳过 {self._stale_count} 个")
+            run_status = "完成 (执行计划)"
+            self._send_completion_notification(dry_run=False)
+        except ScanCancelled:
+            run_status = "已取消"
+            logger.warning("执行链接计划已取消，已完成的链接不受影响，可再次执行剩余部分")
+        except Exception as e:
+            error_message = str(e)
+            logger.error(f"执行链接计划失败: {error_message}\n{traceback.format_exc()}")
+        finally:
+            self._progress.finish(run_status)
+            summary = self._build_run_summary(run_start_time, run_status, scan_mode, error_message, dry_run=False)
+            self._save_link_history(summary)
+        return summary
+
+    def _load_plan(self, plan_file: str
+                   ) -> Tuple[Dict[Tuple[int, str], List[Tuple[str, int]]], Set[str]]:
+        """
+        读取链接计划并比较文件状态，源文件已变化的组整体跳过，重复文件已变化的单独跳过
+        :return: (file_hashes, preferred_sources)，计划中的源文件优先保留
+        """
+        file_hashes = {}
+        preferred_sources = set()
+        for device, file_hash, source, duplicates in read_plan_groups(plan_file):
+            if self._event.is_set():
+                raise ScanCancelled()
+            source_file = source["path"]
+            try:
+                source_stat = os.stat(source_file)
+            except OSError:
+                source_stat = None
+            if not source_stat or is_stale(source, device, source_stat):
+                logger.warning(f"源文件 {source_file} 已删除或修改，跳过此组 {len(duplicates)} 个重复文件")
+                self._stale_count += len(duplicates)
+                continue
+            files = [(source_file, source["size"])]
+            for duplicate in duplicates:
+                dup_file = duplicate["path"]
+                try:
+                    dup_stat = os.stat(dup_file)
+                except OSError:
+                    dup_stat = None
+                if not dup_stat:
+                    # 文件已删除，不能交给执行器，否则会在原路径重新创建
+                    logger.warning(f"文件 {dup_file} 在生成计划后已删除，跳过")
+                    self._stale_count += 1
+                elif not is_stale(duplicate, device, dup_stat):
+                    files.append((dup_file, duplicate["size"]))
+                elif dup_stat.st_dev == device and dup_stat.st_ino == source_stat.st_ino:
+                    # 上次执行计划时已完成链接
+                    self._skipped_hardlinks_count += 1
+                else:
+                    logger.warning(f"文件 {dup_file} 在生成计划后已修改，跳过")
+                    self._stale_count += 1
+            self._process_count += len(files)
+            if len(files) > 1:
+                file_hashes[(device, file_hash)] = files
+                preferred_sources.add(source_file)
+        return file_hashes, preferred_sources
+
+    def _reset_counters(self):
+        """
+        重置本次运行的计数器
+        """
+        self._process_count = 0
+        self._hardlink_count = 0
+        self._saved_space = 0
+        self._hash_cache = {}
+        self._cached_paths = set()
+        self._skipped_hardlinks_count = 0 # 重置跳过计数
+        self._skipped_hash_bytes = 0
+        self._partial_filtered_count = 0
+        self._cross_device_count = 0
+        self._device_savings = {}
+        self._verified_count = 0
+        self._verify_mismatch_count = 0
+        self._verified_bytes = 0
+        self._verify_seconds = 0.0
+        self._stale_count = 0
+        self._settled_group_count = 0
+        self._settled_candidates = {}
+        self._unsettled_groups = set()
+        self._group_skipped = {}
+
+    def _build_run_summary(self, run_start_time: datetime.datetime, run_status: str, scan_mode: str,
+                           error_message: str, dry_run: bool) -> Dict[str, Any]:
         """
-        扫描目录并处理重复文件
+        构建本次运行的历史记录
         """
+        run_end_time = datetime.datetime.now()
+        return {
+            "start_time": run_start_time.strftime('%Y-%m-%d %H:%M:%S'),
+            "end_time": run_end_time.strftime('%Y-%m-%d %H:%M:%S'),
+            "duration": self._format_time((run_end_time - run_start_time).total_seconds()),
+            "status": run_status,
+            "scan_mode": scan_mode,
+            "processed_files": self._process_count,
+            "hardlinks_created": self._hardlink_count, # Record count even in dry run
+            "skipped_hardlinks": self._skipped_hardlinks_count, # 添加跳过计数
+            "skipped_hash_bytes": self._skipped_hash_bytes, # 因大小或部分哈希唯一跳过完整哈希的字节数
+            "partial_filtered": self._partial_filtered_count,
+            "skipped_hash_bytes_formatted": self._format_size(self._skipped_hash_bytes),
+            "verified_files": self._verified_count, # 链接前校验，与哈希阶段分开统计
+            "verify_mismatches": self._verify_mismatch_count,
+            "verified_bytes": self._verified_bytes,
+            "verified_bytes_formatted": self._format_size(self._verified_bytes),
+            "verify_duration": self._format_time(self._verify_seconds),
+            "cross_device_skipped": self._cross_device_count,
+            "stale_skipped": self._stale_count, # 执行计划时因文件已变化跳过的文件数
+            "settled_groups": self._settled_group_count, # 未变化而整组跳过的稳定分组数
+            "device_savings": self._device_savings_summary(),
+            "link_mode": "reflink" if self._reflink else "硬链接",
+            "space_saved": self._saved_space,
+            "space_saved_formatted": self._format_size(self._saved_space), # Record saved space even in dry run
+            "mode": "试运行" if dry_run else "实际运行",
+            "error": error_message
+        }
+
+    def __scan_and_process(self, incremental: bool, paths: Optional[List[str]]):
+        watch_mode = paths is not None
         run_start_time = datetime.datetime.now() # Record start time for duration
+        scan_time = int(time.time())
         run_status = "失败" # Default status
         error_message = ""
+        scan_mode = "实时监控" if watch_mode else ("增量扫描" if incremental else "完整扫描")
+        self._progress.start(scan_mode)
         try:
-            # 重置计数器
-            self._process_count = 0
-            self._hardlink_count = 0
-            self._saved_space = 0
-            self._hash_cache = {}
-            self._skipped_hardlinks_count = 0 # 重置跳过计数
+            self._reset_counters()
             
-            logger.info("开始扫描目录并处理重复文件 ...")
+            logger.info(f"开始{scan_mode}目录并处理重复文件 ...")
             logger.warning("提醒：本插件仍处于开发试验阶段，请确保数据安全")
             
             if not self._scan_dirs:
                 logger.error("未配置扫描目录，无法执行")
                 run_status = "失败 (未配置目录)"
                 error_message = "未配置扫描目录"
-                # --- 在此处也保存历史记录 ---
-                run_end_time = datetime.datetime.now()
-                self._save_link_history({
-                    "start_time": run_start_time.strftime('%Y-%m-%d %H:%M:%S'),
-                    "end_time": run_end_time.strftime('%Y-%m-%d %H:%M:%S'),
-                    "duration": self._format_time((run_end_time - run_start_time).total_seconds()),
-                    "status": run_status,
-                    "processed_files": self._process_count,
-                    "hardlinks_created": self._hardlink_count,
-                    "skipped_hardlinks": self._skipped_hardlinks_count,
-                    "space_saved": self._saved_space,
-                    "space_saved_formatted": self._format_size(self._saved_space),
-                    "mode": "试运行" if self._dry_run else "实际运行",
-                    "error": error_message
-                })
-                # --- 历史保存结束 ---
                 return
             
             scan_dirs = self._scan_dirs.split("\n")
+            scan_state = self.get_data("scan_state") or {}  # {scan_dir: 上次扫描开始时间}
             
-            # 第一步：收集所有文件并计算哈希值
-            file_hashes = {}  # {hash: [(file_path, file_size), ...]}
-            all_files = []  # 存储所有符合条件的文件路径和大小
-            
-            # 首先收集所有文件信息，避免在遍历时计算哈希
-            for scan_dir in scan_dirs:
-                if not scan_dir or not os.path.exists(scan_dir):
-                    logger.warning(f"扫描目录不存在: {scan_dir}")
-                    continue
-                    
-                logger.info(f"扫描目录: {scan_dir}")
-                file_count = 0
-                
-                try:
-                    for root, dirs, files in os.walk(scan_dir):
-                        # 定期报告进度
-                        if file_count > 0 and file_count % 1000 == 0:
-                            logger.info(f"目录 {scan_dir} 已发现 {file_count} 个文件")
-                            
-                        for file_name in files:
-                            file_count += 1
-                            file_path = os.path.join(root, file_name)
-                            
-                            # 跳过符号链接
-                            if os.path.islink(file_path):
-                                continue
-                                
-                            # 检查排除条件
-                            if self.is_excluded(file_path):
-                                continue
-                                
-                            try:
-                                # 检查文件大小
-                                file_size = os.path.getsize(file_path)
-                                if file_size < self._min_size * 1024:  # 转换为字节
-                                    continue
-                                    
-                                # 添加到待处理文件列表
-                                all_files.append((file_path, file_size))
-                                
-                            except Exception as e:
-                                logger.error(f"获取文件信息失败 {file_path}: {str(e)}")
-                    
-                    logger.info(f"目录 {scan_dir} 扫描完成，共发现 {file_count} 个文件")
-                except Exception as e:
-                    logger.error(f"扫描目录 {scan_dir} 时出错: {str(e)}")
-            
-            # 报告收集到的文件总数
-            total_files = len(all_files)
-            logger.info(f"符合条件的文件总数: {total_files}")
+            # 第一步：收集文件并计算哈希值
+            self._progress.set_phase("收集文件")
+            if watch_mode:
+                file_table = self._collect_paths(paths, scan_time)
+                scanned_dirs = []
+            else:
+                file_table, scanned_dirs = self._collect_files(
+                    scan_dirs, scan_time, scan_state if incremental else None)
+            hash_index = self._get_hash_index()
+            if incremental or watch_mode:
+                file_hashes, preferred_sources = self._find_new_duplicates(file_table)
+            else:
+                file_hashes = self._find_duplicates(file_table)
+                preferred_sources = set()
+                if hash_index:
+                    self._update_hash_index(hash_index, scanned_dirs, scan_time)
             
-            # 根据文件大小排序，优先处理大文件，可以更快发现重复文件节省空间
-            all_files.sort(key=lambda x: x[1], reverse=True)
-            
-            # 处理文件并计算哈希值
-            for idx, (file_path, file_size) in enumerate(all_files):
-                # 定期报告进度
-                if idx > 0 and (idx % 100 == 0 or idx == total_files - 1):
-                    logger.info(f"已处理 {idx}/{total_files} 个文件 ({(idx/total_files*100):.1f}%)")
-                
-                try:
-                    # 计算哈希值
-                    file_hash = self.calculate_file_hash(file_path)
-                    if not file_hash:
-                        continue
-                        
-                    # 记录文件信息
-                    if file_hash not in file_hashes:
-                        file_hashes[file_hash] = []
-                    file_hashes[file_hash].append((file_path, file_size))
-                    
-                    self._process_count += 1
-                except Exception as e:
-                    logger.error(f"处理文件 {file_path} 时出错: {str(e)}")
+            # 记录各目录本次扫描的开始时间，供下次增量扫描使用
+            if scanned_dirs:
+                for scan_dir in scanned_dirs:
+                    scan_state[scan_dir] = scan_time
+                self.save_data(key="scan_state", value=scan_state)
             
             # 找出重复文件的数量
             duplicate_count = sum(len(files) - 1 for files in file_hashes.values() if len(files) > 1)
             logger.info(f"发现 {duplicate_count} 个重复文件")
+            # 完整扫描在链接阶段结束后记录稳定分组
+            save_settled = hash_index and not incremental and not watch_mode
             
             # 没有重复文件时发送通知 and save history
             if duplicate_count == 0:
                 logger.info("没有发现重复文件")
+                if save_settled:
+                    self._save_settled_groups(hash_index, scan_time)
                 run_status = "完成 (无重复)"
                 notification_title = "【✅ 智能硬链接扫描完成】"
                 notification_text = (
@@ -428,99 +998,38 @@ class smarthardlink(_PluginBase):
                     f"🔍 结果：未发现重复文件\n"
                     f"━━━━━━━━━━"
                 )
-                self._send_notify_message(notification_title, notification_text)
+                # 实时监控频繁触发，无重复时不发送通知
+                if not watch_mode:
+                    self._send_notify_message(notification_title, notification_text)
                 return
             
             # 第二步：处理重复文件
-            processed_count = 0
-            for file_hash, files in file_hashes.items():
-                if len(files) <= 1:
-                    continue  # 没有重复
-                
-                processed_count += len(files) - 1
-                if processed_count % 10 == 0 or processed_count == duplicate_count:
-                    logger.info(f"已处理 {processed_count}/{duplicate_count} 个重复文件 ({(processed_count/duplicate_count*100):.1f}%)")
-                    
-                # 按文件路径排序，保持第一个文件作为源文件
-                files.sort(key=lambda x: x[0])
-                source_file, source_size = files[0]
-                
-                logger.info(f"发现重复文件组 (SHA1: {file_hash}):")
-                logger.info(f"  保留源文件: {source_file}")
-                
-                # --- 获取源文件的 inode 和设备号 ---
-                try:
-                    source_stat = os.stat(source_file)
-                    source_inode = source_stat.st_ino
-                    source_dev = source_stat.st_dev
-                except OSError as e:
-                    logger.error(f"  无法获取源文件 {source_file} 的状态信息: {e}，跳过此组")
-                    continue
-                # --- 获取结束 ---
-                
-                # 处理重复文件
-                for dup_file, dup_size in files[1:]:
-                    logger.info(f"  检查重复文件: {dup_file}")
-                    
-                    # --- 检查是否已是硬链接 ---
-                    try:
-                        dup_stat = os.stat(dup_file)
-                        # 必须在同一设备上且 inode 相同
-                        if dup_stat.st_dev == source_dev and dup_stat.st_ino == source_inode:
-                            logger.info(f"  文件 {dup_file} 已是源文件的硬链接，跳过")
-                            self._skipped_hardlinks_count += 1
-                            continue # 跳过此文件，处理下一个重复文件
-                    except OSError as e:
-                        logger.warning(f"  无法获取重复文件 {dup_file} 的状态信息: {e}，继续尝试硬链接")
-                    # --- 检查结束 ---
-                    
-                    if self._dry_run:
-                        logger.info(f"  试运行模式：将创建从 {source_file} 到 {dup_file} 的硬链接")
-                        self._hardlink_count += 1
-                        self._saved_space += dup_size
-                    else:
-                        try:
-                            # 创建临时备份文件名
-                            temp_file = f"{dup_file}.temp_{int(time.time())}"
-                            
-                            # 重命名原文件为临时文件
-                            os.rename(dup_file, temp_file)
-                            
-                            # 创建硬链接（保持原文件名）
-                            os.link(source_file, dup_file)
-                            
-                            # 删除临时文件
-                            os.remove(temp_file)
-                            
-                            logger.info(f"  已创建硬链接: {dup_file} -> {source_file}")
-                            self._hardlink_count += 1
-                            self._saved_space += dup_size
-                        except Exception as e:
-                            # 如果出错，尝试恢复原文件
-                            if 'temp_file' in locals() and os.path.exists(temp_file):
-                                try:
-                                    if os.path.exists(dup_file):
-                                        # 如果硬链接意外创建成功但后续步骤失败，先删除错误的硬链接
-                                        try:
-                                            dup_stat_after_link = os.stat(dup_file)
-                                            if dup_stat_after_link.st_dev == source_dev and dup_stat_after_link.st_ino == source_inode:
-                                                os.remove(dup_file)
-                                        except OSError:
-                                            pass # 如果获取状态或删除失败，继续尝试恢复
-                                    os.rename(temp_file, dup_file)
-                                    logger.error(f"  创建硬链接失败，已恢复原文件: {str(e)}")
-                                except Exception as recover_err:
-                                    logger.error(f"  创建硬链接失败且恢复原文件也失败: {str(recover_err)}，原文件位于: {temp_file}")
-                            else:
-                                logger.error(f"  创建硬链接失败: {str(e)}")
+            # 试运行时生成链接计划，实时监控每批文件很少，不覆盖已有计划
+            plan_file = self._get_plan_file() if self._dry_run and not watch_mode else None
+            self._link_duplicates(file_hashes, duplicate_count, preferred_sources, plan_file=plan_file)
+            if save_settled:
+                self._save_settled_groups(hash_index, scan_time)
             
             mode_str = "试运行" if self._dry_run else "实际运行"
             logger.info(f"处理完成！({mode_str}模式) 共处理文件 {self._process_count} 个，创建硬链接 {self._hardlink_count} 个，节省空间 {self._format_size(self._saved_space)}")
+            if self._verified_count:
+                logger.info(f"链接前校验 {self._verified_count} 个文件，读取 {self._format_size(self._verified_bytes)}，"
+                            f"耗时 {self._format_time(self._verify_seconds)}，不一致 {self._verify_mismatch_count} 个")
             run_status = f"完成 ({mode_str})"
 
             # 发送通知
-            self._send_completion_notification()
+            if not watch_mode or self._hardlink_count:
+                self._send_completion_notification()
             
+        except ScanCancelled:
+            run_status = "已取消"
+            # 断点续扫依赖哈希索引：保存已计算的摘要，下次扫描从这里继续；未启用索引时已计算的摘要不保留
+            hash_index = self._get_hash_index()
+            if hash_index:
+                hash_index.flush()
+                logger.warning(f"{scan_mode}已取消，已计算的哈希保存在哈希索引中，下次扫描时无需重新计算")
+            else:
+                logger.warning(f"{scan_mode}已取消，未启用哈希索引，下次扫描需要重新计算哈希")
         except Exception as e:
             run_status = "失败"
             error_message = str(e)
@@ -541,29 +1050,544 @@ class smarthardlink(_PluginBase):
                 )
             )
         finally:
-            # --- 统一保存历史记录 (无论成功或失败) ---
-            run_end_time = datetime.datetime.now()
-            self._save_link_history({
-                "start_time": run_start_time.strftime('%Y-%m-%d %H:%M:%S'),
-                "end_time": run_end_time.strftime('%Y-%m-%d %H:%M:%S'),
-                "duration": self._format_time((run_end_time - run_start_time).total_seconds()),
-                "status": run_status,
-                "processed_files": self._process_count,
-                "hardlinks_created": self._hardlink_count, # Record count even in dry run
-                "skipped_hardlinks": self._skipped_hardlinks_count, # 添加跳过计数
-                "space_saved": self._saved_space,
-                "space_saved_formatted": self._format_size(self._saved_space), # Record saved space even in dry run
-                "mode": "试运行" if self._dry_run else "实际运行",
-                "error": error_message
-            })
+            self._progress.finish(run_status)
+            # --- 统一保存历史记录 (无论成功或失败)，实时监控只记录有硬链接、失败或取消的批次 ---
+            if not watch_mode or self._hardlink_count or error_message or run_status == "已取消":
+                self._save_link_history(self._build_run_summary(run_start_time, run_status, scan_mode,
+                                                                error_message, self._dry_run))
             # --- 历史保存结束 ---
 
-    def _send_completion_notification(self):
+    def _collect_files(self, scan_dirs: List[str], scan_time: int, scan_state: Optional[Dict[str, int]] = None
+                       ) -> Tuple[FileTable, List[str]]:
+        """
+        流式收集所有文件信息存入文件表，避免在遍历时计算哈希，同时在哈希索引中登记文件
+        :param scan_dirs: 扫描目录
+        :param scan_time: 本次扫描的时间戳
+        :param scan_state: 增量扫描时传入各目录上次扫描的时间，只收集之后新增或修改的文件
+        :return: (file_table, scanned_dirs)
+            file_table: 已排序的文件表，按设备和大小分组读取，已互为硬链接的路径相邻存放
+            scanned_dirs: 成功完成遍历的目录
+        """
+        file_table = FileTable()
+        scanned_dirs = []
+        # 每次扫描重新构建排除规则
+        self._exclusion_matcher = None
+        walker = DirectoryWalker(matcher=self._get_exclusion_matcher(), min_size=self._min_size * 1024,
+                                 cancel_event=self._event)
+        hash_index = self._get_hash_index()
+        
+        for scan_dir in scan_dirs:
+            if not scan_dir or not os.path.exists(scan_dir):
+                logger.warning(f"扫描目录不存在: {scan_dir}")
+                continue
+            
+            modified_since = scan_state.get(scan_dir, 0) if scan_state is not None else 0
+            if modified_since:
+                logger.info(f"增量扫描目录: {scan_dir}，上次扫描时间 "
+                            f"{datetime.datetime.fromtimestamp(modified_since).strftime('%Y-%m-%d %H:%M:%S')}")
+            else:
+                logger.info(f"扫描目录: {scan_dir}")
+            try:
+                for file_path, file_stat in walker.walk(scan_dir, modified_since=modified_since):
+                    self._progress.add_scanned(file_stat.st_size)
+                    file_table.add(file_path, file_stat)
+                    if hash_index:
+                        hash_index.record(file_path, file_stat, scan_time)
+                
+                logger.info(f"目录 {scan_dir} 扫描完成，共发现 {walker.file_count} 个文件")
+                scanned_dirs.append(scan_dir)
+            except ScanCancelled:
+                raise
+            except Exception as e:
+                logger.error(f"扫描目录 {scan_dir} 时出错: {str(e)}")
+        
+        # 报告收集到的文件总数
+        file_table.finish()
+        logger.info(f"符合条件的文件总数: {len(file_table)}，去除已有硬链接后共 {file_table.inode_count} 个独立文件")
+        self._process_count = len(file_table)
+        return file_table, scanned_dirs
+
+    def _collect_paths(self, paths: List[str], scan_time: int) -> FileTable:
+        """
+        收集指定文件的信息存入文件表，规则与目录遍历一致
+        :param paths: 文件路径列表
+        :param scan_time: 本次扫描的时间戳
+        :return: 已排序的文件表，含义同 _collect_files
+        """
+        file_table = FileTable()
+        self._exclusion_matcher = None
+        matcher = self._get_exclusion_matcher()
+        hash_index = self._get_hash_index()
+        for file_path in paths:
+            if matcher.is_excluded(file_path):
+                continue
+            try:
+                file_stat = os.lstat(file_path)
+            except OSError:
+                # 文件在处理前已被删除或移走
+                continue
+            # 符号链接及管道等特殊文件不处理
+            if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size < self._min_size * 1024:
+                continue
+            self._progress.add_scanned(file_stat.st_size)
+            file_table.add(file_path, file_stat)
+            if hash_index:
+                hash_index.record(file_path, file_stat, scan_time)
+        file_table.finish()
+        self._process_count = len(file_table)
+        return file_table
+
+    def _stat_candidates(self, files: List[Tuple[str, int]], candidate_stats: Dict[str, os.stat_result]):
+        """
+        获取候选文件的stat信息，用于按设备分配线程及读写持久化哈希索引
+        """
+        for file_path, _ in files:
+            try:
+                candidate_stats[file_path] = os.stat(file_path)
+            except OSError as e:
+                logger.error(f"获取文件信息失败 {file_path}: {str(e)}")
+
+    @staticmethod
+    def _expand_inodes(file_table: FileTable, file_size: int, device: int, inodes: List[List[int]],
+                       inode_paths: Dict[Tuple[int, int], List[str]]) -> List[Tuple[str, int]]:
+        """
+        将文件表中的一组文件展开为路径，只对需要计算哈希的候选文件生成路径字符串
+        :param inodes: [[同一inode的行号, ...], ...]
+        :param inode_paths: 登记各inode的全部路径 {(st_dev, st_ino): [file_path, ...]}
+        :return: [(file_path, file_size), ...]，每个inode只保留第一个路径
+        """
+        files = []
+        for rows in inodes:
+            paths = [file_table.path(row) for row in rows]
+            inode_paths[(device, file_table.inodes[rows[0]])] = paths
+            files.append((paths[0], file_size))
+        return files
+
+    def _find_duplicates(self, file_table: FileTable) -> Dict[Tuple[int, str], List[Tuple[str, int]]]:
+        """
+        完整扫描：在本次收集的文件之间查找重复文件
+        :return: {(st_dev, hash): [(file_path, file_size), ...]}
+        """
+        # 同一设备上大小唯一的文件不可能被链接，无需计算哈希；其他设备上的同大小文件无法硬链接，不影响判断
+        inode_paths = {}  # {(st_dev, st_ino): [file_path, ...]}，只包含候选文件
+        size_candidates = [(device, file_size, self._expand_inodes(file_table, file_size, device, inodes, inode_paths))
+                           for file_size, device, inodes in file_table.size_groups()]
+        unique_count, unique_bytes, cross_device, existing_links = file_table.single_inode_summary()
+        self._skipped_hash_bytes += unique_bytes
+        self._cross_device_count += cross_device
+        # 不参与去重的inode，其多余路径本身就是已存在的硬链接
+        self._skipped_hardlinks_count += existing_links
+        
+        size_candidate_count = sum(len(files) for _, _, files in size_candidates)
+        logger.info(f"大小相同的候选文件: {size_candidate_count} 个，"
+                    f"跳过 {unique_count} 个大小唯一的文件 ({self._format_size(self._skipped_hash_bytes)})")
+        if self._cross_device_count:
+            logger.info(f"其中 {self._cross_device_count} 个文件仅与其他设备上的文件大小相同，无法硬链接，已跳过")
+        
+        # 同大小的文件先计算部分哈希，指纹唯一的文件不可能重复，无需计算完整哈希
+        hash_index = self._get_hash_index()
+        candidate_stats = {}  # {file_path: stat}
+        hash_candidates = []
+        partial_buckets = []
+        for device, file_size, files in size_candidates:
+            self._stat_candidates(files, candidate_stats)
+            # 与上次完整扫描后的稳定状态相同时整组跳过，无需哈希和逐个检查链接
+            if hash_index and self._check_settled(hash_index, device, file_size, files, candidate_stats,
+                                                  inode_paths):
+                continue
+            # 整组文件都已在索引中时，直接使用索引中的摘要，不再读取文件
+            if hash_index and all(file_path in candidate_stats and hash_index.get(candidate_stats[file_path])
+                                  for file_path, _ in files):
+                hash_candidates.extend(files)
+            else:
+                partial_buckets.append(files)
+        
+        fingerprints = self._run_hash_tasks(
+            "部分哈希", [item for files in partial_buckets for item in files], candidate_stats,
+            lambda file_path, file_size, file_stat: self.calculate_partial_hash(file_path, file_size),
+            count_bytes=False)
+        for files in partial_buckets:
+            fingerprint_groups = {}  # {fingerprint: [(file_path, file_size), ...]}
+            for file_path, file_size in files:
+                fingerprint_groups.setdefault(fingerprints.get(file_path), []).append((file_path, file_size))
+            for fingerprint, group in fingerprint_groups.items():
+                # 无法计算指纹（文件过小或读取失败）的文件直接进入完整哈希阶段
+                if fingerprint is None or len(group) > 1:
+                    hash_candidates.extend(group)
+                else:
+                    self._partial_filtered_count += 1
+                    self._skipped_hash_bytes += group[0][1]
+        
+        if self._settled_group_count:
+            logger.info(f"{self._settled_group_count} 组文件自上次扫描后未变化，已跳过")
+        if self._partial_filtered_count:
+            logger.info(f"部分哈希排除 {self._partial_filtered_count} 个文件，需计算完整哈希的文件: {len(hash_candidates)} 个")
+        
+        inode_hashes = self._hash_candidates(hash_candidates, candidate_stats)
+        return self._build_duplicate_groups(inode_hashes, inode_paths, candidate_stats)
+
+    def _check_settled(self, hash_index: HashIndex, device: int, file_size: int, files: List[Tuple[str, int]],
+                       candidate_stats: Dict[str, os.stat_result],
+                       inode_paths: Dict[Tuple[int, int], List[str]]) -> bool:
+        """
+        检查大小分组是否为稳定分组：上次完整扫描后没有需要链接的文件，且各inode的链接数和修改时间均未变化
+        不是稳定分组时登记签名，链接阶段结束后没有链接操作的分组记为稳定分组
+        :param files: 分组内的候选文件，每个inode一个路径
+        :return: 是否整组跳过
+        """
+        if any(file_path not in candidate_stats for file_path, _ in files):
+            return False
+        group_key = (device, file_size)
+        signature = settled_signature((candidate_stats[file_path] for file_path, _ in files),
+                                      "reflink" if self._reflink else "hardlink")
+        self._settled_candidates[group_key] = signature
+        settled = hash_index.get_settled(device, file_size)
+        if not settled or settled[0] != signature:
+            return False
+        # 整组跳过，已存在的链接数沿用上次统计的结果
+        for file_path, _ in files:
+            inode_paths.pop((device, candidate_stats[file_path].st_ino), None)
+        self._settled_group_count += 1
+        self._add_skipped_links(group_key, settled[1])
+        return True
+
+    def _add_skipped_links(self, group_key: Optional[Tuple[int, int]], count: int = 1):
+        """
+        统计已存在的链接，同时按大小分组累计，记录稳定分组时使用
+        :param group_key: (st_dev, 文件大小)，为None时只计入总数
+        """
+        self._skipped_hardlinks_count += count
+        if group_key:
+            self._group_skipped[group_key] = self._group_skipped.get(group_key, 0) + count
+
+    def _save_settled_groups(self, hash_index: HashIndex, scan_time: int):
+        """
+        完整扫描结束后记录稳定分组，有链接操作或读取失败的分组下次重新检查
+        """
+        settled = [(device, file_size, signature, self._group_skipped.get((device, file_size), 0))
+                   for (device, file_size), signature in self._settled_candidates.items()
+                   if (device, file_size) not in self._unsettled_groups]
+        try:
+            expired = hash_index.save_settled(settled, list(self._unsettled_groups), scan_time)
+            logger.info(f"稳定分组 {len(settled)} 组，待下次检查 {len(self._unsettled_groups)} 组，"
+                        f"清理过期分组 {expired} 组")
+        except Exception as e:
+            logger.error(f"保存稳定分组失败: {str(e)}")
+
+    def _find_new_duplicates(self, file_table: FileTable
+                             ) -> Tuple[Dict[Tuple[int, str], List[Tuple[str, int]]], Set[str]]:
+        """
+        增量扫描：新文件之间以及新文件与哈希索引中的已有文件之间查找重复文件
+        :return: ({(st_dev, hash): [(file_path, file_size), ...]}, 作为源文件优先保留的已有文件路径)
+        """
+        hash_index = self._get_hash_index()
+        if not hash_index:
+            logger.warning("未启用哈希索引，增量扫描只能在新文件之间查找重复")
+        
+        # 新文件大小既不与同设备的其他新文件相同、也不存在于索引中时不可能重复
+        # 新文件在遍历时已登记到索引中，查询时排除，否则每个新文件都会与自身的记录匹配
+        indexed_sizes = hash_index.existing_sizes(file_table.unique_sizes(), exclude_inodes=file_table.inode_keys()) \
+            if hash_index else set()
+        inode_paths = {}  # {(st_dev, st_ino): [file_path, ...]}，只包含候选文件
+        size_devices = {}  # {file_size: {st_dev, ...}}，只包含索引中存在的大小
+        hash_candidates = []
+        for file_size, device, inodes in file_table.size_groups(include_sizes=indexed_sizes):
+            hash_candidates.extend(self._expand_inodes(file_table, file_size, device, inodes, inode_paths))
+            if file_size in indexed_sizes:
+                size_devices.setdefault(file_size, set()).add(device)
+        _, unique_bytes, _, existing_links = file_table.single_inode_summary(exclude_sizes=indexed_sizes)
+        self._skipped_hash_bytes += unique_bytes
+        self._skipped_hardlinks_count += existing_links
+        logger.info(f"需要计算哈希的新文件: {len(hash_candidates)} 个")
+        
+        candidate_stats = {}  # {file_path: stat}
+        self._stat_candidates(hash_candidates, candidate_stats)
+        
+        # 从索引中补充大小相同的已有文件，尚未计算摘要的已有文件一并计算，已有文件优先作为源文件
+        preferred_sources = set()
+        if hash_index:
+            new_inodes = set(inode_paths.keys())
+            for file_size in indexed_sizes:
+                devices = size_devices.get(file_size, set())
+                for dev, ino, mtime_ns, path, _ in hash_index.find_by_size(file_size):
+                    # 跨设备的文件无法硬链接
+                    if (dev, ino) in new_inodes or dev not in devices:
+                        continue
+                    try:
+                        file_stat = os.stat(path)
+                    except OSError:
+                        continue
+                    # 索引记录已过期（文件被替换或修改）时不使用
+                    if (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns) \
+                            != (dev, ino, file_size, mtime_ns):
+                        continue
+                    new_inodes.add((dev, ino))
+                    candidate_stats[path] = file_stat
+                    hash_candidates.append((path, file_size))
+                    preferred_sources.add(path)
+        
+        inode_hashes = self._hash_candidates(hash_candidates, candidate_stats)
+        return self._build_duplicate_groups(inode_hashes, inode_paths, candidate_stats), preferred_sources
+
+    def _hash_candidates(self, hash_candidates: List[Tuple[str, int]],
+                         candidate_stats: Dict[str, os.stat_result]
+                         ) -> Dict[Tuple[int, str], List[Tuple[str, int]]]:
+        """
+        并行计算完整哈希值，按所在设备和摘要分组
+        :return: {(st_dev, hash): [(file_path, file_size), ...]}，每个inode一个路径，不同设备上的相同文件分属不同组
+        """
+        # 根据文件大小排序，优先处理大文件，可以更快发现重复文件节省空间
+        hash_candidates.sort(key=lambda x: x[1], reverse=True)
+        full_hashes = self._run_hash_tasks(
+            "完整哈希", hash_candidates, candidate_stats,
+            lambda file_path, file_size, file_stat: self.calculate_file_hash(file_path, file_stat))
+        inode_hashes = {}
+        for file_path, file_size in hash_candidates:
+            file_hash = full_hashes.get(file_path)
+            if not file_hash or file_path not in candidate_stats:
+                if file_path in candidate_stats:
+                    # 读取失败的分组下次完整扫描时重新检查
+                    self._unsettled_groups.add((candidate_stats[file_path].st_dev, file_size))
+                continue
+            inode_hashes.setdefault((candidate_stats[file_path].st_dev, file_hash), []).append((file_path, file_size))
+        return inode_hashes
+
+    def _build_duplicate_groups(self, inode_hashes: Dict[Tuple[int, str], List[Tuple[str, int]]],
+                                inode_paths: Dict[Tuple[int, int], List[str]],
+                                candidate_stats: Dict[str, os.stat_result]
+                                ) -> Dict[Tuple[int, str], List[Tuple[str, int]]]:
+        """
+        构建重复文件组，只有包含多个inode的组才是重复文件，同一inode的其他路径直接加入同组
+        :return: {(st_dev, hash): [(file_path, file_size), ...]}
+        """
+        file_hashes = {}
+        for group_key, files in inode_hashes.items():
+            if len(files) < 2:
+                continue
+            file_hashes[group_key] = []
+            for file_path, file_size in files:
+                file_stat = candidate_stats[file_path]
+                for inode_path in inode_paths.get((file_stat.st_dev, file_stat.st_ino), [file_path]):
+                    file_hashes[group_key].append((inode_path, file_size))
+            # 组内每个inode各一份数据，保留一份后其余均可回收
+            self._progress.add_duplicates(1, len(file_hashes[group_key]) - 1, (len(files) - 1) * files[0][1])
+        
+        # 未进入任何重复组的inode，其多余路径本身就是已存在的硬链接
+        grouped_paths = {file_path for files in file_hashes.values() for file_path, _ in files}
+        for paths in inode_paths.values():
+            if len(paths) > 1 and paths[0] not in grouped_paths:
+                file_stat = candidate_stats.get(paths[0])
+                self._add_skipped_links((file_stat.st_dev, file_stat.st_size) if file_stat else None, len(paths) - 1)
+        return file_hashes
+
+    def _link_duplicates(self, file_hashes: Dict[Tuple[int, str], List[Tuple[str, int]]], duplicate_count: int,
+                         preferred_sources: Set[str], plan_file: Optional[str] = None, from_plan: bool = False):
+        """
+        将重复文件替换为源文件的硬链接（或reflink副本）
+        :param file_hashes: {(st_dev, hash): [(file_path, file_size), ...]}
+        :param duplicate_count: 重复文件总数，用于进度日志
+        :param preferred_sources: 优先作为源文件保留的路径
+        :param plan_file: 试运行时将结果写入此链接计划文件
+        :param from_plan: 执行链接计划，忽略试运行设置，内容已在生成计划时确认，不再校验
+        """
+        self._progress.set_phase("创建链接", duplicate_count)
+        executor = None
+        plan_writer = None
+        if from_plan or not self._dry_run:
+            executor = LinkExecutor(self._get_journal_file(), on_complete=self._on_link_complete,
+                                    strategy=STRATEGY_REFLINK if self._reflink else self._link_strategy)
+        elif plan_file:
+            plan_writer = PlanWriter(plan_file, self._hash_algorithm)
+        try:
+            self._submit_duplicates(file_hashes, duplicate_count, preferred_sources, executor, plan_writer,
+                                    verify=not from_plan)
+        except Exception:
+            if plan_writer:
+                plan_writer.abort()
+                plan_writer = None
+            raise
+        finally:
+            if executor:
+                executor.close()
+            if plan_writer:
+                plan_writer.close()
+                logger.info(f"链接计划已保存到 {plan_file}：{plan_writer.group_count} 组，"
+                            f"{plan_writer.duplicate_count} 个重复文件，"
+                            f"可节省 {self._format_size(plan_writer.reclaimable_bytes)}")
+
+    def _submit_duplicates(self, file_hashes: Dict[Tuple[int, str], List[Tuple[str, int]]], duplicate_count: int,
+                           preferred_sources: Set[str], executor: Optional[LinkExecutor],
+                           plan_writer: Optional[PlanWriter] = None, verify: bool = True):
+        """
+        逐组确定源文件并检查重复文件，未传入执行器时为试运行，只统计并写入链接计划，否则提交给硬链接执行器
+        """
+        link_name = "reflink" if self._reflink else "硬链接"
+        processed_count = 0
+        for (device, file_hash), files in file_hashes.items():
+            if self._event.is_set():
+                raise ScanCancelled()
+            if len(files) <= 1:
+                continue  # 没有重复
+            
+            processed_count += len(files) - 1
+            if processed_count % 10 == 0 or processed_count == duplicate_count:
+                logger.info(f"已处理 {processed_count}/{duplicate_count} 个重复文件 ({(processed_count/duplicate_count*100):.1f}%)")
+                
+            # 按源文件选择策略排序，第一个文件作为源文件，优先保留的文件排在最前
+            files = self._get_source_selector().order(files, preferred_sources)
+            source_file, source_size = files[0]
+            
+            logger.info(f"发现重复文件组 ({self._hash_algorithm}: {file_hash}):")
+            logger.info(f"  保留源文件: {source_file}")
+            
+            # --- 获取源文件的 inode 和设备号 ---
+            try:
+                source_stat = os.stat(source_file)
+                source_inode = source_stat.st_ino
+                source_dev = source_stat.st_dev
+            except OSError as e:
+                logger.error(f"  无法获取源文件 {source_file} 的状态信息: {e}，跳过此组")
+                self._unsettled_groups.add((device, source_size))
+                continue
+            # --- 获取结束 ---
+            
+            # 处理重复文件，同一inode的多个路径全部替换后才释放一份空间
+            released_inodes = set()
+            planned = []
+            verify_enabled = verify and (self._verify_bytes or self._get_verify_hasher() is not None)
+            source_digest = None
+            verified_inodes = set()
+            for dup_file, dup_size in files[1:]:
+                logger.info(f"  检查重复文件: {dup_file}")
+                self._progress.add_checked()
+                
+                # --- 检查是否已是硬链接 ---
+                try:
+                    dup_stat = os.stat(dup_file)
+                except OSError as e:
+                    # 文件可能在扫描后已被删除，不能交给执行器重新创建
+                    logger.warning(f"  无法获取重复文件 {dup_file} 的状态信息: {e}，跳过")
+                    self._unsettled_groups.add((device, source_size))
+                    continue
+                dup_key = (dup_stat.st_dev, dup_stat.st_ino)
+                # 必须在同一设备上且 inode 相同
+                if dup_stat.st_dev == source_dev and dup_stat.st_ino == source_inode:
+                    logger.info(f"  文件 {dup_file} 已是源文件的硬链接，跳过")
+                    self._add_skipped_links((device, source_size))
+                    continue # 跳过此文件，处理下一个重复文件
+                # reflink 后仍是独立的inode，通过数据块位置判断是否已去重
+                if self._reflink and shares_extents(source_file, dup_file):
+                    logger.info(f"  文件 {dup_file} 已与源文件共享数据块，跳过")
+                    self._add_skipped_links((device, source_size))
+                    continue
+                # --- 检查结束 ---
+                
+                # 摘要仅用于筛选，链接前按需逐字节或用SHA1确认，同一inode只校验一次
+                if verify_enabled and dup_key not in verified_inodes:
+                    matched, source_digest = self._verify_duplicate(source_file, source_digest, dup_file, dup_size)
+                    if not matched:
+                        if matched is None:
+                            # 校验失败而非内容不一致，下次完整扫描时重新检查
+                            self._unsettled_groups.add((device, source_size))
+                        logger.warning(f"  文件 {dup_file} 与源文件内容不一致，跳过")
+                        continue
+                    verified_inodes.add(dup_key)
+                
+                self._unsettled_groups.add((device, source_size))
+                if not executor:
+                    logger.info(f"  试运行模式：将创建从 {source_file} 到 {dup_file} 的{link_name}")
+                    self._hardlink_count += 1
+                    self._progress.add_linked()
+                    self._record_saving(device, dup_key, dup_size, released_inodes)
+                    planned.append(file_entry(dup_file, dup_stat))
+                else:
+                    # 由执行器记录日志后按配置的替换方式批量完成
+                    # 实时监控时忽略替换产生的事件，避免已链接的文件作为新文件再次处理
+                    if self._watcher:
+                        self._watcher.suppress(dup_file)
+                    executor.submit(source_file, dup_file, source_stat,
+                                    context=(device, dup_key, dup_size, released_inodes), target_stat=dup_stat)
+            if plan_writer and planned:
+                # 同一inode的多个路径只回收一份空间
+                reclaimable = sum({entry["ino"]: entry["size"] for entry in planned}.values())
+                plan_writer.add_group(device, file_hash, file_entry(source_file, source_stat), planned, reclaimable)
+
+    def _on_link_complete(self, operation: LinkOperation):
+        """
+        硬链接执行器完成一个操作后更新统计
+        """
+        device, dup_key, dup_size, released_inodes = operation.context
+        if self._watcher:
+            self._watcher.release(operation.target)
+        if not operation.success:
+            logger.error(f"  {operation.target}: {operation.error}")
+            return
+        logger.info(f"  已创建{'reflink' if self._reflink else '硬链接'}: {operation.target} -> {operation.source}")
+        self._hardlink_count += 1
+        self._progress.add_linked()
+        self._record_saving(device, dup_key, dup_size, released_inodes)
+
+    def _record_saving(self, device: int, dup_key: Any, dup_size: int, released_inodes: Set[Any]):
+        """
+        统计节省的空间，同一inode的多个路径全部替换后只计算一次，并按设备分别累计
+        """
+        if dup_key in released_inodes:
+            return
+        released_inodes.add(dup_key)
+        self._saved_space += dup_size
+        self._device_savings[device] = self._device_savings.get(device, 0) + dup_size
+
+    def _device_savings_summary(self) -> List[Dict[str, Any]]:
+        """
+        按设备汇总节省的空间，设备以 主设备号:次设备号 及其上的扫描目录标识
+        """
+        device_dirs = {}
+        for scan_dir in self._scan_dirs.split("\n"):
+            try:
+                device_dirs.setdefault(os.stat(scan_dir).st_dev, []).append(scan_dir)
+            except OSError:
+                continue
+        return [{
+            "device": f"{os.major(device)}:{os.minor(device)}",
+            "dirs": ", ".join(device_dirs.get(device, [])),
+            "space_saved": saved,
+            "space_saved_formatted": self._format_size(saved),
+        } for device, saved in sorted(self._device_savings.items())]
+
+    @staticmethod
+    def _update_hash_index(hash_index: HashIndex, scanned_dirs: List[str], scan_time: int):
+        """
+        完整扫描后更新哈希索引：删除扫描目录下本次未见到（已删除）的文件记录
+        """
+        try:
+            hash_index.flush()
+            removed = hash_index.purge_unseen(scanned_dirs, scan_time)
+            remaining = hash_index.count()
+            logger.info(f"哈希索引共 {remaining} 条记录，清理已删除文件记录 {removed} 条")
+            # 删除的记录较多时压缩数据库文件
+            if removed and removed * 10 >= remaining:
+                hash_index.compact()
+        except Exception as e:
+            logger.error(f"更新哈希索引失败: {str(e)}")
+
+    def _send_completion_notification(self, dry_run: Optional[bool] = None):
         """
         发送任务完成通知
+        :param dry_run: 是否为试运行，默认按配置，执行链接计划时为False
         """
+        if dry_run is None:
+            dry_run = self._dry_run
         # 构建通知内容
-        if self._dry_run:
+        verify_text = ""
+        if self._verified_count:
+            verify_text = (f"🔬 链接前校验：{self._verified_count} 个，不一致 {self._verify_mismatch_count} 个，"
+                           f"耗时 {self._format_time(self._verify_seconds)}\n")
+        # 涉及多个设备时分别列出各设备节省的空间
+        device_text = ""
+        if len(self._device_savings) > 1:
+            device_text = "".join(f"  💽 {item['dirs'] or item['device']}：{item['space_saved_formatted']}\n"
+                                  for item in self._device_savings_summary())
+        if dry_run:
             title = "【✅ 智能硬链接扫描完成】"
             text = (
                 f"📢 执行结果（试运行模式）\n"
@@ -572,10 +1596,12 @@ class smarthardlink(_PluginBase):
                 f"📁 扫描文件：{self._process_count} 个\n"
                 f"🔍 重复文件：{self._hardlink_count} 个\n"
                 f"⏭️ 已跳过链接：{self._skipped_hardlinks_count} 个\n"
+                f"{verify_text}"
                 f"💾 可节省空间：{self._format_size(self._saved_space)}\n"
+                f"{device_text}"
                 f"━━━━━━━━━━\n"
                 f"⚠️ 这是试运行模式，没有创建实际硬链接\n"
-                f"💡 在设置中关闭试运行模式可实际执行硬链接操作"
+                f"💡 在设置中关闭试运行模式可实际执行硬链接操作，或使用 /hardlink_apply_plan 执行本次生成的链接计划"
             )
         else:
             title = "【✅ 智能硬链接处理完成】"
@@ -586,7 +1612,9 @@ class smarthardlink(_PluginBase):
                 f"📁 扫描文件：{self._process_count} 个\n"
                 f"🔗 已创建硬链接：{self._hardlink_count} 个\n"
                 f"⏭️ 已跳过链接：{self._skipped_hardlinks_count} 个\n"
+                f"{verify_text}"
                 f"💾 已节省空间：{self._format_size(self._saved_space)}\n"
+                f"{device_text}"
                 f"━━━━━━━━━━"
             )
         
@@ -621,6 +1649,13 @@ class smarthardlink(_PluginBase):
                 "desc": "智能硬链接扫描",
                 "category": "",
                 "data": {"action": "hardlink_scan"},
+            },
+            {
+                "cmd": "/hardlink_apply_plan",
+                "event": EventType.PluginAction,
+                "desc": "执行智能硬链接计划",
+                "category": "",
+                "data": {"action": "hardlink_apply_plan"},
             }
         ]
 
@@ -632,24 +1667,73 @@ class smarthardlink(_PluginBase):
                 "methods": ["GET"],
                 "summary": "智能硬链接扫描",
                 "description": "扫描目录并处理重复文件",
-            }
-        ]
-
+            },
+            {
+                "path": "/hash_index_compact",
+                "endpoint": self.api_compact_index,
+                "methods": ["GET"],
+                "summary": "清理哈希索引",
+                "description": "删除哈希索引中已不存在文件的记录并压缩数据库",
+            },
+            {
+                "path": "/cancel_scan",
+                "endpoint": self.api_cancel,
+                "methods": ["GET"],
+                "summary": "取消扫描",
+                "description": "取消正在进行的扫描，已计算的哈希保留在索引中供下次扫描使用",
+            },
+            {
+                "path": "/plan",
+                "endpoint": self.api_plan,
+                "methods": ["GET"],
+                "summary": "链接计划",
+                "description": "最近一次试运行生成的链接计划的组数、重复文件数和可节省空间",
+            },
+            {
+                "path": "/apply_plan",
+                "endpoint": self.api_apply_plan,
+                "methods": ["GET"],
+                "summary": "执行链接计划",
+                "description": "按最近一次试运行生成的链接计划创建硬链接，只检查文件是否变化，不重新计算哈希",
+            },
+            {
+                "path": "/progress",
+                "endpoint": self.api_progress,
+                "methods": ["GET"],
+                "summary": "扫描进度",
+                "description": "当前或最近一次扫描的阶段、吞吐量、预计剩余时间及重复文件统计",
+            },
+            {
+                "path": "/history_trends",
+                "endpoint": self.api_history_trends,
+                "methods": ["GET"],
+                "summary": "运行趋势",
+                "description": "按天、周或月汇总的节省空间、创建链接数、各阶段耗时及平均哈希速度",
+            }
+        ]
+
     def get_service(self) -> List[Dict[str, Any]]:
         """
         注册插件公共服务
         """
+        services = []
         if self._enabled and self._cron:
-            return [
-                {
-                    "id": "smarthardlink",
-                    "name": "智能硬链接定时扫描服务",
-                    "trigger": CronTrigger.from_crontab(self._cron),
-                    "func": self.scan_and_process,
-                    "kwargs": {},
-                }
-            ]
-        return []
+            services.append({
+                "id": "smarthardlink",
+                "name": "智能硬链接定时扫描服务",
+                "trigger": CronTrigger.from_crontab(self._cron),
+                "func": self.scan_and_process,
+                "kwargs": {},
+            })
+        if self._enabled and self._incremental_cron:
+            services.append({
+                "id": "smarthardlink_incremental",
+                "name": "智能硬链接增量扫描服务",
+                "trigger": CronTrigger.from_crontab(self._incremental_cron),
+                "func": self.scan_and_process,
+                "kwargs": {"incremental": True},
+            })
+        return services
 
     def api_scan(self) -> schemas.Response:
         """
@@ -663,6 +1747,83 @@ class smarthardlink(_PluginBase):
             "saved_space_formatted": self._format_size(self._saved_space)
         })
 
+    def api_cancel(self) -> schemas.Response:
+        """
+        API调用取消正在进行的扫描
+        已计算的摘要只在启用哈希索引时保留，下次扫描从中断处继续
+        """
+        if not lock.locked():
+            return schemas.Response(success=False, message="当前没有正在进行的扫描")
+        self._request_cancel()
+        logger.info("已请求取消扫描，将在当前文件处理完成后停止")
+        return schemas.Response(success=True)
+
+    def api_plan(self) -> schemas.Response:
+        """
+        API调用获取链接计划信息
+        """
+        header = read_plan_header(self._get_plan_file())
+        if not header:
+            return schemas.Response(success=False, message="没有可执行的链接计划")
+        return schemas.Response(success=True, data={
+            **header,
+            "bytes_formatted": self._format_size(header["bytes"]),
+            "plan_file": self._get_plan_file(),
+        })
+
+    def api_apply_plan(self) -> schemas.Response:
+        """
+        API调用执行链接计划
+        """
+        summary = self.apply_plan()
+        if not summary or summary.get("error"):
+            return schemas.Response(success=False, message=summary.get("error") or "没有可执行的链接计划")
+        return schemas.Response(success=True, data=summary)
+
+    def api_progress(self) -> schemas.Response:
+        """
+        API调用获取扫描进度
+        """
+        return schemas.Response(success=True, data=self._progress.snapshot())
+
+    def api_history_trends(self, period: str = "week", limit: int = 12) -> schemas.Response:
+        """
+        API调用获取运行趋势
+        :param period: 统计周期，day、week 或 month
+        :param limit: 最多返回的周期数
+        """
+        if period not in PERIOD_FORMATS:
+            return schemas.Response(success=False, message=f"不支持的统计周期: {period}")
+        try:
+            limit = max(int(limit), 1)
+        except (ValueError, TypeError):
+            limit = 12
+        history_store = self._get_history_store()
+        if not history_store:
+            return schemas.Response(success=False, message="运行历史不可用")
+        return schemas.Response(success=True, data={
+            "totals": history_store.totals(),
+            "trends": history_store.trends(period, limit),
+        })
+
+    def api_compact_index(self) -> schemas.Response:
+        """
+        API调用清理并压缩哈希索引
+        """
+        hash_index = self._get_hash_index()
+        if not hash_index:
+            return schemas.Response(success=False, message="哈希索引未启用")
+        try:
+            removed = hash_index.prune_missing()
+            hash_index.compact()
+            return schemas.Response(success=True, data={
+                "removed": removed,
+                "remaining": hash_index.count()
+            })
+        except Exception as e:
+            logger.error(f"清理哈希索引失败: {str(e)}")
+            return schemas.Response(success=False, message=str(e))
+
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         # --- Reverting Switch style and making Alerts more compact --- 
         return [
@@ -697,150 +1858,549 @@ class smarthardlink(_PluginBase):
                         'props': {'cols': 12},
                         'content': [
                             {
-                                'component': 'VAlert',
-                                'props': {
-                                    'type': 'warning',
-                                    'variant': 'tonal',
-                                    'class': 'mb-3', # Reduced margin
-                                    'density': 'compact', # Make alert denser
-                                    'icon': 'mdi-alert',
-                                    'text': "本插件仍处于开发试验阶段，不排除与其他监控类、硬链接类插件冲突，使用前请务必考虑好数据安全，如有损失，本插件概不负责。强烈建议先在不重要的目录进行测试。",
-                                },
-                            }
-                        ],
-                    }
-                ],
-            },
-            # --- Basic Settings Section ---
-            {
-                'component': 'VCard',
-                'props': {'variant': 'outlined', 'class': 'mb-4'},
-                'content': [
-                    {
-                        'component': 'VCardTitle',
-                        'props': {'class': 'd-flex align-center text-h6 py-3'},
-                        'content': [
-                            {'component': 'VIcon', 'props': {'icon': 'mdi-cog', 'color': 'primary', 'class': 'mr-2'}},
-                            {'component': 'span', 'text': '基础设置'}
-                        ]
-                    },
-                    {'component': 'VDivider'},
-                    {
-                        'component': 'VCardText',
-                        'content': [
-                            # Switches Row (Reverted style)
+                                'component': 'VAlert',
+                                'props': {
+                                    'type': 'warning',
+                                    'variant': 'tonal',
+                                    'class': 'mb-3', # Reduced margin
+                                    'density': 'compact', # Make alert denser
+                                    'icon': 'mdi-alert',
+                                    'text': "本插件仍处于开发试验阶段，不排除与其他监控类、硬链接类插件冲突，使用前请务必考虑好数据安全，如有损失，本插件概不负责。强烈建议先在不重要的目录进行测试。",
+                                },
+                            }
+                        ],
+                    }
+                ],
+            },
+            # --- Basic Settings Section ---
+            {
+                'component': 'VCard',
+                'props': {'variant': 'outlined', 'class': 'mb-4'},
+                'content': [
+                    {
+                        'component': 'VCardTitle',
+                        'props': {'class': 'd-flex align-center text-h6 py-3'},
+                        'content': [
+                            {'component': 'VIcon', 'props': {'icon': 'mdi-cog', 'color': 'primary', 'class': 'mr-2'}},
+                            {'component': 'span', 'text': '基础设置'}
+                        ]
+                    },
+                    {'component': 'VDivider'},
+                    {
+                        'component': 'VCardText',
+                        'content': [
+                            # Switches Row (Reverted style)
+                            {
+                                'component': 'VRow',
+                                'class': 'align-center mb-2',
+                                'content': [
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 3},
+                                        'content': [
+                                            {
+                                                'component': 'VSwitch',
+                                                'props': {
+                                                    'model': 'enabled',
+                                                    'label': '启用插件',
+                                                    'color': 'primary',
+                                                    # 'inset': False, # Reverted
+                                                    # 'hide-details': False # Reverted
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 3},
+                                        'content': [
+                                            {
+                                                'component': 'VSwitch',
+                                                'props': {
+                                                    'model': 'onlyonce',
+                                                    'label': '立即运行一次',
+                                                    # 'inset': False,
+                                                    # 'hide-details': False
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 3},
+                                        'content': [
+                                            {
+                                                'component': 'VSwitch',
+                                                'props': {
+                                                    'model': 'dry_run',
+                                                    'label': '试运行模式',
+                                                    'hint': '开启后不实际创建链接', # Reverted to hint
+                                                    # 'inset': False,
+                                                    'persistent-hint': True
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 3},
+                                        'content': [
+                                            {
+                                                'component': 'VSwitch',
+                                                'props': {
+                                                    'model': 'hash_index',
+                                                    'label': '持久化哈希索引',
+                                                    'hint': '未变化的文件不再重复读取计算，取消的扫描下次从已计算的位置继续',
+                                                    'persistent-hint': True
+                                                },
+                                            }
+                                        ],
+                                    },
+                                ],
+                            },
+                            # Cron and Min Size Row (Removed dense)
+                            {
+                                'component': 'VRow',
+                                'class': 'mb-2',
+                                'content': [
+                                     {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 4},
+                                        'content': [
+                                            {
+                                                'component': 'VCronField',
+                                                'props': {
+                                                    'model': 'cron',
+                                                    'label': '定时扫描周期',
+                                                    'placeholder': '5位cron表达式，留空关闭',
+                                                    'variant': 'outlined' 
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 4},
+                                        'content': [
+                                            {
+                                                'component': 'VCronField',
+                                                'props': {
+                                                    'model': 'incremental_cron',
+                                                    'label': '增量扫描周期',
+                                                    'placeholder': '5位cron表达式，留空关闭',
+                                                    'hint': '只处理上次扫描后新增的文件，并与哈希索引中的已有文件比对',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 4},
+                                        'content': [
+                                            {
+                                                'component': 'VTextField',
+                                                'props': {
+                                                    'model': 'min_size',
+                                                    'label': '最小文件大小（KB）',
+                                                    'placeholder': '1024',
+                                                    'type': 'number',
+                                                    'hint': '小于此大小的文件将被忽略',
+                                                    'persistent-hint': True, 
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                ],
+                            },
+                            # Watch Row
+                            {
+                                'component': 'VRow',
+                                'class': 'mb-2',
+                                'content': [
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 6},
+                                        'content': [
+                                            {
+                                                'component': 'VSwitch',
+                                                'props': {
+                                                    'model': 'watch',
+                                                    'label': '实时监控',
+                                                    'hint': '监控扫描目录中写入完成或移入的文件，及时与已有文件去重',
+                                                    'persistent-hint': True
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 6},
+                                        'content': [
+                                            {
+                                                'component': 'VTextField',
+                                                'props': {
+                                                    'model': 'watch_debounce',
+                                                    'label': '监控去抖时间（秒）',
+                                                    'placeholder': '60',
+                                                    'type': 'number',
+                                                    'hint': '最后一个文件事件之后等待多久再批量处理',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                ]
+                            },
+                            # Hash Buffer Size Row (Removed dense)
+                            {
+                                'component': 'VRow',
+                                'class': 'mb-2',
+                                'content': [
+                                      {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "md": 6},
+                                        'content': [
+                                            {
+                                                'component': 'VTextField',
+                                                'props': {
+                                                    'model': 'hash_buffer_size',
+                                                    'label': '哈希缓冲区大小（字节）',
+                                                    'placeholder': '65536',
+                                                    'type': 'number',
+                                                    'hint': '计算文件哈希时每次读取的字节数。增大可加快I/O速度（需足够内存），减小可降低内存占用。建议默认65536 (64KB)。',
+                                                    'persistent-hint': True,
+                                                    # 'density': 'compact',
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 6, "md": 3},
+                                        'content': [
+                                            {
+                                                'component': 'VTextField',
+                                                'props': {
+                                                    'model': 'partial_hash_size',
+                                                    'label': '部分哈希块大小（KB）',
+                                                    'placeholder': '1024',
+                                                    'type': 'number',
+                                                    'hint': '同大小文件先读取首尾及采样块计算指纹，指纹相同才计算完整哈希。0为关闭',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 6, "md": 3},
+                                        'content': [
+                                            {
+                                                'component': 'VTextField',
+                                                'props': {
+                                                    'model': 'partial_hash_samples',
+                                                    'label': '部分哈希采样点数',
+                                                    'placeholder': '3',
+                                                    'type': 'number',
+                                                    'hint': '首尾之外额外读取的中间采样块数量',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                ]
+                            },
+                            # Hash Workers Row
+                            {
+                                'component': 'VRow',
+                                'class': 'mb-2',
+                                'content': [
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "md": 4},
+                                        'content': [
+                                            {
+                                                'component': 'VTextField',
+                                                'props': {
+                                                    'model': 'hash_workers',
+                                                    'label': '默认并行哈希线程数',
+                                                    'placeholder': '1',
+                                                    'type': 'number',
+                                                    'hint': '每个磁盘设备同时读取的文件数，机械硬盘建议1',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "md": 8},
+                                        'content': [
+                                            {
+                                                'component': 'VTextarea',
+                                                'props': {
+                                                    'model': 'device_workers',
+                                                    'label': '按设备并行线程数',
+                                                    'rows': 2,
+                                                    'placeholder': '每行 目录:线程数，例如 /mnt/ssd:8',
+                                                    'hint': '目录所在的磁盘设备使用指定线程数，未配置的设备使用默认线程数',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                ]
+                            },
+                            # IO Throttle Row
+                            {
+                                'component': 'VRow',
+                                'class': 'mb-2',
+                                'content': [
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "md": 4},
+                                        'content': [
+                                            {
+                                                'component': 'VTextField',
+                                                'props': {
+                                                    'model': 'io_limit',
+                                                    'label': '读取限速 (MB/s)',
+                                                    'placeholder': '0',
+                                                    'type': 'number',
+                                                    'hint': '所有哈希线程合计的读取速度上限，0表示不限速',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "md": 5},
+                                        'content': [
+                                            {
+                                                'component': 'VTextarea',
+                                                'props': {
+                                                    'model': 'io_profiles',
+                                                    'label': '分时段限速',
+                                                    'rows': 2,
+                                                    'placeholder': '每行 HH:MM-HH:MM=MB/s，例如 18:00-23:30=20',
+                                                    'hint': '时段内使用指定速率，0表示不限速，其余时间使用读取限速',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "md": 3},
+                                        'content': [
+                                            {
+                                                'component': 'VSwitch',
+                                                'props': {
+                                                    'model': 'low_priority',
+                                                    'label': '低优先级读取',
+                                                    'hint': '哈希线程使用空闲IO优先级并降低CPU优先级',
+                                                    'persistent-hint': True
+                                                },
+                                            }
+                                        ],
+                                    },
+                                ]
+                            },
+                            # Hash Read Mode Row
                             {
                                 'component': 'VRow',
-                                'class': 'align-center mb-2',
+                                'class': 'mb-2',
                                 'content': [
                                     {
                                         'component': 'VCol',
-                                        'props': {"cols": 12, "sm": 4},
+                                        'props': {"cols": 12, "md": 6},
+                                        'content': [
+                                            {
+                                                'component': 'VSelect',
+                                                'props': {
+                                                    'model': 'hash_read_mode',
+                                                    'label': '文件读取方式',
+                                                    'items': [
+                                                        {'title': '普通读取 (read)', 'value': 'buffered'},
+                                                        {'title': '复用缓冲区 (readinto)', 'value': 'readinto'},
+                                                        {'title': '内存映射 (mmap)', 'value': 'mmap'},
+                                                    ],
+                                                    'hint': '默认普通读取；内存映射在部分系统上更快，可用基准测试比较后选择',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "md": 6},
                                         'content': [
                                             {
                                                 'component': 'VSwitch',
                                                 'props': {
-                                                    'model': 'enabled',
-                                                    'label': '启用插件',
-                                                    'color': 'primary',
-                                                    # 'inset': False, # Reverted
-                                                    # 'hide-details': False # Reverted
+                                                    'model': 'drop_page_cache',
+                                                    'label': '读取后释放页缓存',
+                                                    'hint': '避免扫描大量文件时挤掉媒体服务器正在使用的系统缓存',
+                                                    'persistent-hint': True
+                                                },
+                                            }
+                                        ],
+                                    },
+                                ]
+                            },
+                            # Hash Algorithm Row
+                            {
+                                'component': 'VRow',
+                                'class': 'mb-2',
+                                'content': [
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "md": 6},
+                                        'content': [
+                                            {
+                                                'component': 'VSelect',
+                                                'props': {
+                                                    'model': 'hash_algorithm',
+                                                    'label': '摘要算法',
+                                                    'items': [
+                                                        {'title': 'SHA1', 'value': 'sha1'},
+                                                        {'title': 'xxHash128 (需安装xxhash)', 'value': 'xxh3_128'},
+                                                        {'title': 'BLAKE3 (需安装blake3)', 'value': 'blake3'},
+                                                    ],
+                                                    'hint': '非加密哈希速度远高于SHA1，切换后哈希索引中的旧摘要需要重新计算',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
                                                 },
                                             }
                                         ],
                                     },
                                     {
                                         'component': 'VCol',
-                                        'props': {"cols": 12, "sm": 4},
+                                        'props': {"cols": 12, "md": 3},
                                         'content': [
                                             {
                                                 'component': 'VSwitch',
                                                 'props': {
-                                                    'model': 'onlyonce',
-                                                    'label': '立即运行一次',
-                                                    # 'inset': False,
-                                                    # 'hide-details': False
+                                                    'model': 'verify_sha1',
+                                                    'label': '链接前SHA1校验',
+                                                    'hint': '使用非SHA1算法时，创建硬链接前再计算SHA1确认内容一致',
+                                                    'persistent-hint': True
                                                 },
                                             }
                                         ],
                                     },
                                     {
                                         'component': 'VCol',
-                                        'props': {"cols": 12, "sm": 4},
+                                        'props': {"cols": 12, "md": 3},
                                         'content': [
                                             {
                                                 'component': 'VSwitch',
                                                 'props': {
-                                                    'model': 'dry_run',
-                                                    'label': '试运行模式',
-                                                    'hint': '开启后不实际创建链接', # Reverted to hint
-                                                    # 'inset': False,
+                                                    'model': 'verify_bytes',
+                                                    'label': '链接前逐字节比较',
+                                                    'hint': '同步读取两个文件逐块比较，发现差异立即停止，开启后不再进行SHA1校验',
                                                     'persistent-hint': True
                                                 },
                                             }
                                         ],
                                     },
-                                ],
+                                ]
                             },
-                            # Cron and Min Size Row (Removed dense)
+                            # Link Strategy Row
                             {
                                 'component': 'VRow',
                                 'class': 'mb-2',
                                 'content': [
-                                     {
+                                    {
                                         'component': 'VCol',
-                                        'props': {"cols": 12, "sm": 6},
+                                        'props': {"cols": 12, "md": 6},
                                         'content': [
                                             {
-                                                'component': 'VCronField',
+                                                'component': 'VSelect',
                                                 'props': {
-                                                    'model': 'cron',
-                                                    'label': '定时扫描周期',
-                                                    'placeholder': '5位cron表达式，留空关闭',
-                                                    'variant': 'outlined' 
+                                                    'model': 'link_strategy',
+                                                    'label': '替换方式',
+                                                    'items': [
+                                                        {'title': '原子替换 (link + replace)', 'value': 'replace'},
+                                                        {'title': '先重命名 (rename + link + remove)', 'value': 'rename'},
+                                                    ],
+                                                    'hint': '原子替换过程中路径始终存在，且每个文件少一次系统调用；文件系统不支持时可改用先重命名',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
                                                 },
                                             }
                                         ],
                                     },
                                     {
                                         'component': 'VCol',
-                                        'props': {"cols": 12, "sm": 6},
+                                        'props': {"cols": 12, "md": 6},
                                         'content': [
                                             {
-                                                'component': 'VTextField',
+                                                'component': 'VSwitch',
                                                 'props': {
-                                                    'model': 'min_size',
-                                                    'label': '最小文件大小（KB）',
-                                                    'placeholder': '1024',
-                                                    'type': 'number',
-                                                    'hint': '小于此大小的文件将被忽略',
-                                                    'persistent-hint': True, 
-                                                    'variant': 'outlined'
+                                                    'model': 'reflink',
+                                                    'label': '使用reflink代替硬链接',
+                                                    'hint': '仅支持btrfs/XFS等文件系统，重复文件保留独立的inode和属性，修改时互不影响',
+                                                    'persistent-hint': True
                                                 },
                                             }
                                         ],
                                     },
-                                ],
+                                ]
                             },
-                            # Hash Buffer Size Row (Removed dense)
+                            # Source Policy Row
                             {
                                 'component': 'VRow',
                                 'class': 'mb-2',
                                 'content': [
-                                      {
+                                    {
                                         'component': 'VCol',
-                                        'props': {'cols': 12},
+                                        'props': {"cols": 12, "md": 6},
                                         'content': [
                                             {
-                                                'component': 'VTextField',
+                                                'component': 'VSelect',
                                                 'props': {
-                                                    'model': 'hash_buffer_size',
-                                                    'label': '哈希缓冲区大小（字节）',
-                                                    'placeholder': '65536',
-                                                    'type': 'number',
-                                                    'hint': '计算文件哈希时每次读取的字节数。增大可加快I/O速度（需足够内存），减小可降低内存占用。建议默认65536 (64KB)。',
+                                                    'model': 'source_policy',
+                                                    'label': '源文件选择',
+                                                    'items': [
+                                                        {'title': '路径排序最前', 'value': 'path'},
+                                                        {'title': '已有硬链接最多', 'value': 'most_links'},
+                                                        {'title': '修改时间最早', 'value': 'oldest'},
+                                                        {'title': '位于优先目录', 'value': 'preferred_root'},
+                                                    ],
+                                                    'hint': '重复文件组中保留哪个文件，保留已有硬链接最多的文件可减少需要重写的链接',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "md": 6},
+                                        'content': [
+                                            {
+                                                'component': 'VTextarea',
+                                                'props': {
+                                                    'model': 'preferred_roots',
+                                                    'label': '优先目录',
+                                                    'rows': 2,
+                                                    'placeholder': '每行一个目录，例如 /media/movies',
+                                                    'hint': '选择"位于优先目录"时生效，越靠前的目录优先级越高',
                                                     'persistent-hint': True,
-                                                    # 'density': 'compact',
                                                     'variant': 'outlined'
                                                 },
                                             }
@@ -1000,25 +2560,206 @@ class smarthardlink(_PluginBase):
             "enabled": False,
             "onlyonce": False,
             "dry_run": True,
+            "hash_index": True,
             "cron": "",
+            "incremental_cron": "",
+            "watch": False,
+            "watch_debounce": 60,
             "scan_dirs": "",
             "min_size": 1024,
             "exclude_dirs": "",
             "exclude_extensions": "",
             "exclude_keywords": "",
             "hash_buffer_size": 65536,
+            "hash_read_mode": READ_MODE_BUFFERED,
+            "drop_page_cache": True,
+            "hash_algorithm": ALGORITHM_SHA1,
+            "verify_sha1": False,
+            "verify_bytes": False,
+            "link_strategy": STRATEGY_REPLACE,
+            "reflink": False,
+            "source_policy": POLICY_PATH,
+            "preferred_roots": "",
+            "partial_hash_size": 1024,
+            "partial_hash_samples": 3,
+            "hash_workers": 1,
+            "device_workers": "",
+            "io_limit": 0,
+            "io_profiles": "",
+            "low_priority": False,
         }
 
+    def _build_progress_cards(self) -> List[dict]:
+        """
+        构建扫描进度卡片，数据来自进度快照，与 /progress 接口一致
+        """
+        progress = self._progress.snapshot()
+        if not progress["started_at"]:
+            return []
+
+        phase_text = progress["phase"]
+        if progress["phase_files_total"]:
+            phase_text += f" ({progress['phase_files_done']}/{progress['phase_files_total']})"
+        eta = progress["eta_seconds"]
+        items = [
+            ('mdi-progress-clock', '当前阶段', phase_text),
+            ('mdi-file-search-outline', '已扫描',
+             f"{progress['files_scanned']} 个 / {self._format_size(progress['bytes_scanned'])}"),
+            ('mdi-pound', '已计算哈希', self._format_size(progress['bytes_hashed'])),
+            ('mdi-database-check', '索引命中',
+             f"{progress['index_hits']} 个 / {self._format_size(progress['bytes_cached'])}"),
+            ('mdi-speedometer', '哈希速度', f"{progress['hash_mb_per_second']} MB/s"),
+            ('mdi-timer-sand', '预计剩余', self._format_time(eta) if eta is not None else '-'),
+            ('mdi-content-duplicate', '重复文件',
+             f"{progress['groups_found']} 组 / {progress['duplicates_found']} 个"),
+            ('mdi-harddisk-remove', '可回收空间', self._format_size(progress['bytes_reclaimable'])),
+            ('mdi-link-variant-plus', '已链接', str(progress['links_done'])),
+        ]
+        stat_cols = [
+            {
+                'component': 'VCol',
+                'props': {'cols': 6, 'md': 3},
+                'content': [
+                    {
+                        'component': 'div',
+                        'props': {'class': 'd-flex align-center'},
+                        'content': [
+                            {'component': 'VIcon', 'props': {'icon': icon, 'size': 'small', 'class': 'mr-2', 'color': 'primary'}},
+                            {
+                                'component': 'div',
+                                'content': [
+                                    {'component': 'div', 'props': {'class': 'text-caption text-grey'}, 'text': label},
+                                    {'component': 'div', 'props': {'class': 'text-body-2 font-weight-medium'}, 'text': value}
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+            for icon, label, value in items
+        ]
+
+        if progress["running"]:
+            status_chip = {'component': 'VChip', 'props': {'color': 'primary', 'size': 'small', 'class': 'ml-2'},
+                           'text': f"{progress['scan_mode']}进行中"}
+        else:
+            status_chip = {'component': 'VChip', 'props': {'color': 'grey', 'size': 'small', 'class': 'ml-2'},
+                           'text': f"{progress['scan_mode']} {progress['status']}"}
+        content = [{'component': 'VRow', 'content': stat_cols}]
+        if progress["running"] and progress["phase_files_total"]:
+            content.insert(0, {
+                'component': 'VProgressLinear',
+                'props': {
+                    'model-value': progress['phase_files_done'] / progress['phase_files_total'] * 100,
+                    'color': 'primary',
+                    'height': 6,
+                    'rounded': True,
+                    'class': 'mb-4'
+                }
+            })
+        return [
+            {
+                'component': 'VCard',
+                'props': {'variant': 'outlined', 'class': 'mb-4'},
+                'content': [
+                    {
+                        'component': 'VCardTitle',
+                        'props': {'class': 'd-flex align-center text-h6 py-3'},
+                        'content': [
+                            {'component': 'VIcon', 'props': {'icon': 'mdi-chart-timeline-variant', 'class': 'mr-2', 'color': 'primary'}},
+                            {'component': 'span', 'text': '扫描进度'},
+                            status_chip
+                        ]
+                    },
+                    {'component': 'VDivider'},
+                    {'component': 'VCardText', 'content': content}
+                ]
+            }
+        ]
+
+    def _build_history_summary_cards(self, history_store: HistoryStore) -> List[dict]:
+        """
+        构建运行历史汇总卡片，展示累计及最近几周的节省空间、各阶段耗时和平均哈希速度
+        """
+        totals = history_store.totals()
+        weeks = history_store.trends("week", 4)
+        phase_seconds = sum(totals[f"{phase}_seconds"] for phase in ("walk", "hash", "verify", "link"))
+        # (图标, 名称, 内容, 是否占用较宽的列)
+        items = [
+            ('mdi-counter', '累计运行', f"{totals['runs']} 次", False),
+            ('mdi-content-save-outline', '累计节省', self._format_size(totals['space_saved']), False),
+            ('mdi-link-variant-plus', '累计创建链接', str(totals['hardlinks_created']), False),
+            ('mdi-speedometer', '平均哈希速度', f"{totals['hash_mb_per_second']} MB/s", False),
+        ]
+        if phase_seconds:
+            items.append(('mdi-timer-outline', '耗时占比', " / ".join(
+                f"{label} {totals[f'{phase}_seconds'] / phase_seconds * 100:.0f}%"
+                for phase, label in (("walk", "遍历"), ("hash", "哈希"), ("verify", "校验"), ("link", "链接"))), True))
+        if weeks:
+            items.append(('mdi-calendar-week', '最近几周节省', " / ".join(
+                f"{week['period']} {self._format_size(week['space_saved'])}" for week in weeks), True))
+        return [
+            {
+                'component': 'VCard',
+                'props': {'variant': 'outlined', 'class': 'mb-4'},
+                'content': [
+                    {
+                        'component': 'VCardTitle',
+                        'props': {'class': 'd-flex align-center text-h6 py-3'},
+                        'content': [
+                            {'component': 'VIcon', 'props': {'icon': 'mdi-chart-line', 'class': 'mr-2', 'color': 'primary'}},
+                            {'component': 'span', 'text': '运行统计'}
+                        ]
+                    },
+                    {'component': 'VDivider'},
+                    {
+                        'component': 'VCardText',
+                        'content': [
+                            {
+                                'component': 'VRow',
+                                'content': [
+                                    {
+                                        'component': 'VCol',
+                                        'props': {'cols': 12 if wide else 6, 'md': 6 if wide else 3},
+                                        'content': [
+                                            {
+                                                'component': 'div',
+                                                'props': {'class': 'd-flex align-center'},
+                                                'content': [
+                                                    {'component': 'VIcon', 'props': {'icon': icon, 'size': 'small', 'class': 'mr-2', 'color': 'primary'}},
+                                                    {
+                                                        'component': 'div',
+                                                        'content': [
+                                                            {'component': 'div', 'props': {'class': 'text-caption text-grey'}, 'text': label},
+                                                            {'component': 'div', 'props': {'class': 'text-body-2 font-weight-medium'}, 'text': value}
+                                                        ]
+                                                    }
+                                                ]
+                                            }
+                                        ]
+                                    }
+                                    for icon, label, value, wide in items
+                                ]
+                            }
+                        ]
+                    }
+                ]
+            }
+        ]
+
     def get_page(self) -> List[dict]:
         """
         构建插件详情页面，展示硬链接历史
         """
-        # 获取历史记录
-        historys = self.get_data('link_history') or []
+        # 只读取最近的历史记录，统计数据由运行历史汇总
+        history_store = self._get_history_store()
+        historys = history_store.recent(self._history_page_size) if history_store else []
+        # 插件启动后有过扫描时展示进度卡片
+        progress_cards = self._build_progress_cards()
 
         # 如果没有历史记录
         if not historys:
-            return [
+            return progress_cards + [
                 {
                     'component': 'VAlert',
                     'props': {
@@ -1031,9 +2772,6 @@ class smarthardlink(_PluginBase):
                 }
             ]
 
-        # 按时间倒序排列历史
-        historys = sorted(historys, key=lambda x: x.get("end_time", ""), reverse=True)
-
         # 构建历史记录表格行 (添加图标和颜色)
         history_rows = []
         for history in historys:
@@ -1165,7 +2903,7 @@ class smarthardlink(_PluginBase):
             })
 
         # --- 最终页面组装 (优化 VCardTitle 和 Table Header) ---
-        return [
+        return progress_cards + self._build_history_summary_cards(history_store) + [
             {
                 'component': 'VCard',
                 'props': {'variant': 'outlined', 'class': 'mb-4'},
@@ -1338,10 +3076,25 @@ class smarthardlink(_PluginBase):
         """
         退出插件
         """
+        # 通知正在进行的扫描（定时任务、API或实时监控触发）尽快停止，排队等待的扫描不再运行
+        self._stopping.set()
+        self._request_cancel()
         if self._scheduler:
             self._scheduler.remove_all_jobs()
             if self._scheduler.running:
-                self._event.set()
                 self._scheduler.shutdown()
+            self._scheduler = None
+        if self._watcher:
+            self._watcher.stop()
+            self._watcher = None
+        # 等待扫描退出后再关闭哈希索引，超时则保留取消信号，由扫描退出时关闭
+        if lock.acquire(timeout=60):
+            try:
                 self._event.clear()
-            self._scheduler = None 
\ No newline at end of file
+                self._close_on_exit = False
+                self._close_stores()
+            finally:
+                lock.release()
+        else:
+            logger.warning("等待扫描停止超时，扫描退出后再关闭哈希索引和运行历史")
+            self._close_on_exit = True
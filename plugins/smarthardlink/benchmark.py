@@ -0,0 +1,556 @@
+"""
+性能基准测试模块
+在 MoviePilot 根目录下运行，结果以JSON输出，便于不同版本之间对比：
+    python -m plugins.smarthardlink.benchmark matcher --count 1000000
+    python -m plugins.smarthardlink.benchmark hash --size-mb 2048 --algorithm xxh3_128
+    python -m plugins.smarthardlink.benchmark link --count 100000
+    python -m plugins.smarthardlink.benchmark memory --count 5000000
+    python -m plugins.smarthardlink.benchmark pipeline --count 2000 --dup-ratio 0.3 --link-ratio 0.1
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from plugins.smarthardlink.file_table import FileTable, HAS_NUMPY
+from plugins.smarthardlink.hasher import FileHasher, READ_MODES, ALGORITHM_SHA1
+from plugins.smarthardlink.linker import LinkExecutor, STRATEGIES, shares_extents
+from plugins.smarthardlink.matcher import ExclusionMatcher
+
+# 基准测试使用的排除规则，接近实际媒体库的常见配置
+BENCH_EXCLUDE_DIRS = "/media/downloads/incomplete\n/media/.recycle\n/media/tv/Specials"
+BENCH_EXCLUDE_EXTENSIONS = "jpg,png,nfo,srt,ass,txt"
+BENCH_EXCLUDE_KEYWORDS = "\\.partial$\nsample\n\\.!qB$"
+
+
+def synthetic_paths(count: int, seed: int = 0) -> List[str]:
+    """
+    生成模拟媒体库的文件路径
+    :param count: 路径数量
+    :param seed: 随机种子
+    """
+    rng = random.Random(seed)
+    roots = ["/media/movies", "/media/tv", "/media/tv/Specials", "/media/downloads/complete",
+             "/media/downloads/incomplete", "/media/anime"]
+    extensions = ["mkv", "mp4", "nfo", "jpg", "srt", "ass", "iso", "ts"]
+    suffixes = ["", "", "", "", "-sample", ".partial"]
+    return [
+        f"{rng.choice(roots)}/Title {rng.randrange(5000)} ({rng.randrange(1950, 2026)})/"
+        f"Title.S{rng.randrange(1, 20):02d}E{rng.randrange(1, 30):02d}.1080p{rng.choice(suffixes)}."
+        f"{rng.choice(extensions)}"
+        for _ in range(count)
+    ]
+
+
+def _legacy_is_excluded(file_path: str) -> bool:
+    """
+    预编译之前的排除判断逻辑，作为对比基线
+    """
+    for exclude_dir in BENCH_EXCLUDE_DIRS.split("\n"):
+        if exclude_dir and file_path.startswith(exclude_dir):
+            return True
+    file_ext = os.path.splitext(file_path)[1].lower()
+    extensions = [f".{ext.strip().lower()}" for ext in BENCH_EXCLUDE_EXTENSIONS.split(",")]
+    if file_ext in extensions:
+        return True
+    for keyword in BENCH_EXCLUDE_KEYWORDS.split("\n"):
+        if keyword and re.findall(keyword, file_path):
+            return True
+    return False
+
+
+def bench_matcher(count: int = 1000000) -> Dict[str, Any]:
+    """
+    对比逐文件解析配置与预编译排除规则的单文件耗时
+    :param count: 模拟路径数量
+    """
+    paths = synthetic_paths(count)
+
+    start = time.perf_counter()
+    legacy_excluded = sum(1 for path in paths if _legacy_is_excluded(path))
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher = ExclusionMatcher(exclude_dirs=BENCH_EXCLUDE_DIRS,
+                               exclude_extensions=BENCH_EXCLUDE_EXTENSIONS,
+                               exclude_keywords=BENCH_EXCLUDE_KEYWORDS)
+    matcher_excluded = sum(1 for path in paths if matcher.is_excluded(path))
+    matcher_seconds = time.perf_counter() - start
+
+    if legacy_excluded != matcher_excluded:
+        raise RuntimeError(f"排除结果不一致: 基线 {legacy_excluded}，预编译 {matcher_excluded}")
+    return {
+        "benchmark": "matcher",
+        "paths": count,
+        "excluded": matcher_excluded,
+        "legacy_seconds": round(legacy_seconds, 3),
+        "matcher_seconds": round(matcher_seconds, 3),
+        "legacy_ns_per_path": round(legacy_seconds / count * 1e9, 1),
+        "matcher_ns_per_path": round(matcher_seconds / count * 1e9, 1),
+        "speedup": round(legacy_seconds / matcher_seconds, 2) if matcher_seconds else None,
+    }
+
+
+def _generate_file(file_path: str, size_mb: int):
+    """
+    生成指定大小的测试文件，内容为重复的随机块
+    """
+    block = os.urandom(1024 * 1024)
+    with open(file_path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+
+def _drop_file_cache(file_path: str):
+    """
+    尽量让测试文件脱离页缓存，使各读取方式在相同条件下比较
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    with open(file_path, "rb") as f:
+        os.fsync(f.fileno())
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def bench_hash(size_mb: int = 2048, buffer_size: int = 65536, directory: str = None,
+               cold: bool = True, algorithm: str = ALGORITHM_SHA1) -> Dict[str, Any]:
+    """
+    比较各文件读取方式计算完整哈希的吞吐量
+    :param size_mb: 测试文件大小，单位MB
+    :param buffer_size: 每次读取的字节数
+    :param directory: 测试文件所在目录，默认系统临时目录
+    :param cold: 每种方式测试前丢弃测试文件的页缓存
+    :param algorithm: 摘要算法
+    """
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as temp_dir:
+        file_path = os.path.join(temp_dir, "hash_bench.bin")
+        _generate_file(file_path, size_mb)
+        digests = set()
+        for read_mode in READ_MODES:
+            if cold:
+                _drop_file_cache(file_path)
+            hasher = FileHasher(buffer_size=buffer_size, read_mode=read_mode, drop_cache=False,
+                                algorithm=algorithm)
+            start = time.perf_counter()
+            digests.add(hasher.hash_file(file_path))
+            seconds = time.perf_counter() - start
+            results.append({
+                "read_mode": read_mode,
+                "seconds": round(seconds, 3),
+                "mb_per_second": round(size_mb / seconds, 1) if seconds else None,
+            })
+    if len(digests) != 1:
+        raise RuntimeError("各读取方式计算的摘要不一致")
+    return {
+        "benchmark": "hash",
+        "algorithm": algorithm,
+        "size_mb": size_mb,
+        "buffer_size": buffer_size,
+        "cold_cache": cold,
+        "modes": results,
+    }
+
+
+def bench_link(count: int = 100000, directory: str = None) -> Dict[str, Any]:
+    """
+    比较各替换方式处理大量小文件（字幕、NFO）的耗时
+    :param count: 每种方式替换的文件数量
+    :param directory: 测试文件所在目录，应位于待测磁盘上，默认系统临时目录
+    """
+    results = []
+    for strategy in STRATEGIES:
+        temp_dir = tempfile.mkdtemp(dir=directory)
+        try:
+            source = os.path.join(temp_dir, "source.nfo")
+            with open(source, "wb") as f:
+                f.write(b"x" * 512)
+            source_stat = os.stat(source)
+            targets = []
+            for i in range(count):
+                sub_dir = os.path.join(temp_dir, f"{i // 1000:04d}")
+                if i % 1000 == 0:
+                    os.makedirs(sub_dir)
+                target = os.path.join(sub_dir, f"{i}.nfo")
+                with open(target, "wb") as f:
+                    f.write(b"x" * 512)
+                targets.append(target)
+
+            linked = []
+            executor = LinkExecutor(os.path.join(temp_dir, "link_journal.jsonl"),
+                                    on_complete=lambda op: linked.append(op.success), strategy=strategy)
+            start = time.perf_counter()
+            for target in targets:
+                executor.submit(source, target, source_stat)
+            executor.close()
+            seconds = time.perf_counter() - start
+            results.append({
+                "strategy": strategy,
+                "linked": sum(linked),
+                "seconds": round(seconds, 3),
+                "us_per_file": round(seconds / count * 1e6, 1),
+            })
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    return {
+        "benchmark": "link",
+        "files": count,
+        "strategies": results,
+    }
+
+
+class _SyntheticStat(NamedTuple):
+    """
+    模拟的stat信息，只包含分组需要的字段
+    """
+    st_dev: int
+    st_ino: int
+    st_size: int
+
+
+def synthetic_entries(count: int, seed: int = 0, files_per_dir: int = 40
+                      ) -> Iterator[Tuple[str, _SyntheticStat]]:
+    """
+    流式生成模拟媒体库的文件记录，约5%的文件与前一个文件大小相同，约2%是前一个文件的硬链接
+    :param count: 文件数量
+    :param seed: 随机种子
+    :param files_per_dir: 每个目录的文件数
+    """
+    rng = random.Random(seed)
+    inode, file_size = 0, 0
+    for i in range(count):
+        dir_id = i // files_per_dir
+        file_path = (f"/media/library/{dir_id // 1000:04d}/Title {dir_id} ({1950 + dir_id % 76})/"
+                     f"Title.{dir_id}.S01E{i % files_per_dir:02d}.1080p.mkv")
+        roll = rng.random()
+        if not i or roll >= 0.07:
+            inode, file_size = i + 1, rng.randrange(1 << 20, 1 << 34)
+        elif roll >= 0.02:
+            inode = i + 1
+        yield file_path, _SyntheticStat(2049, inode, file_size)
+
+
+def _memory_variant(count: int, variant: str) -> Dict[str, Any]:
+    """
+    在当前进程中构建扫描结果并统计需要计算哈希的候选文件数，峰值内存为整个进程的峰值
+    :param variant: legacy - 按路径保存的字典和列表（文件表之前的实现）；table - 文件表，NumPy 可用时向量化分组；
+                    table_python - 文件表，纯Python分组
+    """
+    import resource
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if variant == "legacy":
+        inode_paths = {}
+        size_groups = {}
+        for file_path, file_stat in synthetic_entries(count):
+            inode_key = (file_stat.st_dev, file_stat.st_ino)
+            if inode_key in inode_paths:
+                inode_paths[inode_key].append(file_path)
+                continue
+            inode_paths[inode_key] = [file_path]
+            size_groups.setdefault((file_stat.st_dev, file_stat.st_size), []).append(
+                (file_path, file_stat.st_size))
+        candidates = sum(len(files) for files in size_groups.values() if len(files) > 1)
+        inode_count = len(inode_paths)
+    else:
+        file_table = FileTable(use_numpy=variant != "table_python")
+        for file_path, file_stat in synthetic_entries(count):
+            file_table.add(file_path, file_stat)
+        build_seconds = time.perf_counter() - start
+        file_table.finish()
+        candidates = sum(len(inodes) for _, _, inodes in file_table.size_groups())
+        file_table.single_inode_summary()
+        inode_count = file_table.inode_count
+        group_seconds = time.perf_counter() - start - build_seconds
+    seconds = time.perf_counter() - start
+    # Linux 下 ru_maxrss 单位为KB
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = {
+        "variant": variant,
+        "numpy": variant == "table" and HAS_NUMPY,
+        "inodes": inode_count,
+        "candidates": candidates,
+        "seconds": round(seconds, 3),
+        "baseline_rss_mb": round(baseline_kb / 1024, 1),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+    }
+    if variant != "legacy":
+        result["group_seconds"] = round(group_seconds, 3)
+    return result
+
+
+def bench_memory(count: int = 5000000) -> Dict[str, Any]:
+    """
+    比较按路径保存与文件表保存扫描结果的峰值内存及分组耗时，每种方式在独立的子进程中运行
+    :param count: 模拟文件数量
+    """
+    results = []
+    for variant in ("legacy", "table", "table_python"):
+        output = subprocess.run([sys.executable, "-m", "plugins.smarthardlink.benchmark", "memory",
+                                 "--count", str(count), "--variant", variant],
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output))
+    if len({(result["inodes"], result["candidates"]) for result in results}) != 1:
+        raise RuntimeError("各方式的分组结果不一致")
+    legacy, table = results[:2]
+    return {
+        "benchmark": "memory",
+        "entries": count,
+        "variants": results,
+        "bytes_per_entry": {
+            result["variant"]: round((result["peak_rss_mb"] - result["baseline_rss_mb"]) * 1024 * 1024 / count, 1)
+            for result in results
+        },
+        "peak_ratio": round(legacy["peak_rss_mb"] / table["peak_rss_mb"], 2) if table["peak_rss_mb"] else None,
+    }
+
+
+# 流水线基准测试中各阶段与插件进度阶段名称的对应关系
+PIPELINE_PHASES = {
+    "walk": "收集文件",
+    "filter": "部分哈希",
+    "hash": "完整哈希",
+    "link": "创建链接",
+}
+# 流水线基准测试的默认插件配置，部分哈希采样块按模拟文件的大小缩小
+PIPELINE_CONFIG = {
+    "min_size": 1,
+    "dry_run": False,
+    "hash_index": True,
+    "partial_hash_size": 64,
+}
+
+
+def build_tree(root: str, count: int, min_kb: int = 16, max_kb: int = 4096, dup_ratio: float = 0.3,
+               link_ratio: float = 0.1, same_size_ratio: float = 0.1, seed: int = 0,
+               files_per_dir: int = 50) -> Dict[str, int]:
+    """
+    在目录下生成模拟媒体库，文件大小在 min_kb 和 max_kb 之间按对数均匀分布
+    :param count: 文件（路径）数量
+    :param dup_ratio: 重复文件的比例，内容复制自某个原始文件，是独立的inode
+    :param link_ratio: 已存在硬链接的比例，为某个原始文件新增的路径
+    :param same_size_ratio: 原始文件中与之前某个原始文件大小相同、内容不同的比例，用于检验部分哈希的筛选
+    :param seed: 随机种子，相同参数生成相同的目录结构和内容
+    :param files_per_dir: 每个目录的文件数
+    :return: 各类文件的数量及总字节数
+    """
+    rng = random.Random(seed)
+    originals: List[Tuple[str, int]] = []
+    stats = {"files": count, "originals": 0, "duplicates": 0, "hardlinks": 0, "same_size": 0, "bytes": 0}
+    for i in range(count):
+        dir_path = os.path.join(root, f"{i // files_per_dir // 100:03d}", f"Title {i // files_per_dir}")
+        if i % files_per_dir == 0:
+            os.makedirs(dir_path, exist_ok=True)
+        file_path = os.path.join(dir_path, f"Title.S01E{i % files_per_dir:02d}.mkv")
+        roll = rng.random()
+        if originals and roll < link_ratio:
+            os.link(rng.choice(originals)[0], file_path)
+            stats["hardlinks"] += 1
+            continue
+        if originals and roll < link_ratio + dup_ratio:
+            source, file_size = rng.choice(originals)
+            shutil.copyfile(source, file_path)
+            stats["duplicates"] += 1
+        else:
+            if originals and rng.random() < same_size_ratio:
+                file_size = rng.choice(originals)[1]
+                stats["same_size"] += 1
+            else:
+                file_size = int(min_kb * 1024 * (max_kb / min_kb) ** rng.random())
+            with open(file_path, "wb") as f:
+                f.write(rng.randbytes(file_size))
+            originals.append((file_path, file_size))
+            stats["originals"] += 1
+        stats["bytes"] += file_size
+    return stats
+
+
+def _count_inodes(root: str) -> int:
+    """
+    目录下不同inode的数量，去重完成后应等于原始文件数
+    """
+    inodes = set()
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            inodes.add(os.stat(os.path.join(dir_path, file_name)).st_ino)
+    return len(inodes)
+
+
+def _count_unshared(root: str) -> Tuple[int, int]:
+    """
+    按内容分组，统计未与同组第一个文件共享数据块的文件数，reflink去重后各文件仍是独立的inode，按共享数据块检查
+    :return: (内容不同的文件数, 未共享数据块的文件数)，去重完成后前者应等于原始文件数，后者应为0
+    """
+    groups: Dict[Tuple[int, str], List[str]] = {}
+    for dir_path, _, file_names in os.walk(root):
+        for file_name in file_names:
+            file_path = os.path.join(dir_path, file_name)
+            with open(file_path, "rb") as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            groups.setdefault((os.path.getsize(file_path), digest), []).append(file_path)
+    unshared = sum(1 for paths in groups.values() for file_path in paths[1:]
+                   if not os.path.samefile(paths[0], file_path) and not shares_extents(paths[0], file_path))
+    return len(groups), unshared
+
+
+def _bench_plugin_class():
+    """
+    插件子类，数据目录和插件数据保存在临时目录中，不发送通知，不影响实际的插件数据
+    插件依赖 MoviePilot 运行环境，仅在流水线基准测试时导入
+    """
+    from plugins.smarthardlink import smarthardlink
+
+    class BenchPlugin(smarthardlink):
+        def __init__(self, data_dir: str):
+            super().__init__()
+            self._bench_data_dir = data_dir
+            self._bench_data: Dict[str, Any] = {}
+
+        def get_data_path(self) -> Path:
+            return Path(self._bench_data_dir)
+
+        def get_data(self, key: str, *args, **kwargs) -> Any:
+            return self._bench_data.get(key)
+
+        def save_data(self, key: str, value: Any, *args, **kwargs):
+            self._bench_data[key] = value
+
+        def post_message(self, *args, **kwargs):
+            pass
+
+    return BenchPlugin
+
+
+def bench_pipeline(count: int = 2000, min_kb: int = 16, max_kb: int = 4096, dup_ratio: float = 0.3,
+                   link_ratio: float = 0.1, same_size_ratio: float = 0.1, seed: int = 0, runs: int = 2,
+                   directory: str = None, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    在模拟媒体库上运行完整扫描，统计各阶段耗时
+    第一次运行没有哈希索引，之后的运行使用索引和稳定分组，去重后目录中的inode数应等于原始文件数
+    reflink方式下改为检查相同内容的文件是否共享数据块
+    :param runs: 完整扫描的次数
+    :param directory: 模拟媒体库所在目录，应位于待测磁盘上，默认系统临时目录
+    :param config: 覆盖默认的插件配置，见 PIPELINE_CONFIG
+    """
+    temp_dir = tempfile.mkdtemp(dir=directory)
+    try:
+        root = os.path.join(temp_dir, "library")
+        start = time.perf_counter()
+        tree = build_tree(root, count, min_kb=min_kb, max_kb=max_kb, dup_ratio=dup_ratio, link_ratio=link_ratio,
+                          same_size_ratio=same_size_ratio, seed=seed)
+        tree["build_seconds"] = round(time.perf_counter() - start, 3)
+
+        plugin_config = {**PIPELINE_CONFIG, **(config or {}), "enabled": False, "scan_dirs": root}
+        plugin = _bench_plugin_class()(os.path.join(temp_dir, "data"))
+        plugin.init_plugin(plugin_config)
+        results = []
+        try:
+            for run in range(runs):
+                start = time.perf_counter()
+                plugin.scan_and_process()
+                seconds = time.perf_counter() - start
+                summary = plugin._get_history_store().recent(1)[0]
+                if summary["status"].startswith("失败"):
+                    raise RuntimeError(f"第 {run + 1} 次扫描失败: {summary.get('error')}")
+                phases = plugin._progress.phase_durations()
+                results.append({
+                    "run": run + 1,
+                    "seconds": round(seconds, 3),
+                    "phases": {name: round(phases.get(phase, 0.0), 3) for name, phase in PIPELINE_PHASES.items()},
+                    "verify_seconds": summary["verify_seconds"],
+                    "hashed_bytes": summary["hashed_bytes"],
+                    "hash_mb_per_second": round(summary["hashed_bytes"] / summary["hash_seconds"] / (1024 * 1024), 1)
+                    if summary["hash_seconds"] else 0.0,
+                    "hardlinks_created": summary["hardlinks_created"],
+                    "skipped_hardlinks": summary["skipped_hardlinks"],
+                    "partial_filtered": summary["partial_filtered"],
+                    "settled_groups": summary["settled_groups"],
+                })
+        finally:
+            plugin.stop_service()
+        inodes = _count_inodes(root)
+        if plugin_config["dry_run"]:
+            # 试运行不修改文件，无需检查去重结果
+            pass
+        elif plugin_config.get("reflink"):
+            contents, unshared = _count_unshared(root)
+            if contents != tree["originals"] or unshared:
+                raise RuntimeError(f"去重结果不正确：内容不同的文件 {contents} 个，原始文件 {tree['originals']} 个，"
+                                   f"未共享数据块的重复文件 {unshared} 个")
+        elif inodes != tree["originals"]:
+            raise RuntimeError(f"去重结果不正确：剩余 {inodes} 个inode，原始文件 {tree['originals']} 个")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return {
+        "benchmark": "pipeline",
+        "tree": tree,
+        "config": {key: value for key, value in plugin_config.items() if key != "scan_dirs"},
+        "inodes_after": inodes,
+        "runs": results,
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="智能硬链接性能基准测试")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    matcher_parser = subparsers.add_parser("matcher", help="排除规则匹配耗时")
+    matcher_parser.add_argument("--count", type=int, default=1000000, help="模拟路径数量")
+
+    hash_parser = subparsers.add_parser("hash", help="各文件读取方式的哈希吞吐量")
+    hash_parser.add_argument("--size-mb", type=int, default=2048, help="测试文件大小，单位MB")
+    hash_parser.add_argument("--buffer-size", type=int, default=65536, help="每次读取的字节数")
+    hash_parser.add_argument("--dir", default=None, help="测试文件所在目录，应位于待测磁盘上")
+    hash_parser.add_argument("--algorithm", default=ALGORITHM_SHA1, help="摘要算法：sha1 / xxh3_128 / blake3")
+    hash_parser.add_argument("--warm", action="store_true", help="不丢弃页缓存，只比较CPU开销")
+
+    link_parser = subparsers.add_parser("link", help="各替换方式处理大量小文件的耗时")
+    link_parser.add_argument("--count", type=int, default=100000, help="替换的文件数量")
+    link_parser.add_argument("--dir", default=None, help="测试文件所在目录，应位于待测磁盘上")
+
+    memory_parser = subparsers.add_parser("memory", help="扫描结果的峰值内存")
+    memory_parser.add_argument("--count", type=int, default=5000000, help="模拟文件数量")
+    memory_parser.add_argument("--variant", choices=["legacy", "table", "table_python"], default=None,
+                               help="只在当前进程中运行指定方式，默认在子进程中依次运行并对比")
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="在模拟媒体库上运行完整扫描的各阶段耗时")
+    pipeline_parser.add_argument("--count", type=int, default=2000, help="模拟文件数量")
+    pipeline_parser.add_argument("--min-kb", type=int, default=16, help="最小文件大小，单位KB")
+    pipeline_parser.add_argument("--max-kb", type=int, default=4096, help="最大文件大小，单位KB")
+    pipeline_parser.add_argument("--dup-ratio", type=float, default=0.3, help="重复文件的比例")
+    pipeline_parser.add_argument("--link-ratio", type=float, default=0.1, help="已存在硬链接的比例")
+    pipeline_parser.add_argument("--same-size-ratio", type=float, default=0.1, help="大小相同内容不同的原始文件比例")
+    pipeline_parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    pipeline_parser.add_argument("--runs", type=int, default=2, help="完整扫描的次数")
+    pipeline_parser.add_argument("--dir", default=None, help="模拟媒体库所在目录，应位于待测磁盘上")
+    pipeline_parser.add_argument("--config", type=json.loads, default=None,
+                                 help="覆盖默认插件配置的JSON，如 '{\"hash_algorithm\": \"xxh3_128\"}'")
+
+    args = parser.parse_args(argv)
+    if args.benchmark == "matcher":
+        result = bench_matcher(count=args.count)
+    elif args.benchmark == "hash":
+        result = bench_hash(size_mb=args.size_mb, buffer_size=args.buffer_size,
+                            directory=args.dir, cold=not args.warm, algorithm=args.algorithm)
+    elif args.benchmark == "link":
+        result = bench_link(count=args.count, directory=args.dir)
+    elif args.benchmark == "memory":
+        result = _memory_variant(args.count, args.variant) if args.variant else bench_memory(count=args.count)
+    elif args.benchmark == "pipeline":
+        result = bench_pipeline(count=args.count, min_kb=args.min_kb, max_kb=args.max_kb, dup_ratio=args.dup_ratio,
+                                link_ratio=args.link_ratio, same_size_ratio=args.same_size_ratio, seed=args.seed,
+                                runs=args.runs, directory=args.dir, config=args.config)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""
+扫描取消
+"""
+
+
+class ScanCancelled(Exception):
+    """
+    扫描被取消（停止插件或调用取消接口），各阶段在检查点抛出，由扫描入口统一处理
+    """
+    pass
@@ -0,0 +1,275 @@
+"""
+扫描文件表模块
+千万级文件时，每个文件一个路径字符串、元组和列表的开销可达数GB，文件表按列保存扫描结果：
+    目录路径按目录去重保存，文件名编码后连续存放在一个 bytearray 中
+    设备、inode、大小保存在 array 中，每个文件只占几十个字节
+排序后按 (大小, 设备, inode) 连续存放，同一设备同一大小（分组）、同一inode的文件均为相邻的区间
+安装了 NumPy 时排序及分组边界的计算整体向量化完成，否则逐行计算，两种方式的结果相同
+"""
+import os
+from array import array
+from typing import Collection, Dict, Iterator, List, Set, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+# 纯Python排序时排序键中各字段的位宽，inode 和行号按最大值预留
+_INODE_BITS = 64
+_ROW_BITS = 32
+
+
+class FileTable:
+    """
+    按列保存的扫描文件表，先逐个 add，调用 finish 排序并计算分组后读取
+    """
+
+    def __init__(self, use_numpy: bool = True):
+        """
+        初始化文件表
+        :param use_numpy: NumPy 可用时使用向量化计算，关闭时始终使用纯Python实现
+        """
+        self.use_numpy = use_numpy and HAS_NUMPY
+        self._dirs: List[str] = []
+        self._dir_ids: Dict[str, int] = {}
+        self._devices: List[int] = []
+        self._device_ids: Dict[int, int] = {}
+        self._dir_index = array("I")
+        self._dev_index = array("I")
+        self._name_offsets = array("Q", [0])
+        self._names = bytearray()
+        self.inodes = array("Q")
+        self.sizes = array("Q")
+        # 以下由 finish 计算
+        self.order = array("Q")  # 排序后的行号
+        self.group_starts = array("Q")  # 每个分组在 order 中的起始位置
+        self.group_inode_counts = array("I")  # 每个分组的inode数
+        self.group_device_counts = array("I")  # 每个分组的大小在多少个设备上出现
+        self.inode_count = 0  # 独立文件（inode）数量
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def add(self, file_path: str, file_stat: os.stat_result):
+        """
+        添加一个文件
+        :param file_path: 文件路径
+        :param file_stat: 文件的stat信息，只使用设备、inode和大小
+        """
+        dir_path, name = os.path.split(file_path)
+        dir_id = self._dir_ids.get(dir_path)
+        if dir_id is None:
+            dir_id = self._dir_ids[dir_path] = len(self._dirs)
+            self._dirs.append(dir_path)
+        dev_id = self._device_ids.get(file_stat.st_dev)
+        if dev_id is None:
+            dev_id = self._device_ids[file_stat.st_dev] = len(self._devices)
+            self._devices.append(file_stat.st_dev)
+        self._dir_index.append(dir_id)
+        self._dev_index.append(dev_id)
+        self._names += os.fsencode(name)
+        self._name_offsets.append(len(self._names))
+        self.inodes.append(file_stat.st_ino)
+        self.sizes.append(file_stat.st_size)
+
+    def path(self, row: int) -> str:
+        """
+        文件路径
+        """
+        name = os.fsdecode(bytes(self._names[self._name_offsets[row]:self._name_offsets[row + 1]]))
+        return os.path.join(self._dirs[self._dir_index[row]], name)
+
+    def finish(self):
+        """
+        添加完成后按 (大小, 设备, inode) 排序，并计算分组和inode的边界
+        """
+        if not len(self):
+            return
+        if self.use_numpy:
+            self._finish_numpy()
+        else:
+            self._finish_python()
+
+    def _finish_numpy(self):
+        """
+        向量化排序，相邻元素比较得到分组和inode的边界，np.unique 统计每个大小出现的设备数
+        中间结果用完即释放，降低千万级文件时的峰值内存
+        """
+        sizes = np.frombuffer(self.sizes, dtype=np.uint64)
+        dev_index = np.frombuffer(self._dev_index, dtype=f"u{self._dev_index.itemsize}")
+        inodes = np.frombuffer(self.inodes, dtype=np.uint64)
+        # lexsort 以最后一个键为主键，且为稳定排序，相同inode的路径保持遍历顺序
+        order = np.lexsort((inodes, dev_index, sizes))
+        new_group = np.empty(len(order), dtype=bool)
+        new_group[0] = True
+        sorted_values = dev_index[order]
+        np.not_equal(sorted_values[1:], sorted_values[:-1], out=new_group[1:])
+        sorted_values = inodes[order]
+        new_inode = new_group.copy()
+        new_inode[1:] |= sorted_values[1:] != sorted_values[:-1]
+        sorted_values = sizes[order]
+        new_group[1:] |= sorted_values[1:] != sorted_values[:-1]
+        new_inode |= new_group
+        self.order = self._to_array(order)
+        del order
+
+        group_starts = np.flatnonzero(new_group)
+        del new_group
+        group_sizes = sorted_values[group_starts]
+        del sorted_values
+        self.inode_count = int(np.count_nonzero(new_inode))
+        self.group_inode_counts = self._to_array(
+            np.add.reduceat(new_inode.view(np.uint8), group_starts, dtype=np.uint32), "I")
+        del new_inode
+        self.group_starts = self._to_array(group_starts)
+        del group_starts
+        # 分组已按大小排序，同一大小的各设备分组相邻
+        _, inverse, counts = np.unique(group_sizes, return_inverse=True, return_counts=True)
+        self.group_device_counts = self._to_array(counts[inverse], "I")
+
+    @staticmethod
+    def _to_array(values, typecode: str = "Q") -> array:
+        """
+        NumPy 整数数组转为 array，只复制一次
+        """
+        result = array(typecode)
+        dtype = np.dtype(f"u{result.itemsize}")
+        if values.dtype.itemsize == dtype.itemsize:
+            values = values.view(dtype)
+        result.frombytes(memoryview(np.ascontiguousarray(values, dtype=dtype)).cast("B"))
+        return result
+
+    def _finish_python(self):
+        """
+        排序键与行号打包为一个整数排序，避免为每行单独保存排序键，再逐行计算边界
+        """
+        if len(self) >= 1 << _ROW_BITS:
+            raise ValueError(f"文件数超过 {1 << _ROW_BITS}，无法排序")
+        device_count = max(len(self._devices), 1)
+        sizes, dev_index, inodes = self.sizes, self._dev_index, self.inodes
+        keys = [((((sizes[row] * device_count + dev_index[row]) << _INODE_BITS) | inodes[row]) << _ROW_BITS) | row
+                for row in range(len(self))]
+        keys.sort()
+        row_mask = (1 << _ROW_BITS) - 1
+        self.order = array("Q", (key & row_mask for key in keys))
+        del keys
+
+        previous = None
+        for position, row in enumerate(self.order):
+            current = (sizes[row], dev_index[row], inodes[row])
+            if previous is None or current[:2] != previous[:2]:
+                self.group_starts.append(position)
+                self.group_inode_counts.append(1)
+                self.inode_count += 1
+            elif current[2] != previous[2]:
+                self.group_inode_counts[-1] += 1
+                self.inode_count += 1
+            previous = current
+
+        group_sizes = [sizes[self.order[start]] for start in self.group_starts]
+        run_start = 0
+        for index in range(1, len(group_sizes) + 1):
+            if index == len(group_sizes) or group_sizes[index] != group_sizes[run_start]:
+                self.group_device_counts.extend([index - run_start] * (index - run_start))
+                run_start = index
+
+    def _group_end(self, group: int) -> int:
+        """
+        分组在 order 中的结束位置
+        """
+        return len(self.order) if group + 1 == len(self.group_starts) else self.group_starts[group + 1]
+
+    def _group_columns(self):
+        """
+        各分组的大小、inode数和路径数，NumPy 数组
+        """
+        order = np.frombuffer(self.order, dtype=np.uint64)
+        group_starts = np.frombuffer(self.group_starts, dtype=np.uint64)
+        group_sizes = np.frombuffer(self.sizes, dtype=np.uint64)[order[group_starts]]
+        inode_counts = np.frombuffer(self.group_inode_counts, dtype=f"u{self.group_inode_counts.itemsize}")
+        path_counts = np.diff(group_starts, append=np.uint64(len(order)))
+        return group_sizes, inode_counts, path_counts
+
+    def _selected(self, sizes: Collection[int]):
+        """
+        需要读取的分组：包含多个inode，或大小在 sizes 中
+        :return: NumPy 时为布尔数组，否则为布尔列表
+        """
+        if self.use_numpy:
+            group_sizes, inode_counts, _ = self._group_columns()
+            mask = inode_counts > 1
+            if sizes:
+                mask |= np.isin(group_sizes, np.fromiter(sizes, dtype=np.uint64))
+            return mask
+        return [inode_count > 1 or self.sizes[self.order[start]] in sizes
+                for start, inode_count in zip(self.group_starts, self.group_inode_counts)]
+
+    def size_groups(self, include_sizes: Collection[int] = ()
+                    ) -> Iterator[Tuple[int, int, List[List[int]]]]:
+        """
+        读取包含多个inode的分组，以及大小在 include_sizes 中的单inode分组，需先调用 finish
+        :param include_sizes: 即使只有一个inode也需要读取的文件大小
+        :return: 迭代 (file_size, st_dev, [[同一inode的行号, ...], ...])
+        """
+        if not self.group_starts:
+            return
+        selected = self._selected(include_sizes)
+        groups = np.flatnonzero(selected).tolist() if self.use_numpy else \
+            [group for group, flag in enumerate(selected) if flag]
+        order, inodes = self.order, self.inodes
+        for group in groups:
+            rows = order[self.group_starts[group]:self._group_end(group)]
+            # 分组内设备和大小相同，inode相同的行相邻
+            inode_rows = [[rows[0]]]
+            for row in rows[1:]:
+                if inodes[row] == inodes[inode_rows[-1][0]]:
+                    inode_rows[-1].append(row)
+                else:
+                    inode_rows.append([row])
+            yield self.sizes[rows[0]], self._devices[self._dev_index[rows[0]]], inode_rows
+
+    def unique_sizes(self) -> List[int]:
+        """
+        出现过的所有文件大小
+        """
+        if not len(self):
+            return []
+        if self.use_numpy:
+            return np.unique(np.frombuffer(self.sizes, dtype=np.uint64)).tolist()
+        return list(set(self.sizes))
+
+    def inode_keys(self) -> Set[Tuple[int, int]]:
+        """
+        表中所有文件的 (st_dev, st_ino)
+        """
+        devices, dev_index = self._devices, self._dev_index
+        return {(devices[dev_index[row]], inode) for row, inode in enumerate(self.inodes)}
+
+    def single_inode_summary(self, exclude_sizes: Collection[int] = ()) -> Tuple[int, int, int, int]:
+        """
+        汇总 size_groups 不读取的单inode分组，这些文件不可能与同设备的其他文件重复
+        :param exclude_sizes: 与 size_groups 的 include_sizes 相同
+        :return: (文件数, 字节数, 同一大小出现在其他设备上的文件数, 已有的多余硬链接路径数)
+        """
+        if not self.group_starts:
+            return 0, 0, 0, 0
+        selected = self._selected(exclude_sizes)
+        if self.use_numpy:
+            group_sizes, _, path_counts = self._group_columns()
+            mask = ~selected
+            device_counts = np.frombuffer(self.group_device_counts, dtype=f"u{self.group_device_counts.itemsize}")
+            return (int(mask.sum()), int(group_sizes[mask].sum()), int((device_counts[mask] > 1).sum()),
+                    int((path_counts[mask] - 1).sum()))
+        count = total_bytes = cross_device = extra_links = 0
+        for group, flag in enumerate(selected):
+            if flag:
+                continue
+            start, end = self.group_starts[group], self._group_end(group)
+            count += 1
+            total_bytes += self.sizes[self.order[start]]
+            cross_device += self.group_device_counts[group] > 1
+            extra_links += end - start - 1
+        return count, total_bytes, cross_device, extra_links
@@ -0,0 +1,293 @@
+"""
+哈希索引模块
+持久化保存文件摘要，文件未变化时无需重新读取计算
+同时记录上次完整扫描后已无需处理的大小分组（稳定分组），成员未变化时整组跳过
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Collection, Iterable, Optional, List, Tuple, Set
+
+from app.log import logger
+
+
+def settled_signature(file_stats: Iterable[os.stat_result], link_mode: str) -> str:
+    """
+    稳定分组的签名，由组内各inode的 (st_ino, st_nlink, st_mtime_ns) 及链接方式计算
+    成员增减、新增或删除硬链接、文件被修改以及切换链接方式都会改变签名
+    :param file_stats: 组内每个inode一个stat信息
+    :param link_mode: 链接方式，硬链接与reflink的稳定状态不同
+    """
+    members = sorted((file_stat.st_ino, file_stat.st_nlink, file_stat.st_mtime_ns) for file_stat in file_stats)
+    return hashlib.sha1(f"{link_mode}|{members}".encode()).hexdigest()
+
+
+class HashIndex:
+    """
+    基于SQLite的文件哈希索引
+    以 (st_dev, st_ino) 为主键，命中时还需 st_size 和 st_mtime_ns 一致才视为有效
+    完整扫描会登记所有文件，尚未计算摘要的文件 digest 为空，增量扫描时按需补算
+    每条摘要同时记录其算法，切换算法后旧摘要视为未计算，不会与新算法的摘要混用
+    """
+
+    # 累计写入多少条记录后提交一次事务
+    COMMIT_BATCH = 500
+    # 距上次提交超过多少秒后提交一次事务，扫描中断时最多损失这段时间内计算的摘要
+    CHECKPOINT_INTERVAL = 30
+    # 表结构版本，版本不一致时重建索引
+    SCHEMA_VERSION = 2
+    # 稳定分组超过多少秒未出现在完整扫描中后删除
+    SETTLED_TTL = 30 * 24 * 3600
+
+    def __init__(self, db_file: str, algorithm: str = "sha1"):
+        """
+        初始化哈希索引
+        :param db_file: SQLite数据库文件路径
+        :param algorithm: 当前使用的摘要算法，只读取和写入该算法的摘要
+        """
+        self.db_file = db_file
+        self.algorithm = algorithm
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS file_hash")
+            self._conn.execute("DROP TABLE IF EXISTS settled_group")
+            self._conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_hash ("
+            " dev INTEGER NOT NULL,"
+            " ino INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " path TEXT NOT NULL,"
+            " digest TEXT,"
+            " algorithm TEXT,"
+            " last_seen INTEGER NOT NULL,"
+            " PRIMARY KEY (dev, ino))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_file_hash_digest ON file_hash (size, digest)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS settled_group ("
+            " dev INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " signature TEXT NOT NULL,"
+            " skipped INTEGER NOT NULL,"
+            " last_seen INTEGER NOT NULL,"
+            " PRIMARY KEY (dev, size))"
+        )
+        self._conn.commit()
+
+    def get(self, file_stat: os.stat_result) -> Optional[str]:
+        """
+        查询文件摘要
+        :param file_stat: 文件的stat信息
+        :return: 摘要，文件不在索引中或已变化时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM file_hash WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algorithm=? "
+                "AND digest IS NOT NULL",
+                (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns, self.algorithm)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, file_path: str, file_stat: os.stat_result, digest: str):
+        """
+        写入文件摘要，同一inode的旧记录会被覆盖
+        :param file_path: 文件路径
+        :param file_stat: 计算摘要前获取的stat信息
+        :param digest: 文件摘要
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hash (dev, ino, size, mtime_ns, path, digest, algorithm, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns,
+                 file_path, digest, self.algorithm, int(time.time()))
+            )
+            self._commit_if_needed()
+
+    def record(self, file_path: str, file_stat: os.stat_result, seen_time: int):
+        """
+        登记扫描到的文件，文件未变化时保留已有摘要，变化时清空摘要
+        :param file_path: 文件路径
+        :param file_stat: 文件的stat信息
+        :param seen_time: 本次扫描的时间戳
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO file_hash (dev, ino, size, mtime_ns, path, digest, algorithm, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, NULL, NULL, ?) "
+                "ON CONFLICT (dev, ino) DO UPDATE SET "
+                " digest=CASE WHEN size=excluded.size AND mtime_ns=excluded.mtime_ns THEN digest ELSE NULL END,"
+                " algorithm=CASE WHEN size=excluded.size AND mtime_ns=excluded.mtime_ns THEN algorithm ELSE NULL END,"
+                " size=excluded.size, mtime_ns=excluded.mtime_ns, path=excluded.path, last_seen=excluded.last_seen",
+                (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns, file_path, seen_time)
+            )
+            self._commit_if_needed()
+
+    def _commit_if_needed(self):
+        """
+        记录数或时间达到阈值时提交，调用方需持有锁
+        """
+        self._pending += 1
+        now = time.monotonic()
+        if self._pending >= self.COMMIT_BATCH or now - self._last_commit >= self.CHECKPOINT_INTERVAL:
+            self._conn.commit()
+            self._pending = 0
+            self._last_commit = now
+
+    def existing_sizes(self, sizes: List[int], exclude_inodes: Collection[Tuple[int, int]] = ()) -> Set[int]:
+        """
+        查询索引中存在的文件大小
+        :param sizes: 待查询的文件大小列表
+        :param exclude_inodes: 不计入的文件 {(st_dev, st_ino), ...}，如本次扫描刚登记的新文件
+        :return: 索引中至少有一条其他文件记录的文件大小集合
+        """
+        found = set()
+        with self._lock:
+            # 分批查询，避免超出SQLite参数数量限制
+            for i in range(0, len(sizes), 500):
+                batch = sizes[i:i + 500]
+                placeholders = ','.join('?' * len(batch))
+                if not exclude_inodes:
+                    rows = self._conn.execute(
+                        f"SELECT DISTINCT size FROM file_hash WHERE size IN ({placeholders})", batch
+                    ).fetchall()
+                    found.update(row[0] for row in rows)
+                    continue
+                rows = self._conn.execute(
+                    f"SELECT size, dev, ino FROM file_hash WHERE size IN ({placeholders})", batch
+                ).fetchall()
+                found.update(size for size, dev, ino in rows if (dev, ino) not in exclude_inodes)
+        return found
+
+    def find_by_size(self, size: int) -> List[Tuple[int, int, int, str, Optional[str]]]:
+        """
+        查询大小相同的已登记文件
+        :param size: 文件大小
+        :return: [(st_dev, st_ino, st_mtime_ns, path, digest), ...]，未计算当前算法摘要的文件 digest 为None
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT dev, ino, mtime_ns, path, CASE WHEN algorithm=? THEN digest END FROM file_hash WHERE size=?",
+                (self.algorithm, size)
+            ).fetchall()
+
+    def purge_unseen(self, roots: List[str], seen_time: int) -> int:
+        """
+        删除扫描目录下本次扫描未见到的记录（文件已删除或被排除）
+        :param roots: 本次完整扫描过的目录
+        :param seen_time: 本次扫描的时间戳
+        :return: 删除的记录数
+        """
+        removed = 0
+        with self._lock:
+            for root in roots:
+                prefix = root.rstrip(os.sep) + os.sep
+                cursor = self._conn.execute(
+                    "DELETE FROM file_hash WHERE last_seen < ? AND substr(path, 1, ?) = ?",
+                    (seen_time, len(prefix), prefix)
+                )
+                removed += cursor.rowcount
+            self._conn.commit()
+            self._pending = 0
+        return removed
+
+    def get_settled(self, dev: int, size: int) -> Optional[Tuple[str, int]]:
+        """
+        查询稳定分组
+        :param dev: 设备
+        :param size: 文件大小
+        :return: (签名, 已存在的链接数)，不是稳定分组时返回None
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT signature, skipped FROM settled_group WHERE dev=? AND size=?", (dev, size)
+            ).fetchone()
+
+    def save_settled(self, settled: List[Tuple[int, int, str, int]], unsettled: List[Tuple[int, int]],
+                     seen_time: int) -> int:
+        """
+        完整扫描后更新稳定分组，并删除长时间未出现的分组
+        :param settled: 本次扫描后无需处理的分组 [(dev, size, signature, skipped), ...]
+        :param unsettled: 本次扫描有链接操作或读取失败的分组 [(dev, size), ...]
+        :param seen_time: 本次扫描的时间戳
+        :return: 删除的过期分组数
+        """
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO settled_group (dev, size, signature, skipped, last_seen) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(dev, size, signature, skipped, seen_time) for dev, size, signature, skipped in settled]
+            )
+            self._conn.executemany("DELETE FROM settled_group WHERE dev=? AND size=?", unsettled)
+            cursor = self._conn.execute("DELETE FROM settled_group WHERE last_seen < ?",
+                                        (seen_time - self.SETTLED_TTL,))
+            self._conn.commit()
+            self._pending = 0
+            return cursor.rowcount
+
+    def prune_missing(self) -> int:
+        """
+        逐条检查索引记录，删除文件已不存在或inode已变化的记录
+        :return: 删除的记录数
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT dev, ino, path FROM file_hash").fetchall()
+        stale = []
+        for dev, ino, path in rows:
+            try:
+                file_stat = os.stat(path)
+                if file_stat.st_dev == dev and file_stat.st_ino == ino:
+                    continue
+            except OSError:
+                pass
+            stale.append((dev, ino))
+        with self._lock:
+            self._conn.executemany("DELETE FROM file_hash WHERE dev=? AND ino=?", stale)
+            self._conn.commit()
+            self._pending = 0
+        return len(stale)
+
+    def compact(self):
+        """
+        压缩数据库文件，回收已删除记录占用的空间
+        """
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+            self._conn.execute("VACUUM")
+
+    def count(self) -> int:
+        """
+        索引记录总数
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM file_hash").fetchone()[0]
+
+    def flush(self):
+        """
+        提交未写入的记录
+        """
+        with self._lock:
+            self._conn.commit()
+            self._pending = 0
+
+    def close(self):
+        """
+        关闭数据库连接
+        """
+        with self._lock:
+            try:
+                self._conn.commit()
+                self._conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"关闭哈希索引失败: {str(e)}")
@@ -0,0 +1,278 @@
+"""
+文件哈希计算模块
+支持三种读取方式：
+    buffered - 每次 read 分配新的 bytes 对象（原始实现）
+    readinto - 复用预分配的缓冲区，通过 memoryview 零拷贝送入哈希
+    mmap     - 内存映射文件，按块切片送入哈希
+支持三种摘要算法：
+    sha1     - hashlib 内置，单核约 700 MB/s
+    xxh3_128 - 非加密哈希，需安装 xxhash，速度接近内存带宽
+    blake3   - 需安装 blake3，大块输入时自动多线程计算
+"""
+import hashlib
+import mmap
+import os
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from plugins.smarthardlink.cancel import ScanCancelled
+from plugins.smarthardlink.throttle import TokenBucket
+
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    xxhash = None
+    HAS_XXHASH = False
+
+try:
+    import blake3
+    HAS_BLAKE3 = True
+except ImportError:
+    blake3 = None
+    HAS_BLAKE3 = False
+
+READ_MODE_BUFFERED = "buffered"
+READ_MODE_READINTO = "readinto"
+READ_MODE_MMAP = "mmap"
+READ_MODES = (READ_MODE_BUFFERED, READ_MODE_READINTO, READ_MODE_MMAP)
+
+ALGORITHM_SHA1 = "sha1"
+ALGORITHM_XXH3_128 = "xxh3_128"
+ALGORITHM_BLAKE3 = "blake3"
+ALGORITHMS = (ALGORITHM_SHA1, ALGORITHM_XXH3_128, ALGORITHM_BLAKE3)
+
+# BLAKE3 多线程只在单次输入足够大时生效，mmap 方式下按此大小切片送入
+BLAKE3_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def available_algorithms() -> List[str]:
+    """
+    当前环境可用的摘要算法
+    """
+    algorithms = [ALGORITHM_SHA1]
+    if HAS_XXHASH:
+        algorithms.append(ALGORITHM_XXH3_128)
+    if HAS_BLAKE3:
+        algorithms.append(ALGORITHM_BLAKE3)
+    return algorithms
+
+
+class FileHasher:
+    """
+    文件哈希计算，可在多个线程间共享，每个线程使用各自的读取缓冲区
+    """
+
+    def __init__(self, buffer_size: int = 65536, read_mode: str = READ_MODE_BUFFERED, drop_cache: bool = True,
+                 algorithm: str = ALGORITHM_SHA1, cancel_event: Optional[threading.Event] = None,
+                 throttle: Optional[TokenBucket] = None):
+        """
+        初始化文件哈希计算
+        :param buffer_size: 每次读取并送入哈希的字节数
+        :param read_mode: 读取方式，见 READ_MODES
+        :param drop_cache: 读取完成后通知内核丢弃该文件的页缓存，避免大规模扫描挤占媒体服务器的缓存
+        :param algorithm: 摘要算法，见 ALGORITHMS，所需库未安装时抛出 ValueError
+        :param cancel_event: 取消信号，每读取一块检查一次，已设置时抛出 ScanCancelled
+        :param throttle: 读取限速，每读取一块按实际字节数申请令牌，可在多个 FileHasher 间共享
+        """
+        if algorithm not in available_algorithms():
+            raise ValueError(f"摘要算法 {algorithm} 不可用")
+        self.buffer_size = max(buffer_size, 4096)
+        self.read_mode = read_mode if read_mode in READ_MODES else READ_MODE_BUFFERED
+        self.drop_cache = drop_cache
+        self.algorithm = algorithm
+        self.cancel_event = cancel_event
+        self.throttle = throttle
+        self._local = threading.local()
+
+    def _check_cancel(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ScanCancelled()
+
+    def _throttle(self, amount: int):
+        if self.throttle is not None and amount:
+            self.throttle.consume(amount)
+
+    def _new_hasher(self):
+        """
+        创建摘要对象
+        """
+        if self.algorithm == ALGORITHM_XXH3_128:
+            return xxhash.xxh3_128()
+        if self.algorithm == ALGORITHM_BLAKE3:
+            return blake3.blake3(max_threads=blake3.blake3.AUTO)
+        return hashlib.sha1()
+
+    def hash_file(self, file_path: str) -> str:
+        """
+        计算整个文件的摘要
+        :return: 十六进制摘要
+        """
+        hasher = self._new_hasher()
+        with open(file_path, "rb", buffering=0 if self.read_mode != READ_MODE_BUFFERED else -1) as f:
+            fd = f.fileno()
+            self._advise(fd, "POSIX_FADV_SEQUENTIAL")
+            try:
+                if self.read_mode == READ_MODE_MMAP:
+                    self._update_mmap(f, hasher, [(0, os.fstat(fd).st_size)])
+                elif self.read_mode == READ_MODE_READINTO:
+                    self._update_readinto(f, hasher, [(0, None)])
+                else:
+                    self._update_buffered(f, hasher, [(0, None)])
+            finally:
+                if self.drop_cache:
+                    self._advise(fd, "POSIX_FADV_DONTNEED")
+        return hasher.hexdigest()
+
+    def hash_blocks(self, file_path: str, offsets: Iterable[int], block_size: int) -> str:
+        """
+        计算文件中若干数据块的摘要，用于部分哈希
+        :param offsets: 各数据块的起始偏移
+        :param block_size: 每个数据块的大小
+        :return: 十六进制摘要
+        """
+        hasher = self._new_hasher()
+        blocks = [(offset, block_size) for offset in offsets]
+        with open(file_path, "rb", buffering=0 if self.read_mode != READ_MODE_BUFFERED else -1) as f:
+            fd = f.fileno()
+            self._advise(fd, "POSIX_FADV_RANDOM")
+            try:
+                if self.read_mode == READ_MODE_MMAP:
+                    self._update_mmap(f, hasher, blocks)
+                elif self.read_mode == READ_MODE_READINTO:
+                    self._update_readinto(f, hasher, blocks)
+                else:
+                    self._update_buffered(f, hasher, blocks)
+            finally:
+                if self.drop_cache:
+                    self._advise(fd, "POSIX_FADV_DONTNEED")
+        return hasher.hexdigest()
+
+    def compare_files(self, path_a: str, path_b: str) -> Tuple[bool, int]:
+        """
+        同步分块读取两个文件逐字节比较，遇到第一个不同的块即停止
+        :return: (内容是否一致, 每个文件已读取的字节数)
+        """
+        compared = 0
+        with open(path_a, "rb", buffering=0) as file_a, open(path_b, "rb", buffering=0) as file_b:
+            if os.fstat(file_a.fileno()).st_size != os.fstat(file_b.fileno()).st_size:
+                return False, 0
+            for f in (file_a, file_b):
+                self._advise(f.fileno(), "POSIX_FADV_SEQUENTIAL")
+            buffer_a = self._buffer("buffer")
+            buffer_b = self._buffer("compare_buffer")
+            view_a = memoryview(buffer_a)
+            view_b = memoryview(buffer_b)
+            try:
+                while True:
+                    self._check_cancel()
+                    read_a = self._read_full(file_a, view_a)
+                    read_b = self._read_full(file_b, view_b)
+                    self._throttle(read_a + read_b)
+                    if read_a != read_b:
+                        return False, compared + min(read_a, read_b)
+                    if not read_a:
+                        return True, compared
+                    # bytearray 比较直接使用 memcmp，memoryview 比较会逐元素进行，慢数十倍
+                    if read_a == len(buffer_a):
+                        matched = buffer_a == buffer_b
+                    else:
+                        matched = view_a[:read_a].tobytes() == view_b[:read_b].tobytes()
+                    compared += read_a
+                    if not matched:
+                        return False, compared
+            finally:
+                view_a.release()
+                view_b.release()
+                if self.drop_cache:
+                    for f in (file_a, file_b):
+                        self._advise(f.fileno(), "POSIX_FADV_DONTNEED")
+
+    @staticmethod
+    def _read_full(f, view: memoryview) -> int:
+        """
+        读满缓冲区，只有到达文件末尾时才返回较少的字节数
+        """
+        total = 0
+        while total < len(view):
+            read_size = f.readinto(view[total:])
+            if not read_size:
+                break
+            total += read_size
+        return total
+
+    def _buffer(self, name: str = "buffer") -> bytearray:
+        """
+        当前线程的读取缓冲区
+        :param name: 缓冲区名称，需要同时读取多个文件时各自使用独立的缓冲区
+        """
+        buffer = getattr(self._local, name, None)
+        if buffer is None or len(buffer) != self.buffer_size:
+            buffer = bytearray(self.buffer_size)
+            setattr(self._local, name, buffer)
+        return buffer
+
+    def _update_buffered(self, f, hasher, blocks):
+        for offset, length in blocks:
+            f.seek(offset)
+            remaining = length
+            while remaining is None or remaining > 0:
+                self._check_cancel()
+                data = f.read(self.buffer_size if remaining is None else min(self.buffer_size, remaining))
+                if not data:
+                    break
+                self._throttle(len(data))
+                hasher.update(data)
+                if remaining is not None:
+                    remaining -= len(data)
+
+    def _update_readinto(self, f, hasher, blocks):
+        view = memoryview(self._buffer())
+        try:
+            for offset, length in blocks:
+                f.seek(offset)
+                remaining = length
+                while remaining is None or remaining > 0:
+                    self._check_cancel()
+                    target = view if remaining is None or remaining >= len(view) else view[:remaining]
+                    read_size = f.readinto(target)
+                    if not read_size:
+                        break
+                    self._throttle(read_size)
+                    hasher.update(target[:read_size])
+                    if remaining is not None:
+                        remaining -= read_size
+        finally:
+            view.release()
+
+    def _update_mmap(self, f, hasher, blocks):
+        file_size = os.fstat(f.fileno()).st_size
+        # 空文件无法映射，也没有需要计算的内容
+        if file_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if len(blocks) == 1 and hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            step = max(self.buffer_size, BLAKE3_CHUNK_SIZE) if self.algorithm == ALGORITHM_BLAKE3 else self.buffer_size
+            try:
+                for offset, length in blocks:
+                    end = file_size if length is None else min(offset + length, file_size)
+                    for start in range(offset, end, step):
+                        self._check_cancel()
+                        stop = min(start + step, end)
+                        self._throttle(stop - start)
+                        hasher.update(view[start:stop])
+            finally:
+                view.release()
+
+    @staticmethod
+    def _advise(fd: int, advice: str):
+        """
+        调用 posix_fadvise，不支持的平台忽略
+        """
+        if hasattr(os, "posix_fadvise") and hasattr(os, advice):
+            try:
+                os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+            except OSError:
+                pass
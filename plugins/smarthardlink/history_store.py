@@ -0,0 +1,183 @@
+"""
+运行历史模块
+每次运行追加一条记录，不再整体读写历史列表；常用统计字段单独成列，由SQLite聚合，详情页只读取汇总和最近几条记录
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List
+
+from app.log import logger
+
+# 各阶段耗时的列名，对应 append 的 timings 参数
+PHASES = ("walk", "hash", "verify", "link")
+# 趋势统计支持的周期及其 strftime 格式
+PERIOD_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+}
+
+
+class HistoryStore:
+    """
+    基于SQLite的运行历史，只追加不修改
+    完整的运行摘要以JSON保存供详情页展示，统计字段冗余保存为列，趋势查询无需解析JSON
+    """
+
+    # 表结构版本，版本不一致时重建
+    SCHEMA_VERSION = 1
+
+    def __init__(self, db_file: str):
+        """
+        初始化运行历史
+        :param db_file: SQLite数据库文件路径
+        """
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_file), exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != self.SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS run_history")
+            self._conn.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS run_history ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " end_ts INTEGER NOT NULL,"
+            " status TEXT NOT NULL,"
+            " scan_mode TEXT NOT NULL,"
+            " dry_run INTEGER NOT NULL,"
+            " processed_files INTEGER NOT NULL,"
+            " hardlinks_created INTEGER NOT NULL,"
+            " space_saved INTEGER NOT NULL,"
+            " hashed_bytes INTEGER NOT NULL,"
+            " walk_seconds REAL NOT NULL,"
+            " hash_seconds REAL NOT NULL,"
+            " verify_seconds REAL NOT NULL,"
+            " link_seconds REAL NOT NULL,"
+            " summary TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_run_history_end ON run_history (end_ts)")
+        self._conn.commit()
+
+    def append(self, summary: Dict[str, Any], timings: Dict[str, float], hashed_bytes: int,
+               end_ts: int = 0) -> int:
+        """
+        追加一次运行记录
+        :param summary: 运行摘要，原样保存供详情页展示
+        :param timings: 各阶段耗时，单位秒，键见 PHASES，缺少的阶段记为0
+        :param hashed_bytes: 完整哈希阶段实际读取的字节数，不含索引命中的文件
+        :param end_ts: 结束时间戳，默认为当前时间
+        :return: 记录ID
+        """
+        summary = {**summary, **{f"{phase}_seconds": round(timings.get(phase, 0.0), 3) for phase in PHASES},
+                   "hashed_bytes": hashed_bytes}
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO run_history (end_ts, status, scan_mode, dry_run, processed_files, hardlinks_created,"
+                " space_saved, hashed_bytes, walk_seconds, hash_seconds, verify_seconds, link_seconds, summary)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (end_ts or int(time.time()), summary.get("status", ""), summary.get("scan_mode", ""),
+                 int(summary.get("mode") == "试运行"), summary.get("processed_files", 0),
+                 summary.get("hardlinks_created", 0), summary.get("space_saved", 0), hashed_bytes,
+                 *(timings.get(phase, 0.0) for phase in PHASES),
+                 json.dumps(summary, ensure_ascii=False))
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def import_legacy(self, history: List[Dict[str, Any]]) -> int:
+        """
+        导入旧版保存在插件数据中的历史列表，没有阶段耗时的记录各阶段记为0
+        :return: 导入的记录数
+        """
+        count = 0
+        for summary in history:
+            try:
+                end_ts = int(time.mktime(time.strptime(summary.get("end_time", ""), "%Y-%m-%d %H:%M:%S")))
+            except (TypeError, ValueError):
+                logger.debug(f"历史记录时间格式错误，已忽略: {summary.get('end_time')}")
+                continue
+            self.append(summary, {}, 0, end_ts=end_ts)
+            count += 1
+        return count
+
+    def count(self) -> int:
+        """
+        记录总数
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM run_history").fetchone()[0]
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        最近的运行记录，按结束时间倒序
+        :return: [运行摘要, ...]
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT summary FROM run_history ORDER BY end_ts DESC, id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    @staticmethod
+    def _aggregate(row) -> Dict[str, Any]:
+        """
+        聚合查询结果转为字典，哈希速度按读取总量除以哈希总耗时计算，避免短时间运行的速度权重过大
+        """
+        runs, links, saved, hashed_bytes, walk, hash_seconds, verify, link = (value or 0 for value in row)
+        return {
+            "runs": runs,
+            "hardlinks_created": links,
+            "space_saved": saved,
+            "hashed_bytes": hashed_bytes,
+            "walk_seconds": round(walk, 3),
+            "hash_seconds": round(hash_seconds, 3),
+            "verify_seconds": round(verify, 3),
+            "link_seconds": round(link, 3),
+            "hash_mb_per_second": round(hashed_bytes / hash_seconds / (1024 * 1024), 1) if hash_seconds else 0.0,
+        }
+
+    # 聚合字段，链接数和节省空间只统计实际运行
+    _AGGREGATE_COLUMNS = (
+        "COUNT(*),"
+        " SUM(CASE WHEN dry_run = 0 THEN hardlinks_created ELSE 0 END),"
+        " SUM(CASE WHEN dry_run = 0 THEN space_saved ELSE 0 END),"
+        " SUM(hashed_bytes), SUM(walk_seconds), SUM(hash_seconds), SUM(verify_seconds), SUM(link_seconds)"
+    )
+
+    def totals(self) -> Dict[str, Any]:
+        """
+        全部运行记录的汇总
+        """
+        with self._lock:
+            row = self._conn.execute(f"SELECT {self._AGGREGATE_COLUMNS} FROM run_history").fetchone()
+        return self._aggregate(row)
+
+    def trends(self, period: str = "week", limit: int = 12) -> List[Dict[str, Any]]:
+        """
+        按周期汇总的趋势，按本地时间划分周期
+        :param period: 统计周期，见 PERIOD_FORMATS
+        :param limit: 最多返回的周期数，从最近的周期开始
+        :return: [{"period": "2024-W05", "runs": ..., "space_saved": ..., "hash_mb_per_second": ...}, ...]，按时间正序
+        """
+        if period not in PERIOD_FORMATS:
+            raise ValueError(f"不支持的统计周期: {period}")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT strftime(?, end_ts, 'unixepoch', 'localtime') AS period, {self._AGGREGATE_COLUMNS}"
+                " FROM run_history GROUP BY period ORDER BY period DESC LIMIT ?",
+                (PERIOD_FORMATS[period], limit)
+            ).fetchall()
+        return [{"period": row[0], **self._aggregate(row[1:])} for row in reversed(rows)]
+
+    def close(self):
+        """
+        关闭数据库
+        """
+        with self._lock:
+            self._conn.close()
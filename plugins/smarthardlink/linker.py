@@ -0,0 +1,431 @@
+"""
+硬链接执行模块
+计划执行的替换操作先写入只追加的日志并落盘，再批量执行，插件异常退出后可根据日志恢复
+支持两种替换方式：
+    replace - 在同一目录以临时文件名创建硬链接，再用 os.replace 原子覆盖重复文件，路径始终存在
+    rename  - 先将重复文件重命名为临时文件，在原位置创建硬链接，再删除临时文件（原始实现）
+    reflink - 在同一目录以临时文件名创建源文件的写时复制副本（FICLONE），再用 os.replace 覆盖重复文件
+"""
+import json
+import os
+import re
+import stat
+import struct
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.log import logger
+
+# reflink 依赖 Linux 的 ioctl，其他平台不可用
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    fcntl = None
+    HAS_FCNTL = False
+
+STRATEGY_REPLACE = "replace"
+STRATEGY_RENAME = "rename"
+STRATEGY_REFLINK = "reflink"
+STRATEGIES = (STRATEGY_REPLACE, STRATEGY_RENAME, STRATEGY_REFLINK)
+# 替换过程中使用的临时文件名：原文件名 + ".temp_" + 时间戳
+TEMP_SUFFIX = ".temp_"
+_TEMP_NAME = re.compile(re.escape(TEMP_SUFFIX) + r"\d+$")
+
+
+def is_temp_file(file_path: str) -> bool:
+    """
+    是否为替换过程中的临时文件
+    """
+    return bool(_TEMP_NAME.search(file_path))
+
+
+# linux/fs.h
+FICLONE = 0x40049409
+FS_IOC_FIEMAP = 0xC020660B
+# struct fiemap 头部为 2 个 u64 和 4 个 u32，每个 struct fiemap_extent 为 56 字节
+FIEMAP_HEADER = struct.Struct("=QQIIII")
+FIEMAP_EXTENT = struct.Struct("=QQQQQIIII")
+# linux/fiemap.h，查询前先写回文件数据；物理位置未知或尚未分配的数据块不能用于比较
+FIEMAP_FLAG_SYNC = 0x1
+FIEMAP_EXTENT_UNKNOWN = 0x2
+FIEMAP_EXTENT_DELALLOC = 0x4
+
+
+def reflink_file(source: str, target: str, temp: str):
+    """
+    在 temp 创建 source 的写时复制副本，权限、属主和时间与 target 保持一致
+    文件系统不支持（如 ext4 或跨文件系统）时抛出 OSError
+    """
+    if not HAS_FCNTL:
+        raise OSError("当前平台不支持reflink")
+    target_stat = os.stat(target)
+    with open(source, "rb") as src:
+        fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, stat.S_IMODE(target_stat.st_mode))
+        try:
+            fcntl.ioctl(fd, FICLONE, src.fileno())
+            try:
+                os.fchown(fd, target_stat.st_uid, target_stat.st_gid)
+            except PermissionError:
+                pass
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    os.utime(temp, ns=(target_stat.st_atime_ns, target_stat.st_mtime_ns))
+
+
+def _first_extent(file_path: str) -> Optional[int]:
+    """
+    文件第一个数据块的物理位置，无法获取时返回None
+    """
+    buffer = bytearray(FIEMAP_HEADER.size + FIEMAP_EXTENT.size)
+    FIEMAP_HEADER.pack_into(buffer, 0, 0, 0xFFFFFFFFFFFFFFFF, FIEMAP_FLAG_SYNC, 0, 1, 0)
+    with open(file_path, "rb") as f:
+        fcntl.ioctl(f.fileno(), FS_IOC_FIEMAP, buffer)
+    if FIEMAP_HEADER.unpack_from(buffer, 0)[3] < 1:
+        return None
+    extent = FIEMAP_EXTENT.unpack_from(buffer, FIEMAP_HEADER.size)
+    if extent[5] & (FIEMAP_EXTENT_UNKNOWN | FIEMAP_EXTENT_DELALLOC):
+        return None
+    return extent[1]
+
+
+def shares_extents(source: str, target: str) -> bool:
+    """
+    判断两个文件是否已共享数据块（此前已通过reflink去重），依据第一个数据块的物理位置
+    """
+    if not HAS_FCNTL:
+        return False
+    try:
+        source_extent = _first_extent(source)
+        return source_extent is not None and source_extent == _first_extent(target)
+    except OSError:
+        return False
+
+
+def _file_state(file_stat: os.stat_result) -> Tuple[int, int, int, int]:
+    """
+    用于判断文件是否变化的状态 (st_dev, st_ino, st_size, st_mtime_ns)
+    """
+    return file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns
+
+
+def _target_changed(op: "LinkOperation") -> str:
+    """
+    检查重复文件自扫描后是否已删除或修改，已删除的文件不能重新创建（例如已被媒体管理软件升级删除）
+    :return: 错误信息，未变化时为空
+    """
+    try:
+        target_stat = os.lstat(op.target)
+    except OSError as e:
+        return f"重复文件在扫描后已删除，未替换: {str(e)}"
+    if op.target_state and _file_state(target_stat) != op.target_state:
+        return "重复文件在扫描后已修改，未替换"
+    return ""
+
+
+class LinkOperation:
+    """
+    一次替换操作：将 target 替换为 source 的硬链接
+    """
+
+    def __init__(self, op_id: str, source: str, target: str, source_stat: os.stat_result, strategy: str,
+                 context: Any = None, target_stat: Optional[os.stat_result] = None):
+        self.op_id = op_id
+        self.source = source
+        self.target = target
+        self.strategy = strategy
+        # replace 方式下临时文件是新建的硬链接，reflink 方式下是新建的副本，rename 方式下是被替换的原文件
+        self.temp = f"{target}{TEMP_SUFFIX}{int(time.time())}"
+        self.source_dev = source_stat.st_dev
+        self.source_ino = source_stat.st_ino
+        # 扫描时重复文件的状态，替换前确认未被删除或修改
+        self.target_state = _file_state(target_stat) if target_stat else None
+        self.context = context
+        self.success = False
+        self.finished = False  # 已在日志中记录完成，为False时下次启动由恢复流程处理
+        self.error = ""
+
+    def to_plan(self) -> Dict[str, Any]:
+        return {"op": "plan", "id": self.op_id, "strategy": self.strategy, "source": self.source,
+                "target": self.target, "temp": self.temp, "dev": self.source_dev, "ino": self.source_ino}
+
+
+class LinkExecutor:
+    """
+    批量硬链接执行器
+    每批操作：写入计划并落盘 -> 按替换方式执行 -> 目录落盘 -> 写入完成记录并落盘
+    目录的 fsync 按批合并，每个目录每批只同步一次
+    """
+
+    # 每批执行的操作数量
+    BATCH_SIZE = 64
+
+    def __init__(self, journal_file: str, on_complete: Callable[[LinkOperation], None],
+                 batch_size: int = BATCH_SIZE, strategy: str = STRATEGY_REPLACE):
+        """
+        初始化执行器，日志中残留的未完成操作会先被恢复
+        :param journal_file: 日志文件路径
+        :param on_complete: 每个操作执行完成（成功或失败）后的回调
+        :param batch_size: 每批执行的操作数量
+        :param strategy: 替换方式，见 STRATEGIES
+        """
+        self.journal_file = journal_file
+        self.on_complete = on_complete
+        self.strategy = strategy if strategy in STRATEGIES else STRATEGY_REPLACE
+        self.batch_size = max(batch_size, 1)
+        self._pending: List[LinkOperation] = []
+        self._unfinished = 0
+        self._op_prefix = str(time.time_ns())
+        self._op_count = 0
+        if os.path.exists(journal_file):
+            self._unfinished = self.recover(journal_file)[2]
+        os.makedirs(os.path.dirname(journal_file), exist_ok=True)
+        self._journal = open(journal_file, "a", encoding="utf-8")
+
+    def submit(self, source: str, target: str, source_stat: os.stat_result, context: Any = None,
+               target_stat: Optional[os.stat_result] = None):
+        """
+        提交一个替换操作，攒满一批后执行
+        :param source: 源文件
+        :param target: 被替换为硬链接的重复文件
+        :param source_stat: 源文件的stat信息，用于恢复时判断硬链接是否已创建
+        :param context: 调用方附带的数据，回调时原样返回
+        :param target_stat: 扫描时重复文件的stat信息，替换前比较，文件已变化时不替换；为None时只确认文件仍存在
+        """
+        self._op_count += 1
+        self._pending.append(LinkOperation(f"{self._op_prefix}-{self._op_count}", source, target,
+                                           source_stat, self.strategy, context, target_stat))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        执行所有待处理的操作
+        """
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._append([op.to_plan() for op in batch])
+
+        if self.strategy == STRATEGY_RENAME:
+            dirs = self._execute_rename(batch)
+        elif self.strategy == STRATEGY_REFLINK:
+            dirs = self._execute_replace(batch, lambda op: reflink_file(op.source, op.target, op.temp))
+        else:
+            dirs = self._execute_replace(batch, lambda op: os.link(op.source, op.temp))
+        # rename 方式在 _execute_rename 中已先行同步目录
+        for dir_path in dirs:
+            self._fsync_dir(dir_path)
+
+        self._append([{"op": "done", "id": op.op_id} for op in batch if op.finished])
+        for op in batch:
+            if not op.finished:
+                self._unfinished += 1
+            self.on_complete(op)
+
+    @staticmethod
+    def _execute_replace(batch: List[LinkOperation], create: Callable[[LinkOperation], None]) -> List[str]:
+        """
+        以临时文件名创建硬链接或副本后原子覆盖重复文件，硬链接方式每个文件一次 link 和一次 rename
+        :param create: 在 op.temp 创建新文件的函数
+        :return: 需要同步的目录
+        """
+        dirs = set()
+        for op in batch:
+            try:
+                create(op)
+            except OSError as e:
+                op.error = f"创建{'reflink' if op.strategy == STRATEGY_REFLINK else '硬链接'}失败: {str(e)}"
+                op.finished = True
+                # reflink 失败时可能已创建空的临时文件
+                if op.strategy == STRATEGY_REFLINK and os.path.lexists(op.temp):
+                    try:
+                        os.remove(op.temp)
+                    except OSError:
+                        op.finished = False
+                continue
+            changed = _target_changed(op)
+            if changed:
+                try:
+                    os.remove(op.temp)
+                    op.error = changed
+                    op.finished = True
+                except OSError as remove_err:
+                    op.error = f"{changed}，删除临时文件也失败: {str(remove_err)}，临时文件位于: {op.temp}"
+                continue
+            try:
+                os.replace(op.temp, op.target)
+            except OSError as e:
+                try:
+                    os.remove(op.temp)
+                    op.error = f"替换重复文件失败，原文件未改动: {str(e)}"
+                    op.finished = True
+                except OSError as remove_err:
+                    op.error = f"替换重复文件失败且删除临时硬链接也失败: {str(remove_err)}，临时文件位于: {op.temp}"
+                continue
+            op.success = True
+            op.finished = True
+            dirs.add(os.path.dirname(op.target))
+        return list(dirs)
+
+    def _execute_rename(self, batch: List[LinkOperation]) -> List[str]:
+        """
+        先将重复文件重命名为临时文件，在原位置创建硬链接，目录落盘后删除临时文件
+        :return: 需要同步的目录
+        """
+        linked = []
+        dirs = set()
+        for op in batch:
+            op.error = _target_changed(op)
+            if op.error:
+                op.finished = True
+                continue
+            try:
+                os.rename(op.target, op.temp)
+            except OSError as e:
+                op.error = f"创建硬链接失败: {str(e)}"
+                op.finished = True
+                continue
+            try:
+                os.link(op.source, op.target)
+            except OSError as e:
+                try:
+                    os.rename(op.temp, op.target)
+                    op.error = f"创建硬链接失败，已恢复原文件: {str(e)}"
+                    op.finished = True
+                except OSError as recover_err:
+                    op.error = f"创建硬链接失败且恢复原文件也失败: {str(recover_err)}，原文件位于: {op.temp}"
+                continue
+            linked.append(op)
+            dirs.add(os.path.dirname(op.target))
+
+        # 新的目录项落盘后才删除旧文件，掉电时不会出现两者都丢失的情况
+        for dir_path in dirs:
+            self._fsync_dir(dir_path)
+        for op in linked:
+            op.success = True
+            try:
+                os.remove(op.temp)
+                op.finished = True
+            except OSError as e:
+                logger.warning(f"删除临时文件 {op.temp} 失败: {str(e)}，下次启动时重试")
+        return []
+
+    def close(self):
+        """
+        执行剩余操作并关闭日志，全部完成时删除日志文件
+        """
+        try:
+            self.flush()
+        finally:
+            self._journal.close()
+            if not self._unfinished:
+                try:
+                    os.remove(self.journal_file)
+                except OSError:
+                    pass
+
+    def _append(self, records: List[Dict[str, Any]]):
+        """
+        追加日志记录并落盘
+        """
+        if not records:
+            return
+        self._journal.write("".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    @staticmethod
+    def _fsync_dir(dir_path: str):
+        """
+        同步目录项，不支持的平台或文件系统忽略
+        """
+        try:
+            fd = os.open(dir_path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def recover(journal_file: str) -> Tuple[int, int, int]:
+        """
+        根据日志恢复未完成的操作：
+        replace 方式：残留的临时硬链接直接删除（回滚），重复文件本身未被改动
+        reflink 方式：残留的临时副本直接删除（回滚），重复文件本身未被改动
+        rename 方式：硬链接已创建的删除临时文件（继续完成），硬链接未创建的将临时文件改回原名（回滚）
+        :param journal_file: 日志文件路径
+        :return: (继续完成的数量, 回滚的数量, 无法自动处理而保留在日志中的数量)
+        """
+        plans = {}
+        try:
+            with open(journal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 写入过程中断的最后一行
+                        continue
+                    if record.get("op") == "plan":
+                        plans[record["id"]] = record
+                    elif record.get("op") == "done":
+                        plans.pop(record.get("id"), None)
+        except OSError as e:
+            logger.error(f"读取硬链接日志 {journal_file} 失败: {str(e)}")
+            return 0, 0, 0
+
+        rolled_forward = rolled_back = 0
+        remaining = []
+        for plan in plans.values():
+            temp, target = plan["temp"], plan["target"]
+            if not os.path.lexists(temp):
+                # 尚未开始或已全部完成
+                continue
+            try:
+                if plan.get("strategy") == STRATEGY_REFLINK:
+                    os.remove(temp)
+                    rolled_back += 1
+                    logger.info(f"硬链接日志恢复: 删除未完成替换的临时副本 {temp}")
+                elif plan.get("strategy") == STRATEGY_REPLACE:
+                    temp_stat = os.stat(temp)
+                    if (temp_stat.st_dev, temp_stat.st_ino) == (plan["dev"], plan["ino"]):
+                        os.remove(temp)
+                        rolled_back += 1
+                        logger.info(f"硬链接日志恢复: 删除未完成替换的临时硬链接 {temp}")
+                    else:
+                        logger.error(f"硬链接日志恢复: 临时文件 {temp} 不是源文件的硬链接，保留")
+                        remaining.append(plan)
+                elif os.path.lexists(target):
+                    target_stat = os.stat(target)
+                    if (target_stat.st_dev, target_stat.st_ino) == (plan["dev"], plan["ino"]):
+                        os.remove(temp)
+                        rolled_forward += 1
+                        logger.info(f"硬链接日志恢复: {target} 已链接到 {plan['source']}，删除临时文件")
+                    else:
+                        logger.error(f"硬链接日志恢复: {target} 已被其他文件占用，原文件保留在 {temp}")
+                        remaining.append(plan)
+                else:
+                    os.rename(temp, target)
+                    rolled_back += 1
+                    logger.info(f"硬链接日志恢复: 已将 {temp} 恢复为 {target}")
+            except OSError as e:
+                logger.error(f"硬链接日志恢复 {target} 失败: {str(e)}")
+                remaining.append(plan)
+
+        # 只保留仍需处理的操作，其余记录不再需要
+        try:
+            if remaining:
+                with open(journal_file, "w", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(plan, ensure_ascii=False) + "\n" for plan in remaining))
+                    f.flush()
+                    os.fsync(f.fileno())
+            else:
+                os.remove(journal_file)
+        except OSError as e:
+            logger.error(f"更新硬链接日志 {journal_file} 失败: {str(e)}")
+        return rolled_forward, rolled_back, len(remaining)
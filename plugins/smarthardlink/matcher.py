@@ -0,0 +1,78 @@
+"""
+排除规则匹配模块
+"""
+import os
+import re
+from typing import Optional, Pattern, Union
+
+from app.log import logger
+
+
+class _PatternGroup:
+    """
+    无法合并为单个表达式时，按顺序逐个匹配的正则表达式组
+    """
+
+    def __init__(self, patterns):
+        self.patterns = patterns
+
+    def search(self, text: str) -> bool:
+        return any(pattern.search(text) for pattern in self.patterns)
+
+
+class ExclusionMatcher:
+    """
+    预编译的排除规则，每次扫描构建一次，逐文件判断时不再重复解析配置
+    """
+
+    def __init__(self, exclude_dirs: str = "", exclude_extensions: str = "", exclude_keywords: str = ""):
+        """
+        初始化排除规则
+        :param exclude_dirs: 排除目录，每行一个
+        :param exclude_extensions: 排除扩展名，逗号分隔，不带点
+        :param exclude_keywords: 排除关键词正则表达式，每行一个
+        """
+        # 目录按前缀匹配，str.startswith 支持直接传入元组
+        self.dirs = tuple(sorted({exclude_dir for exclude_dir in exclude_dirs.split("\n") if exclude_dir}))
+        self.extensions = frozenset(f".{ext.strip().lower()}" for ext in exclude_extensions.split(",")
+                                    if ext.strip())
+        self.keywords = self._compile_keywords([keyword for keyword in exclude_keywords.split("\n") if keyword])
+
+    @staticmethod
+    def _compile_keywords(keywords) -> Optional[Union[Pattern, _PatternGroup]]:
+        """
+        将所有关键词合并为一个正则表达式，无效的表达式会被忽略
+        """
+        valid_keywords = []
+        for keyword in keywords:
+            try:
+                re.compile(keyword)
+                valid_keywords.append(keyword)
+            except re.error as e:
+                logger.warning(f"排除关键词 '{keyword}' 不是有效的正则表达式，已忽略: {str(e)}")
+        if not valid_keywords:
+            return None
+        try:
+            return re.compile("|".join(f"(?:{keyword})" for keyword in valid_keywords))
+        except re.error:
+            # 关键词中包含全局内联标记（如 (?i)）时无法合并，逐个匹配
+            patterns = [re.compile(keyword) for keyword in valid_keywords]
+            return _PatternGroup(patterns)
+
+    def is_excluded_dir(self, dir_path: str) -> bool:
+        """
+        检查目录是否位于排除目录下，命中时目录下所有文件都会被排除
+        """
+        return bool(self.dirs) and dir_path.startswith(self.dirs)
+
+    def is_excluded(self, file_path: str) -> bool:
+        """
+        检查文件是否应该被排除
+        """
+        if self.dirs and file_path.startswith(self.dirs):
+            return True
+        if self.extensions and os.path.splitext(file_path)[1].lower() in self.extensions:
+            return True
+        if self.keywords and self.keywords.search(file_path):
+            return True
+        return False
@@ -0,0 +1,140 @@
+"""
+链接计划模块
+试运行时把重复文件组写入计划文件（JSONL），之后执行计划时只需比较文件状态即可创建硬链接，无需重新计算哈希
+计划文件第一行为计划信息，其后每行一个重复文件组：
+    {"type": "header", "created": 1700000000, "algorithm": "sha1", "groups": 1, "duplicates": 1, "bytes": 1024}
+    {"type": "group", "device": 2049, "hash": "...", "source": {...}, "duplicates": [{...}, ...]}
+每个文件记录为 {"path": 路径, "size": 大小, "ino": inode, "mtime_ns": 修改时间}
+"""
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+PLAN_VERSION = 1
+
+
+def file_entry(file_path: str, file_stat: os.stat_result) -> Dict[str, Any]:
+    """
+    计划中的文件记录
+    """
+    return {
+        "path": file_path,
+        "size": file_stat.st_size,
+        "ino": file_stat.st_ino,
+        "mtime_ns": file_stat.st_mtime_ns,
+    }
+
+
+def is_stale(entry: Dict[str, Any], device: int, file_stat: os.stat_result) -> bool:
+    """
+    文件自生成计划以来是否发生变化，设备、inode、大小或修改时间任一不同即视为已变化
+    """
+    return (file_stat.st_dev != device
+            or file_stat.st_ino != entry.get("ino")
+            or file_stat.st_size != entry.get("size")
+            or file_stat.st_mtime_ns != entry.get("mtime_ns"))
+
+
+class PlanWriter:
+    """
+    计划文件写入，先写入临时文件，完成后原子替换，写入中途失败时保留原有计划
+    """
+
+    def __init__(self, plan_file: str, algorithm: str):
+        """
+        初始化计划写入
+        :param plan_file: 计划文件路径
+        :param algorithm: 生成计划使用的摘要算法，仅用于记录
+        """
+        self.plan_file = plan_file
+        self.algorithm = algorithm
+        self.group_count = 0
+        self.duplicate_count = 0
+        self.reclaimable_bytes = 0
+        self._temp_file = f"{plan_file}.tmp"
+        self._file = open(self._temp_file, "w", encoding="utf-8")
+
+    def add_group(self, device: int, digest: str, source: Dict[str, Any], duplicates: List[Dict[str, Any]],
+                  reclaimable: int):
+        """
+        写入一个重复文件组
+        :param device: 所在设备
+        :param digest: 组内文件的摘要
+        :param source: 源文件记录，见 file_entry
+        :param duplicates: 将替换为源文件链接的重复文件记录
+        :param reclaimable: 执行后可回收的字节数，同一inode的多个路径只计算一次
+        """
+        if not duplicates:
+            return
+        self._file.write(json.dumps({
+            "type": "group",
+            "device": device,
+            "hash": digest,
+            "source": source,
+            "duplicates": duplicates,
+        }, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.group_count += 1
+        self.duplicate_count += len(duplicates)
+        self.reclaimable_bytes += reclaimable
+
+    def close(self):
+        """
+        写入计划信息并替换原计划文件，计划信息在末尾确定后写到第一行
+        """
+        self._file.close()
+        header = json.dumps({
+            "type": "header",
+            "version": PLAN_VERSION,
+            "created": int(time.time()),
+            "algorithm": self.algorithm,
+            "groups": self.group_count,
+            "duplicates": self.duplicate_count,
+            "bytes": self.reclaimable_bytes,
+        }, ensure_ascii=False, separators=(",", ":"))
+        with open(self._temp_file, "r", encoding="utf-8") as src, \
+                open(self.plan_file + ".new", "w", encoding="utf-8") as dst:
+            dst.write(header + "\n")
+            for line in src:
+                dst.write(line)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(self.plan_file + ".new", self.plan_file)
+        os.remove(self._temp_file)
+
+    def abort(self):
+        """
+        放弃本次写入，原有计划文件不受影响
+        """
+        self._file.close()
+        try:
+            os.remove(self._temp_file)
+        except OSError:
+            pass
+
+
+def read_plan_header(plan_file: str) -> Optional[Dict[str, Any]]:
+    """
+    读取计划信息，计划文件不存在或格式不正确时返回None
+    """
+    try:
+        with open(plan_file, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "null")
+    except (OSError, ValueError):
+        return None
+    if not isinstance(header, dict) or header.get("type") != "header" or header.get("version") != PLAN_VERSION:
+        return None
+    return header
+
+
+def read_plan_groups(plan_file: str) -> Iterator[Tuple[int, str, Dict[str, Any], List[Dict[str, Any]]]]:
+    """
+    逐组读取计划
+    :return: 迭代 (device, hash, source, duplicates)
+    """
+    with open(plan_file, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("type") != "group":
+                continue
+            yield record["device"], record["hash"], record["source"], record["duplicates"]
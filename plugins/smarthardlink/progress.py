@@ -0,0 +1,238 @@
+"""
+进度统计模块
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from app.log import logger
+
+
+class ProgressAggregator:
+    """
+    线程安全的进度汇总，多个工作线程共同上报，按时间间隔输出日志
+    """
+
+    def __init__(self, stage: str, total: int, log_interval: float = 10.0):
+        """
+        初始化进度汇总
+        :param stage: 阶段名称，用于日志输出
+        :param total: 需要处理的文件总数
+        :param log_interval: 两次进度日志之间的最小间隔，单位秒
+        """
+        self.stage = stage
+        self.total = total
+        self.done = 0
+        self.bytes_done = 0
+        self.log_interval = log_interval
+        self._lock = threading.Lock()
+        self._start_time = time.monotonic()
+        self._last_log_time = self._start_time
+
+    def update(self, size: int = 0):
+        """
+        上报一个文件处理完成
+        :param size: 该文件的字节数
+        """
+        with self._lock:
+            self.done += 1
+            self.bytes_done += size
+            now = time.monotonic()
+            if now - self._last_log_time < self.log_interval:
+                return
+            self._last_log_time = now
+            done, bytes_done = self.done, self.bytes_done
+        self._log(done, bytes_done, now)
+
+    def finish(self):
+        """
+        输出阶段完成日志
+        """
+        with self._lock:
+            done, bytes_done = self.done, self.bytes_done
+        if self.total:
+            self._log(done, bytes_done, time.monotonic())
+
+    def _log(self, done: int, bytes_done: int, now: float):
+        elapsed = max(now - self._start_time, 1e-6)
+        percent = done / self.total * 100 if self.total else 100.0
+        message = f"{self.stage}: 已处理 {done}/{self.total} 个文件 ({percent:.1f}%)"
+        if bytes_done:
+            message += f"，速度 {bytes_done / elapsed / (1024 * 1024):.1f} MB/s"
+        logger.info(message)
+
+
+class RunProgress:
+    """
+    单次扫描的整体进度，供API和详情页读取
+    各阶段由扫描线程和哈希工作线程更新，读取时返回一致的快照
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.running = False
+        self.scan_mode = ""
+        self.status = ""
+        self.phase = ""
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        self.files_scanned = 0
+        self.bytes_scanned = 0
+        self.phase_files_total = 0
+        self.phase_bytes_total = 0
+        self.phase_files_done = 0
+        self.phase_bytes_done = 0
+        self.phase_bytes_read = 0  # 本阶段实际读取的字节数，不含从索引读取摘要的文件
+        self._phase_start = 0.0
+        self.phase_seconds: Dict[str, float] = {}  # 各阶段累计耗时，同名阶段多次进入时累加
+        self.bytes_hashed = 0
+        self.index_hits = 0
+        self.bytes_cached = 0
+        self.groups_found = 0
+        self.duplicates_found = 0
+        self.bytes_reclaimable = 0
+        self.links_done = 0
+
+    def start(self, scan_mode: str):
+        """
+        开始新的一次扫描，清空上次的进度
+        """
+        with self._lock:
+            self._reset()
+            self.running = True
+            self.scan_mode = scan_mode
+            self.started_at = time.time()
+
+    def set_phase(self, phase: str, files_total: int = 0, bytes_total: int = 0):
+        """
+        进入新阶段
+        :param phase: 阶段名称
+        :param files_total: 本阶段需要处理的文件数，未知时为0
+        :param bytes_total: 本阶段需要读取的字节数，未知或只读取部分内容时为0
+        """
+        with self._lock:
+            self._end_phase()
+            self.phase = phase
+            self.phase_files_total = files_total
+            self.phase_bytes_total = bytes_total
+            self.phase_files_done = 0
+            self.phase_bytes_done = 0
+            self.phase_bytes_read = 0
+            self._phase_start = time.monotonic()
+
+    def _end_phase(self):
+        """
+        累计当前阶段的耗时，调用方需持有锁
+        """
+        if self.running and self._phase_start and self.phase:
+            self.phase_seconds[self.phase] = (self.phase_seconds.get(self.phase, 0.0)
+                                              + time.monotonic() - self._phase_start)
+
+    def add_scanned(self, size: int):
+        """
+        遍历阶段发现一个文件
+        """
+        with self._lock:
+            self.files_scanned += 1
+            self.bytes_scanned += size
+
+    def add_hashed(self, size: int, cached: bool = False):
+        """
+        哈希阶段完成一个文件
+        :param size: 文件的字节数，只读取部分内容的阶段为0
+        :param cached: 摘要来自哈希索引或缓存，没有读取文件，不计入读取量和吞吐量
+        """
+        with self._lock:
+            self.phase_files_done += 1
+            self.phase_bytes_done += size
+            if cached:
+                self.index_hits += 1
+                self.bytes_cached += size
+            else:
+                self.phase_bytes_read += size
+                self.bytes_hashed += size
+
+    def add_duplicates(self, groups: int, duplicates: int, reclaimable: int):
+        """
+        记录发现的重复文件组
+        :param reclaimable: 全部替换后可回收的字节数
+        """
+        with self._lock:
+            self.groups_found += groups
+            self.duplicates_found += duplicates
+            self.bytes_reclaimable += reclaimable
+
+    def add_checked(self):
+        """
+        链接阶段检查完一个重复文件
+        """
+        with self._lock:
+            self.phase_files_done += 1
+
+    def add_linked(self):
+        """
+        成功完成一个链接操作
+        """
+        with self._lock:
+            self.links_done += 1
+
+    def finish(self, status: str):
+        """
+        扫描结束
+        """
+        with self._lock:
+            self._end_phase()
+            self.running = False
+            self.status = status
+            self.phase = "已结束"
+            self.finished_at = time.time()
+
+    def phase_durations(self) -> Dict[str, float]:
+        """
+        各阶段的累计耗时，单位秒，扫描进行中时包含当前阶段已经过的时间
+        """
+        with self._lock:
+            durations = dict(self.phase_seconds)
+            if self.running and self._phase_start and self.phase:
+                durations[self.phase] = durations.get(self.phase, 0.0) + time.monotonic() - self._phase_start
+        return durations
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        当前进度快照，吞吐量和预计剩余时间按当前阶段计算，吞吐量只计实际读取的字节
+        """
+        with self._lock:
+            elapsed = max(time.monotonic() - self._phase_start, 1e-6) if self._phase_start else 0
+            throughput = self.phase_bytes_read / elapsed if elapsed else 0
+            eta = None
+            if self.running and elapsed:
+                if self.phase_bytes_total and throughput:
+                    eta = (self.phase_bytes_total - self.phase_bytes_done) / throughput
+                elif self.phase_files_total and self.phase_files_done:
+                    eta = (self.phase_files_total - self.phase_files_done) * elapsed / self.phase_files_done
+            return {
+                "running": self.running,
+                "scan_mode": self.scan_mode,
+                "status": self.status,
+                "phase": self.phase,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "files_scanned": self.files_scanned,
+                "bytes_scanned": self.bytes_scanned,
+                "phase_files_done": self.phase_files_done,
+                "phase_files_total": self.phase_files_total,
+                "phase_bytes_done": self.phase_bytes_done,
+                "phase_bytes_total": self.phase_bytes_total,
+                "bytes_hashed": self.bytes_hashed,
+                "index_hits": self.index_hits,
+                "bytes_cached": self.bytes_cached,
+                "hash_mb_per_second": round(throughput / (1024 * 1024), 1),
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+                "groups_found": self.groups_found,
+                "duplicates_found": self.duplicates_found,
+                "bytes_reclaimable": self.bytes_reclaimable,
+                "links_done": self.links_done,
+            }
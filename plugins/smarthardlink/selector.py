@@ -0,0 +1,68 @@
+"""
+源文件选择模块
+重复文件组内保留一个文件作为源文件，其余文件替换为它的链接，源文件选择得当可以减少需要重写的链接数量
+"""
+import os
+from typing import Collection, Dict, List, Optional, Tuple
+
+POLICY_PATH = "path"  # 路径字典序最小的文件
+POLICY_MOST_LINKS = "most_links"  # 已有硬链接最多的inode，其已有路径无需重写
+POLICY_OLDEST = "oldest"  # 修改时间最早的文件
+POLICY_PREFERRED_ROOT = "preferred_root"  # 位于优先目录下的文件，按目录配置顺序
+POLICIES = (POLICY_PATH, POLICY_MOST_LINKS, POLICY_OLDEST, POLICY_PREFERRED_ROOT)
+
+
+class SourceSelector:
+    """
+    按配置的策略对重复文件组排序，排在最前的文件作为源文件，策略无法区分时按路径排序
+    """
+
+    def __init__(self, policy: str = POLICY_PATH, preferred_roots: str = ""):
+        """
+        初始化源文件选择
+        :param policy: 选择策略，见 POLICIES
+        :param preferred_roots: 优先目录，每行一个，越靠前优先级越高
+        """
+        self.policy = policy if policy in POLICIES else POLICY_PATH
+        self.preferred_roots = [os.path.join(root.strip(), "") for root in preferred_roots.split("\n")
+                                if root.strip()]
+
+    def _root_rank(self, file_path: str) -> int:
+        """
+        文件所在优先目录的序号，不在任何优先目录下时排在最后
+        """
+        for rank, root in enumerate(self.preferred_roots):
+            if file_path.startswith(root):
+                return rank
+        return len(self.preferred_roots)
+
+    def order(self, files: List[Tuple[str, int]], preferred_sources: Collection[str] = ()
+              ) -> List[Tuple[str, int]]:
+        """
+        对重复文件组排序
+        :param files: [(file_path, file_size), ...]
+        :param preferred_sources: 无论策略如何都优先保留的路径，如增量扫描时索引中已有的文件
+        :return: 排序后的列表，第一个为源文件
+        """
+        stats: Dict[str, Optional[os.stat_result]] = {}
+        if self.policy in (POLICY_MOST_LINKS, POLICY_OLDEST):
+            for file_path, _ in files:
+                try:
+                    stats[file_path] = os.stat(file_path)
+                except OSError:
+                    stats[file_path] = None
+
+        def sort_key(item: Tuple[str, int]):
+            file_path = item[0]
+            file_stat = stats.get(file_path)
+            if self.policy == POLICY_MOST_LINKS:
+                rank = -file_stat.st_nlink if file_stat else 0
+            elif self.policy == POLICY_OLDEST:
+                rank = file_stat.st_mtime_ns if file_stat else float("inf")
+            elif self.policy == POLICY_PREFERRED_ROOT:
+                rank = self._root_rank(file_path)
+            else:
+                rank = 0
+            return file_path not in preferred_sources, rank, file_path
+
+        return sorted(files, key=sort_key)
@@ -0,0 +1,168 @@
+"""
+读取限速及线程优先级模块
+"""
+import ctypes
+import os
+import platform
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from app.log import logger
+
+# ioprio_set 的系统调用号，Python 未提供封装
+IOPRIO_SYSCALLS = {
+    "x86_64": 251,
+    "amd64": 251,
+    "i386": 289,
+    "i686": 289,
+    "aarch64": 30,
+    "arm64": 30,
+    "armv7l": 314,
+}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+
+
+class TokenBucket:
+    """
+    令牌桶限速，多个线程共享同一速率
+    读取前申请与读取量相同的令牌，令牌不足时记为欠账并休眠到补足为止，因此单次申请量可以大于桶容量
+    时钟和休眠函数可替换，便于在不实际等待的情况下验证限速行为
+    """
+
+    def __init__(self, rate: float = 0, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        初始化令牌桶
+        :param rate: 速率，单位字节/秒，0表示不限速
+        :param burst: 桶容量，单位字节，默认为1秒的读取量
+        :param clock: 单调时钟
+        :param sleep: 休眠函数
+        """
+        self.clock = clock
+        self.sleep = sleep
+        self.rate = 0.0
+        self.capacity = 0.0
+        self._tokens = 0.0
+        self._last = clock()
+        self._lock = threading.Lock()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate: float, burst: Optional[float] = None):
+        """
+        调整速率，已有的欠账保留
+        :param rate: 速率，单位字节/秒，0表示不限速
+        :param burst: 桶容量，单位字节，默认为1秒的读取量
+        """
+        rate = max(float(rate), 0.0)
+        with self._lock:
+            if rate == self.rate and burst is None:
+                return
+            was_limited = bool(self.rate)
+            self._refill()
+            self.rate = rate
+            self.capacity = float(burst) if burst else max(rate, 1.0)
+            # 从不限速切换为限速时桶是满的，调整速率时保留已有令牌和欠账
+            self._tokens = min(self._tokens, self.capacity) if was_limited else self.capacity
+
+    def _refill(self):
+        """
+        按经过的时间补充令牌，调用方需持有锁
+        """
+        now = self.clock()
+        if self.rate:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def consume(self, amount: int) -> float:
+        """
+        申请读取 amount 字节，令牌不足时休眠
+        :return: 休眠的秒数
+        """
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            self._refill()
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+
+class BandwidthSchedule:
+    """
+    分时段限速，每行一个时段 "HH:MM-HH:MM=MB/s"，结束时间早于开始时间表示跨越午夜，0表示该时段不限速
+    不在任何时段内时使用默认速率，多个时段重叠时使用第一个匹配的时段
+    """
+
+    def __init__(self, default_rate_mb: float, profiles: str = ""):
+        """
+        初始化分时段限速
+        :param default_rate_mb: 默认速率，单位MB/s，0表示不限速
+        :param profiles: 时段配置，格式错误的行会被忽略
+        """
+        self.default_rate_mb = max(default_rate_mb, 0)
+        self.profiles = self.parse(profiles)
+
+    @staticmethod
+    def parse(profiles: str) -> List[Tuple[int, int, float]]:
+        """
+        解析时段配置
+        :return: [(开始分钟, 结束分钟, MB/s), ...]
+        """
+        result = []
+        for line in (profiles or "").split("\n"):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                period, rate = line.split("=")
+                start, end = period.split("-")
+                result.append((BandwidthSchedule._minutes(start), BandwidthSchedule._minutes(end),
+                               max(float(rate), 0)))
+            except ValueError:
+                logger.warning(f"限速时段配置格式错误，已忽略: {line}")
+        return result
+
+    @staticmethod
+    def _minutes(value: str) -> int:
+        hour, minute = value.strip().split(":")
+        hour, minute = int(hour), int(minute)
+        if not (0 <= hour <= 24 and 0 <= minute < 60):
+            raise ValueError(value)
+        return hour * 60 + minute
+
+    def rate_at(self, hour: int, minute: int) -> float:
+        """
+        指定时刻的速率
+        :return: 速率，单位字节/秒，0表示不限速
+        """
+        now = hour * 60 + minute
+        for start, end, rate in self.profiles:
+            if (start <= now < end) if start <= end else (now >= start or now < end):
+                return rate * 1024 * 1024
+        return self.default_rate_mb * 1024 * 1024
+
+
+def lower_thread_priority(nice: int = 10):
+    """
+    降低当前线程的CPU和IO优先级，作为线程池的 initializer 使用
+    Linux 下 nice 和 ioprio 均按线程生效；IO空闲级别需要 BFQ/CFQ 调度器才有效果，不支持时忽略
+    :param nice: 增加的 nice 值
+    """
+    try:
+        os.nice(nice)
+    except (AttributeError, OSError) as e:
+        logger.debug(f"调整线程nice值失败: {str(e)}")
+    syscall_nr = IOPRIO_SYSCALLS.get(platform.machine().lower())
+    if not syscall_nr:
+        return
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.syscall(syscall_nr, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) != 0:
+            logger.debug(f"设置线程IO优先级失败: errno {ctypes.get_errno()}")
+    except (AttributeError, OSError) as e:
+        logger.debug(f"设置线程IO优先级失败: {str(e)}")
@@ -0,0 +1,75 @@
+"""
+目录遍历模块
+"""
+import os
+import threading
+from typing import Iterator, Optional, Tuple
+
+from app.log import logger
+
+from plugins.smarthardlink.cancel import ScanCancelled
+from plugins.smarthardlink.matcher import ExclusionMatcher
+
+
+class DirectoryWalker:
+    """
+    基于 os.scandir 的流式目录遍历
+    复用 DirEntry 自带的类型信息和stat结果，排除目录在目录层级直接剪枝，不再进入其子目录
+    """
+
+    # 每发现多少个文件输出一次进度日志
+    LOG_INTERVAL = 1000
+
+    def __init__(self, matcher: ExclusionMatcher, min_size: int, cancel_event: Optional[threading.Event] = None):
+        """
+        初始化目录遍历
+        :param matcher: 排除规则，排除目录整体跳过，其余规则逐文件判断
+        :param min_size: 最小文件大小，单位字节
+        :param cancel_event: 取消信号，每进入一个目录检查一次，已设置时抛出 ScanCancelled
+        """
+        self.matcher = matcher
+        self.min_size = min_size
+        self.cancel_event = cancel_event
+        self.file_count = 0
+
+    def walk(self, root: str, modified_since: float = 0) -> Iterator[Tuple[str, os.stat_result]]:
+        """
+        遍历目录，逐个产出符合条件的普通文件，跳过符号链接
+        :param root: 扫描目录
+        :param modified_since: 大于0时只产出 mtime 或 ctime 不早于该时间戳的文件
+        :return: (file_path, stat) 迭代器
+        """
+        self.file_count = 0
+        if self.matcher.is_excluded_dir(root):
+            return
+        stack = [root]
+        while stack:
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise ScanCancelled()
+            dir_path = stack.pop()
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if not self.matcher.is_excluded_dir(entry.path):
+                                    stack.append(entry.path)
+                                continue
+                            # 符号链接及管道等特殊文件不处理
+                            if not entry.is_file(follow_symlinks=False):
+                                continue
+                            self.file_count += 1
+                            if self.file_count % self.LOG_INTERVAL == 0:
+                                logger.info(f"目录 {root} 已发现 {self.file_count} 个文件")
+                            if self.matcher.is_excluded(entry.path):
+                                continue
+                            file_stat = entry.stat(follow_symlinks=False)
+                            if file_stat.st_size < self.min_size:
+                                continue
+                            if modified_since and max(file_stat.st_mtime, file_stat.st_ctime) < modified_since:
+                                continue
+                            yield entry.path, file_stat
+                        except OSError as e:
+                            logger.error(f"获取文件信息失败 {entry.path}: {str(e)}")
+            except OSError as e:
+                logger.error(f"读取目录 {dir_path} 失败: {str(e)}")
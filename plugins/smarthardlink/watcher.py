@@ -0,0 +1,173 @@
+"""
+目录实时监控模块
+监听文件写入完成和移入事件，去抖后批量交给去重流程处理
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, List
+
+from app.log import logger
+
+from plugins.smarthardlink.linker import is_temp_file
+
+# watchdog 在 Linux 下使用 inotify，可获得 IN_CLOSE_WRITE / IN_MOVED_TO 事件
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    HAS_WATCHDOG = True
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+    HAS_WATCHDOG = False
+
+
+class _EventHandler(FileSystemEventHandler):
+    """
+    只关注写入完成和移入的文件，其余事件忽略，插件自身替换时使用的临时文件也忽略
+    """
+
+    def __init__(self, watcher: "DirectoryWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_closed(self, event):
+        if not event.is_directory and not is_temp_file(event.src_path):
+            self.watcher.add_path(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory and not is_temp_file(event.dest_path):
+            self.watcher.add_path(event.dest_path)
+
+
+class DirectoryWatcher:
+    """
+    目录监控服务
+    事件到达后等待 debounce 秒内没有新事件再统一处理，持续有事件时最多等待 max_delay 秒
+    插件自身正在替换的文件通过 suppress / release 登记，替换完成 SUPPRESS_GRACE 秒内的事件忽略
+    """
+
+    # 替换完成后继续忽略事件的时间，单位秒，覆盖事件从内核到达监控线程的延迟
+    SUPPRESS_GRACE = 5.0
+
+    def __init__(self, dirs: List[str], callback: Callable[[List[str]], None],
+                 debounce: float = 60, max_delay: float = 600):
+        """
+        初始化目录监控
+        :param dirs: 监控目录
+        :param callback: 批量处理函数，参数为文件路径列表，在监控服务的工作线程中顺序调用
+        :param debounce: 去抖时间，单位秒
+        :param max_delay: 一批文件从首个事件到开始处理的最长等待时间，单位秒
+        """
+        self.dirs = dirs
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._pending = set()
+        self._suppressed: Dict[str, float] = {}  # {file_path: 忽略截止时间}，替换进行中为无穷大
+        self._first_event_time = 0.0
+        self._last_event_time = 0.0
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._worker = None
+
+    def add_path(self, file_path: str):
+        """
+        记录一个待处理文件
+        """
+        with self._condition:
+            now = time.monotonic()
+            if file_path in self._suppressed:
+                if now < self._suppressed[file_path]:
+                    return
+                del self._suppressed[file_path]
+            if not self._pending:
+                self._first_event_time = now
+            self._last_event_time = now
+            self._pending.add(file_path)
+            self._condition.notify()
+
+    def suppress(self, file_path: str):
+        """
+        登记插件即将替换的文件，release 之前该文件的事件均忽略
+        """
+        with self._condition:
+            self._suppressed[file_path] = float("inf")
+
+    def release(self, file_path: str):
+        """
+        文件替换完成，SUPPRESS_GRACE 秒后恢复监控
+        """
+        with self._condition:
+            now = time.monotonic()
+            # 顺带清理已过期的记录
+            for expired in [path for path, until in self._suppressed.items() if until <= now]:
+                del self._suppressed[expired]
+            self._suppressed[file_path] = now + self.SUPPRESS_GRACE
+
+    def start(self) -> bool:
+        """
+        启动监控
+        :return: 是否启动成功
+        """
+        if not HAS_WATCHDOG:
+            logger.error("未安装watchdog库，无法启用实时监控。建议安装: pip install watchdog")
+            return False
+        self._stopped.clear()
+        self._observer = Observer()
+        handler = _EventHandler(self)
+        for watch_dir in self.dirs:
+            if not watch_dir or not os.path.isdir(watch_dir):
+                logger.warning(f"监控目录不存在: {watch_dir}")
+                continue
+            self._observer.schedule(handler, watch_dir, recursive=True)
+            logger.info(f"开始实时监控目录: {watch_dir}")
+        self._observer.start()
+        self._worker = threading.Thread(target=self._run, name="smarthardlink-watcher", daemon=True)
+        self._worker.start()
+        return True
+
+    def stop(self):
+        """
+        停止监控，尚未处理的文件会被丢弃，由下次增量扫描兜底
+        """
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._worker:
+            self._worker.join()
+            self._worker = None
+
+    def _take_batch(self) -> List[str]:
+        """
+        等待并取出一批已稳定的文件
+        """
+        with self._condition:
+            while not self._stopped.is_set():
+                if self._pending:
+                    now = time.monotonic()
+                    ready_at = min(self._last_event_time + self.debounce, self._first_event_time + self.max_delay)
+                    if now >= ready_at:
+                        batch = list(self._pending)
+                        self._pending.clear()
+                        return batch
+                    self._condition.wait(ready_at - now)
+                else:
+                    self._condition.wait()
+        return []
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._take_batch()
+            if not batch:
+                continue
+            logger.info(f"实时监控: 处理 {len(batch)} 个新文件")
+            try:
+                self.callback(batch)
+            except Exception as e:
+                logger.error(f"实时监控处理新文件失败: {str(e)}")
@@ -0,0 +1,50 @@
+"""
+智能硬链接测试
+插件依赖 MoviePilot 运行环境（app 包），在 MoviePilot 根目录下运行：python -m pytest tests
+"""
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def make_plugin(tmp_path):
+    """
+    创建插件实例，数据目录和插件数据保存在临时目录中，不发送通知
+    """
+    pytest.importorskip("app.log", reason="需要 MoviePilot 运行环境")
+    from plugins.smarthardlink import smarthardlink
+
+    class TestPlugin(smarthardlink):
+        def __init__(self, data_dir: Path):
+            super().__init__()
+            self._test_data_dir = data_dir
+            self._test_data: Dict[str, Any] = {}
+
+        def get_data_path(self) -> Path:
+            return self._test_data_dir
+
+        def get_data(self, key: str, *args, **kwargs) -> Any:
+            return self._test_data.get(key)
+
+        def save_data(self, key: str, value: Any, *args, **kwargs):
+            self._test_data[key] = value
+
+        def post_message(self, *args, **kwargs):
+            pass
+
+    plugins = []
+
+    def factory(**config) -> TestPlugin:
+        plugin = TestPlugin(tmp_path / "data")
+        plugin.init_plugin({"enabled": False, "min_size": 1, "dry_run": False, **config})
+        plugins.append(plugin)
+        return plugin
+
+    yield factory
+    for plugin in plugins:
+        plugin.stop_service()
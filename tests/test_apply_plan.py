@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+pytest.importorskip("app.log", reason="需要 MoviePilot 运行环境")
+
+from plugins.smarthardlink.plan import read_plan_groups  # noqa: E402
+
+
+def _write(file_path, data: bytes):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+
+def test_apply_plan_skips_deleted_duplicate(tmp_path, make_plugin):
+    library = tmp_path / "library"
+    data = os.urandom(100 * 1024)
+    for name in ("a.mkv", "b.mkv", "c.mkv", "d.mkv"):
+        _write(str(library / name), data)
+
+    plugin = make_plugin(scan_dirs=str(library), dry_run=True)
+    plugin.scan_and_process()
+    (_, _, source, duplicates), = read_plan_groups(plugin._get_plan_file())
+    assert len(duplicates) == 3
+
+    deleted = duplicates[0]["path"]
+    os.remove(deleted)
+    summary = plugin.apply_plan()
+
+    assert not os.path.exists(deleted)
+    source_ino = os.stat(source["path"]).st_ino
+    assert all(os.stat(duplicate["path"]).st_ino == source_ino for duplicate in duplicates[1:])
+    assert summary["stale_skipped"] == 1
+    assert summary["hardlinks_created"] == 2
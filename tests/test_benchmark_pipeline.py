@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("app.log", reason="需要 MoviePilot 运行环境")
+
+from plugins.smarthardlink.benchmark import bench_pipeline  # noqa: E402
+
+
+def test_pipeline_dedup(tmp_path):
+    result = bench_pipeline(count=50, min_kb=1, max_kb=64, directory=str(tmp_path))
+    tree = result["tree"]
+    assert tree["duplicates"] and tree["hardlinks"]
+    assert result["inodes_after"] == tree["originals"]
+    first, second = result["runs"]
+    assert first["hardlinks_created"] == tree["duplicates"]
+    # 第二次运行全部命中索引，没有需要处理的文件
+    assert second["hardlinks_created"] == 0
+    assert second["hashed_bytes"] == 0
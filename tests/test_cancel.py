@@ -0,0 +1,45 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("app.log", reason="需要 MoviePilot 运行环境")
+
+from plugins.smarthardlink import lock  # noqa: E402
+
+
+def _queue_scan(plugin, monkeypatch):
+    """
+    在持有扫描锁时启动一次扫描，返回线程和记录实际运行次数的列表
+    """
+    runs = []
+    monkeypatch.setattr(plugin, "_smarthardlink__scan_and_process",
+                        lambda incremental, paths: runs.append(paths))
+    thread = threading.Thread(target=plugin.scan_and_process)
+    thread.start()
+    # 等待线程开始排队
+    time.sleep(0.2)
+    return thread, runs
+
+
+def test_cancel_skips_queued_scan(make_plugin, monkeypatch):
+    plugin = make_plugin()
+    with lock:
+        thread, runs = _queue_scan(plugin, monkeypatch)
+        assert plugin.api_cancel().success
+    thread.join(timeout=5)
+    assert not runs
+
+    # 取消只影响已排队的扫描
+    plugin.scan_and_process()
+    assert runs == [None]
+    assert not plugin._event.is_set()
+
+
+def test_stopping_skips_queued_scan(make_plugin, monkeypatch):
+    plugin = make_plugin()
+    with lock:
+        thread, runs = _queue_scan(plugin, monkeypatch)
+        plugin._stopping.set()
+    thread.join(timeout=5)
+    assert not runs
@@ -0,0 +1,55 @@
+import os
+import time
+
+
+def _write(file_path, data: bytes, mtime: float = None):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.write(data)
+    if mtime:
+        os.utime(file_path, (mtime, mtime))
+
+
+def _record_hashed(plugin):
+    """
+    记录部分哈希和完整哈希读取过的文件
+    """
+    hashed = []
+    calculate_file_hash, calculate_partial_hash = plugin.calculate_file_hash, plugin.calculate_partial_hash
+
+    def full(file_path, file_stat=None):
+        hashed.append(file_path)
+        return calculate_file_hash(file_path, file_stat)
+
+    def partial(file_path, file_size):
+        hashed.append(file_path)
+        return calculate_partial_hash(file_path, file_size)
+
+    plugin.calculate_file_hash, plugin.calculate_partial_hash = full, partial
+    return hashed
+
+
+def test_incremental_skips_new_file_with_unique_size(tmp_path, make_plugin):
+    library = tmp_path / "library"
+    old_data = os.urandom(100 * 1024)
+    for name in ("old1.mkv", "old2.mkv", "old3.mkv"):
+        _write(str(library / "old" / name), os.urandom(120 * 1024))
+    _write(str(library / "old" / "keep.mkv"), old_data)
+
+    plugin = make_plugin(scan_dirs=str(library))
+    plugin.scan_and_process()
+    # 之后只有修改时间晚于此时的文件视为新文件
+    plugin.save_data("scan_state", {str(library): time.time() + 1})
+
+    future = time.time() + 100
+    unique_file = str(library / "new" / "unique.mkv")
+    _write(unique_file, os.urandom(150 * 1024), mtime=future)
+    duplicate_file = str(library / "new" / "copy.mkv")
+    _write(duplicate_file, old_data, mtime=future)
+
+    hashed = _record_hashed(plugin)
+    plugin.scan_and_process(incremental=True)
+
+    assert unique_file not in hashed
+    assert duplicate_file in hashed
+    assert os.stat(duplicate_file).st_ino == os.stat(str(library / "old" / "keep.mkv")).st_ino
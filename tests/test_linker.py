@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+pytest.importorskip("app.log", reason="需要 MoviePilot 运行环境")
+
+from plugins.smarthardlink.linker import LinkExecutor, STRATEGY_RENAME, STRATEGY_REPLACE  # noqa: E402
+
+
+def _write(file_path, data: bytes):
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+
+@pytest.mark.parametrize("strategy", [STRATEGY_REPLACE, STRATEGY_RENAME])
+def test_changed_targets_are_not_replaced(tmp_path, strategy):
+    source, deleted, modified, unchanged = (str(tmp_path / name) for name in ("src", "deleted", "modified", "same"))
+    for file_path in (source, deleted, modified, unchanged):
+        _write(file_path, b"x" * 1024)
+
+    operations = []
+    executor = LinkExecutor(str(tmp_path / "journal" / "link_journal.jsonl"), on_complete=operations.append,
+                            strategy=strategy)
+    for target in (deleted, modified, unchanged):
+        executor.submit(source, target, os.stat(source), target_stat=os.stat(target))
+    # 扫描之后、替换之前文件被删除或修改
+    os.remove(deleted)
+    _write(modified, b"y" * 2048)
+    executor.close()
+
+    results = {op.target: op.success for op in operations}
+    assert results == {deleted: False, modified: False, unchanged: True}
+    assert not os.path.exists(deleted)
+    assert os.stat(modified).st_ino != os.stat(source).st_ino
+    assert os.stat(unchanged).st_ino == os.stat(source).st_ino
+    assert sorted(os.listdir(tmp_path)) == ["journal", "modified", "same", "src"]
@@ -0,0 +1,103 @@
+import pytest
+
+pytest.importorskip("app.log", reason="需要 MoviePilot 运行环境")
+
+from plugins.smarthardlink.throttle import BandwidthSchedule, TokenBucket  # noqa: E402
+
+MB = 1024 * 1024
+
+
+class FakeClock:
+    """
+    模拟时钟，休眠时记录时长并推进时间
+    """
+
+    def __init__(self, advance_on_sleep: bool = True):
+        self.now = 0.0
+        self.sleeps = []
+        self.advance_on_sleep = advance_on_sleep
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        if self.advance_on_sleep:
+            self.now += seconds
+
+
+def _bucket(clock: FakeClock, rate: float = 0, burst: float = None) -> TokenBucket:
+    return TokenBucket(rate, burst, clock=clock, sleep=clock.sleep)
+
+
+def test_burst_then_rate_limited():
+    clock = FakeClock()
+    bucket = _bucket(clock, rate=1024)
+    # 初始桶是满的，1秒的读取量不需要等待
+    assert bucket.consume(1024) == 0
+    assert bucket.consume(512) == 0.5
+    assert bucket.consume(256) == 0.25
+    assert clock.sleeps == [0.5, 0.25]
+
+
+def test_refill_is_capped_at_capacity():
+    clock = FakeClock()
+    bucket = _bucket(clock, rate=1024, burst=2048)
+    assert bucket.consume(2048) == 0
+    clock.now += 1
+    assert bucket.consume(512) == 0
+    # 空闲很久也只补满桶容量
+    clock.now += 100
+    assert bucket.consume(2048) == 0
+    assert bucket.consume(1024) == 1.0
+    assert clock.sleeps == [1.0]
+
+
+def test_request_larger_than_capacity_waits_for_debt():
+    clock = FakeClock()
+    bucket = _bucket(clock, rate=1024)
+    assert bucket.consume(4096) == 3.0
+    assert bucket.consume(1024) == 1.0
+    assert clock.sleeps == [3.0, 1.0]
+
+
+def test_unlimited_never_sleeps():
+    clock = FakeClock()
+    bucket = _bucket(clock)
+    assert bucket.consume(100 * MB) == 0
+    assert not clock.sleeps
+
+
+def test_rate_change_keeps_debt():
+    clock = FakeClock(advance_on_sleep=False)
+    bucket = _bucket(clock, rate=1024)
+    assert bucket.consume(2048) == 1.0
+    bucket.set_rate(2048)
+    # 欠账 1024 字节按新速率偿还
+    assert bucket.consume(0) == 0.5
+    assert clock.sleeps == [1.0, 0.5]
+
+
+def test_schedule_window_switches_rate():
+    schedule = BandwidthSchedule(0, "01:00-07:00=2\n23:00-01:00=1")
+    clock = FakeClock()
+    bucket = _bucket(clock)
+
+    bucket.set_rate(schedule.rate_at(12, 0))
+    assert bucket.consume(100 * MB) == 0
+
+    # 进入限速时段时桶是满的
+    bucket.set_rate(schedule.rate_at(2, 0))
+    assert bucket.rate == 2 * MB
+    assert bucket.consume(2 * MB) == 0
+    assert bucket.consume(MB) == 0.5
+
+    # 跨越午夜的时段，限速之间切换时不重新装满桶
+    bucket.set_rate(schedule.rate_at(23, 30))
+    assert bucket.rate == MB
+    assert bucket.consume(2 * MB) == 2.0
+
+    bucket.set_rate(schedule.rate_at(7, 0))
+    assert bucket.rate == 0
+    assert bucket.consume(100 * MB) == 0
+    assert clock.sleeps == [0.5, 2.0]
@@ -0,0 +1,97 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("app.log", reason="需要 MoviePilot 运行环境")
+
+from plugins.smarthardlink.linker import LinkExecutor  # noqa: E402
+from plugins.smarthardlink.watcher import DirectoryWatcher, _EventHandler  # noqa: E402
+
+# 实际监控测试使用的去抖时间，单位秒
+DEBOUNCE = 0.5
+
+
+def test_ignores_temp_files():
+    watcher = DirectoryWatcher([], callback=lambda paths: None)
+    handler = _EventHandler(watcher)
+    handler.on_closed(SimpleNamespace(is_directory=False, src_path="/media/a.mkv.temp_1700000000"))
+    handler.on_moved(SimpleNamespace(is_directory=False, src_path="/media/a.mkv.temp_1700000000",
+                                     dest_path="/media/a.mkv"))
+    handler.on_closed(SimpleNamespace(is_directory=False, src_path="/media/b.mkv"))
+    assert watcher._pending == {"/media/a.mkv", "/media/b.mkv"}
+
+
+def test_suppresses_own_replacements():
+    watcher = DirectoryWatcher([], callback=lambda paths: None)
+    watcher.suppress("/media/a.mkv")
+    watcher.add_path("/media/a.mkv")
+    watcher.release("/media/a.mkv")
+    # 替换完成后的宽限时间内仍然忽略
+    watcher.add_path("/media/a.mkv")
+    assert not watcher._pending
+
+    watcher.SUPPRESS_GRACE = 0
+    watcher.release("/media/a.mkv")
+    watcher.add_path("/media/a.mkv")
+    assert watcher._pending == {"/media/a.mkv"}
+
+
+@pytest.fixture
+def watched(tmp_path):
+    """
+    在预先创建的目录上启动实际的监控服务，返回 (目录, 监控服务, 回调收到的批次列表, 收到回调的事件)
+    """
+    pytest.importorskip("watchdog", reason="需要 watchdog")
+    watch_dir = tmp_path / "library"
+    watch_dir.mkdir()
+    batches = []
+    received = threading.Event()
+
+    def callback(paths):
+        batches.append(sorted(paths))
+        received.set()
+
+    watcher = DirectoryWatcher([str(watch_dir)], callback=callback, debounce=DEBOUNCE)
+    assert watcher.start()
+    yield watch_dir, watcher, batches, received
+    watcher.stop()
+
+
+def test_writes_are_debounced_into_one_batch(watched):
+    watch_dir, watcher, batches, received = watched
+    file_path = str(watch_dir / "a.mkv")
+    # 多次写入完成事件合并为一批
+    for _ in range(3):
+        with open(file_path, "ab") as f:
+            f.write(b"x" * 1024)
+        time.sleep(DEBOUNCE / 5)
+
+    assert received.wait(10)
+    time.sleep(DEBOUNCE * 3)
+    assert batches == [[file_path]]
+
+
+def test_own_replacements_do_not_trigger(watched, tmp_path):
+    watch_dir, watcher, batches, received = watched
+    source, target = str(watch_dir / "source.mkv"), str(watch_dir / "target.mkv")
+    for file_path in (source, target):
+        with open(file_path, "wb") as f:
+            f.write(b"x" * 1024)
+    assert received.wait(10)
+    time.sleep(DEBOUNCE * 3)
+    assert batches == [[source, target]]
+    received.clear()
+
+    # 与插件相同：提交前登记，执行器完成后解除
+    executor = LinkExecutor(str(tmp_path / "data" / "link_journal.jsonl"),
+                            on_complete=lambda op: watcher.release(op.target))
+    watcher.suppress(target)
+    executor.submit(source, target, os.stat(source), target_stat=os.stat(target))
+    executor.close()
+    assert os.stat(target).st_ino == os.stat(source).st_ino
+
+    assert not received.wait(DEBOUNCE * 4)
+    assert batches == [[source, target]]